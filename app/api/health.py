@@ -0,0 +1,40 @@
+from fastapi import APIRouter, Request, status
+from fastapi.responses import JSONResponse
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+from starlette.concurrency import run_in_threadpool
+
+from app.db.session import engine
+
+router = APIRouter(prefix="/health", tags=["Health"])
+
+
+def _database_reachable() -> bool:
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+        return True
+    except SQLAlchemyError:
+        return False
+
+
+@router.get("/live")
+async def live():
+    """The process is up and serving requests"""
+    return {"status": "alive"}
+
+
+@router.get("/ready")
+async def ready(request: Request):
+    """Warm-up finished, the app is not shutting down and the database answers"""
+    if not getattr(request.app.state, "ready", False):
+        return JSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            content={"code": "503", "data": {"status": "starting"}, "message": "Not ready"}
+        )
+    if not await run_in_threadpool(_database_reachable):
+        return JSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            content={"code": "503", "data": {"status": "database_unavailable"}, "message": "Database unavailable"}
+        )
+    return {"status": "ready"}
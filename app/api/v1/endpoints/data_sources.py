@@ -1,15 +1,37 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlmodel import select, Session
-from typing import List
-from app.db.session import get_session
+from typing import Dict, List, Optional
+from datetime import datetime
+import itertools
+import os
+from app.db.session import get_session, get_read_session
 from app.models.field_data_source import FieldDataSource
 from app.models.field_data_source_option import FieldDataSourceOption
 from app.schemas.data_source import DataSourceCreate, DataSourceResponse
 from app.api.v1.endpoints.users import get_current_user
 from app.models.admin_user import AdminUser
+from app.core.response_cache import cached_response, response_cache
+from app.lib.cursors import decode_cursor, encode_cursor
+from app.services.data_source_options import (
+    MAX_RANGE_OPTIONS,
+    RANGE_SOURCE_TYPE,
+    RangeOptions,
+    insert_options,
+    search_options,
+)
+from app.services.options_resolver import (
+    RESOLVED_SOURCE_TYPES,
+    OptionsFetchError,
+    options_resolver,
+    validate_configuration,
+)
 
 router = APIRouter(prefix="/data-sources", tags=["data-sources"])
 
+# Computed options a search examines per request, so a prefix matching
+# nothing in a large range cannot tie up the event loop
+OPTIONS_SCAN_LIMIT = int(os.getenv("ADMIN_OPTIONS_SCAN_LIMIT", "20000"))
+
 @router.post("", status_code=status.HTTP_201_CREATED, response_model=DataSourceResponse)
 @router.post("/", status_code=status.HTTP_201_CREATED, response_model=DataSourceResponse)
 async def create_data_source(
@@ -17,59 +39,181 @@ async def create_data_source(
         session: Session = Depends(get_session),
         current_user: AdminUser = Depends(get_current_user)
 ):
+    # Range sources generate their options from the configuration and store none
+    if data_source.source_type == RANGE_SOURCE_TYPE:
+        if data_source.options:
+            raise HTTPException(status_code=400, detail="Range data sources generate their options from configuration")
+        try:
+            range_options = RangeOptions.from_configuration(data_source.configuration)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid range configuration: {e}")
+        if len(range_options) > MAX_RANGE_OPTIONS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Invalid range configuration: it has {len(range_options)} values, at most {MAX_RANGE_OPTIONS} are allowed"
+            )
+
+    # So do api and dynamic sources, fetching them from the configured endpoint or query
+    if data_source.source_type in RESOLVED_SOURCE_TYPES:
+        if data_source.options:
+            raise HTTPException(status_code=400, detail="Options of api and dynamic data sources are fetched from configuration")
+        try:
+            validate_configuration(data_source.source_type, data_source.configuration)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid {data_source.source_type} configuration: {e}")
+
     # Create data source
+    now = datetime.utcnow()
     db_data_source = FieldDataSource(
         name=data_source.name,
         source_type=data_source.source_type,
         configuration=data_source.configuration,
-        created_by=current_user.id
+        created_by=current_user.id,
+        created_at=now,
+        updated_at=now
     )
     session.add(db_data_source)
+    session.flush()
+
+    # Options are inserted with one statement in the same transaction
+    options = insert_options(session, db_data_source.id, data_source.options or [], now)
     session.commit()
-    session.refresh(db_data_source)
-
-    # Create options if provided
-    if data_source.options:
-        for option in data_source.options:
-            db_option = FieldDataSourceOption(
-                data_source_id=db_data_source.id,
-                value=option.value,
-                display_text=option.display_text
-            )
-            session.add(db_option)
-        session.commit()
 
-    # Fetch options for response
-    options = session.exec(
-        select(FieldDataSourceOption).where(FieldDataSourceOption.data_source_id == db_data_source.id)
-    ).all()
+    response_cache.invalidate("data_sources")
 
     return {
         "id": db_data_source.id,
         "name": db_data_source.name,
         "source_type": db_data_source.source_type,
         "configuration": db_data_source.configuration,
-        "options": [{"id": opt.id, "value": opt.value, "display_text": opt.display_text} for opt in options]
+        "options": options
     }
 
 
 @router.get("", response_model=List[DataSourceResponse])
 @router.get("/", response_model=List[DataSourceResponse])
-async def get_data_sources(session: Session = Depends(get_session)):
+@cached_response(ttl=300, tags=("data_sources",))
+async def get_data_sources(
+        include_options: bool = Query(True, alias="includeOptions"),
+        session: Session = Depends(get_read_session)
+):
+    """
+    All data sources. Large static lists are better read page by page through
+    GET /data-sources/{id}/options with `includeOptions=false` here.
+    """
     data_sources = session.exec(select(FieldDataSource)).all()
-    result = []
 
-    for ds in data_sources:
+    # Options of every data source in one query
+    options_by_source: Dict[int, List[dict]] = {ds.id: [] for ds in data_sources}
+    if include_options and options_by_source:
         options = session.exec(
-            select(FieldDataSourceOption).where(FieldDataSourceOption.data_source_id == ds.id)
+            select(FieldDataSourceOption)
+            .where(FieldDataSourceOption.data_source_id.in_(list(options_by_source)))
+            .order_by(FieldDataSourceOption.data_source_id, FieldDataSourceOption.id)
         ).all()
+        for opt in options:
+            options_by_source[opt.data_source_id].append(
+                {"id": opt.id, "value": opt.value, "display_text": opt.display_text}
+            )
 
+    result = []
+    for ds in data_sources:
         result.append({
             "id": ds.id,
             "name": ds.name,
             "source_type": ds.source_type,
             "configuration": ds.configuration,
-            "options": [{"id": opt.id, "value": opt.value, "display_text": opt.display_text} for opt in options]
+            "options": options_by_source[ds.id]
         })
 
-    return result
\ No newline at end of file
+    return result
+
+
+@router.get("/{data_source_id}/options")
+async def get_data_source_options(
+        data_source_id: int,
+        search: Optional[str] = None,
+        cursor: Optional[str] = None,
+        pageSize: int = Query(50, ge=1, le=500),
+        session: Session = Depends(get_read_session),
+        current_user: AdminUser = Depends(get_current_user)
+):
+    """
+    Options of a data source ordered by display text, optionally limited to
+    those starting with `search` (case-insensitive). Pass the `nextCursor` of a
+    page as `cursor` to get the next one; it is null on the last page.
+    """
+    data_source = session.get(FieldDataSource, data_source_id)
+    if data_source is None:
+        raise HTTPException(status_code=404, detail="Data source not found")
+
+    if data_source.source_type == RANGE_SOURCE_TYPE:
+        try:
+            options = RangeOptions.from_configuration(data_source.configuration)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid range configuration: {e}")
+        return computed_options_page(options, search, cursor, pageSize)
+
+    if data_source.source_type in RESOLVED_SOURCE_TYPES:
+        try:
+            options = await options_resolver.resolve(data_source)
+        except OptionsFetchError as e:
+            raise HTTPException(status_code=502, detail=f"Could not load the options of data source {data_source_id}: {e}")
+        return computed_options_page(options, search, cursor, pageSize)
+
+    after = None
+    if cursor:
+        try:
+            # The (sort key, id) pair is bound into the query, so a tampered cursor must not reach it
+            key, option_id = decode_cursor(cursor, 2)
+            if not isinstance(key, str):
+                raise ValueError("Invalid cursor")
+            after = (key, int(option_id))
+        except (ValueError, TypeError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    # One extra row tells whether there is a next page
+    rows = search_options(session, data_source_id, prefix=search, after=after, limit=pageSize + 1)
+    has_more = len(rows) > pageSize
+    rows = rows[:pageSize]
+
+    next_cursor = None
+    if has_more:
+        last, last_key = rows[-1]
+        next_cursor = encode_cursor(last_key, last.id)
+
+    return {
+        "list": [{"id": opt.id, "value": opt.value, "display_text": opt.display_text} for opt, _ in rows],
+        "pageSize": pageSize,
+        "nextCursor": next_cursor
+    }
+
+
+def computed_options_page(options, search: Optional[str], cursor: Optional[str], page_size: int):
+    """
+    A page of options that are not stored as rows (RangeOptions or
+    ResolvedOptions); its cursor is the index of the next option. A search
+    examines at most OPTIONS_SCAN_LIMIT options per request, so a page can
+    come back short, even empty, with a cursor to continue from.
+    """
+    offset = 0
+    if cursor:
+        try:
+            offset = int(decode_cursor(cursor, 1)[0])
+        except (ValueError, TypeError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    end = offset + OPTIONS_SCAN_LIMIT if search else None
+    page = list(itertools.islice(options.options(offset, search, end), page_size + 1))
+    if len(page) > page_size:
+        next_cursor = encode_cursor(page[page_size][0])
+    elif end is not None and end < len(options):
+        next_cursor = encode_cursor(end)
+    else:
+        next_cursor = None
+
+    return {
+        "list": [option for _, option in page[:page_size]],
+        "pageSize": page_size,
+        "nextCursor": next_cursor
+    }
@@ -1,8 +1,11 @@
 # app/api/v1/endpoints/items.py
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status, UploadFile, File
+from sqlalchemy import case, lambda_stmt, literal_column, tuple_
+from sqlalchemy.orm import load_only
 from sqlmodel import select, Session, func, and_, or_, col
-from typing import List, Optional, Dict, Any
-from app.db.session import get_session
+from starlette.concurrency import run_in_threadpool
+from typing import List, Optional, Dict, Any, Set
+from app.db.session import get_session, get_read_session
 from app.models.item import Item
 from app.models.item_field_value import ItemFieldValue
 from app.models.item_statistics import ItemStatistics
@@ -13,14 +16,99 @@ from app.models.user_rating import UserRating
 from app.models.admin_user import AdminUser
 from app.schemas.item import ItemResponse, ItemListResponse, RatingListResponse
 from app.api.v1.endpoints.users import get_current_user
+from app.lib.field_values import read_field_value
+from app.lib.fieldsets import sparse_fields, wants
+from app.core.response_cache import response_cache
+from app.services.item_cache import item_cache
+from app.services.item_import import ItemImporter, detect_format, read_records
+from app.services.leaderboards import remove_item_ranking
+from app.services.reviewer_activity import summarize_reviewers
 from datetime import datetime, date
+import io
 import logging
 
 router = APIRouter(prefix="/items", tags=["items"])
 logger = logging.getLogger(__name__)
 
-@router.get("", response_model=ItemListResponse)
-@router.get("/", response_model=ItemListResponse)
+ITEM_SORT_COLUMNS = {
+    "id": Item.id,
+    "title": Item.title,
+    "created_at": Item.created_at,
+    "updated_at": Item.updated_at,
+    "avg_rating": ItemStatistics.avg_rating,
+    "ratings_count": ItemStatistics.ratings_count,
+    "views_count": ItemStatistics.views_count
+}
+
+# Column behind each field of the item list; fields left out of `fields=`
+# are not selected, and neither are the joins only they need
+ITEM_LIST_COLUMNS = {
+    "id": Item.id,
+    "title": Item.title,
+    "slug": Item.slug,
+    "template_id": Item.template_id,
+    "template_name": Template.display_name.label("template_name"),
+    "created_by": Item.created_by,
+    "created_by_name": User.username.label("created_by_name"),
+    "created_at": Item.created_at,
+    "updated_at": Item.updated_at,
+    "avg_rating": ItemStatistics.avg_rating,
+    "ratings_count": ItemStatistics.ratings_count,
+    "views_count": ItemStatistics.views_count
+}
+ITEM_STATISTICS_FIELDS = ("avg_rating", "ratings_count", "views_count")
+RATING_LIST_FIELDS = ("id", "item_id", "user_id", "username", "rating", "review_text", "created_at", "updated_at")
+
+# Facet dimensions of the item list. Constants are inlined so the expressions
+# compile identically in SELECT and GROUP BY
+ITEM_RATING_BAND = case(
+    (ItemStatistics.ratings_count > literal_column("0"), func.floor(ItemStatistics.avg_rating))
+)
+ITEM_CREATED_MONTH = func.date_trunc(literal_column("'month'"), Item.created_at)
+
+# One pass over the matching items counting all facets; grouping() tells
+# which grouping set a row belongs to
+ITEM_FACETS_QUERY = (
+    select(
+        func.grouping(Item.template_id, ITEM_RATING_BAND, ITEM_CREATED_MONTH).label("grouping"),
+        Item.template_id,
+        Template.display_name,
+        ITEM_RATING_BAND.label("rating_band"),
+        ITEM_CREATED_MONTH.label("created_month"),
+        func.count().label("count")
+    )
+    .join(Template, Item.template_id == Template.id)
+    .join(ItemStatistics, Item.id == ItemStatistics.item_id, isouter=True)
+    .group_by(func.grouping_sets(
+        tuple_(Item.template_id, Template.display_name),
+        tuple_(ITEM_RATING_BAND),
+        tuple_(ITEM_CREATED_MONTH)
+    ))
+)
+# grouping() bitmasks: a bit is set for each argument left out of the set
+FACET_BY_TEMPLATE, FACET_BY_RATING_BAND, FACET_BY_CREATED_MONTH = 0b011, 0b101, 0b110
+
+
+def collect_facets(rows) -> Dict[str, List[Dict[str, Any]]]:
+    facets = {"template": [], "rating_band": [], "created_month": []}
+    for row in rows:
+        if row.grouping == FACET_BY_TEMPLATE:
+            facets["template"].append({"value": row.template_id, "label": row.display_name, "count": row.count})
+        elif row.grouping == FACET_BY_RATING_BAND:
+            band = None if row.rating_band is None else int(row.rating_band)
+            facets["rating_band"].append({"value": band, "count": row.count})
+        elif row.grouping == FACET_BY_CREATED_MONTH:
+            facets["created_month"].append({"value": row.created_month.strftime("%Y-%m"), "count": row.count})
+
+    facets["template"].sort(key=lambda facet: (-facet["count"], facet["value"]))
+    # Highest band first, unrated last
+    facets["rating_band"].sort(key=lambda facet: (facet["value"] is None, -(facet["value"] or 0)))
+    facets["created_month"].sort(key=lambda facet: facet["value"], reverse=True)
+    return facets
+
+
+@router.get("", response_model=ItemListResponse, response_model_exclude_unset=True)
+@router.get("/", response_model=ItemListResponse, response_model_exclude_unset=True)
 async def get_items(
         pageNo: int = Query(1),
         pageSize: int = Query(10),
@@ -30,152 +118,171 @@ async def get_items(
         createdTimeEnd: Optional[date] = Query(None),
         sortField: Optional[str] = Query("created_at"),
         sortOrder: Optional[str] = Query("desc"),
-        session: Session = Depends(get_session),
+        facets: bool = Query(False),
+        selected_fields: Optional[Set[str]] = Depends(sparse_fields(ITEM_LIST_COLUMNS)),
+        session: Session = Depends(get_read_session),
         current_user: AdminUser = Depends(get_current_user)
 ):
     """
     Get a list of items with optional filtering and sorting.
     Admin users can see all items with ratings statistics.
+    With `facets=true` the response also holds the number of matching items
+    per template, rating band (integer part of the average rating, null when
+    unrated) and creation month.
     """
     # Calculate offset for pagination
     offset = (pageNo - 1) * pageSize
 
-    # Build base query - join with statistics and template
-    query = (
-        select(
-            Item,
-            Template.display_name.label("template_name"),
-            ItemStatistics.avg_rating,
-            ItemStatistics.ratings_count,
-            ItemStatistics.views_count
-        )
-        .join(Template, Item.template_id == Template.id)
-        .join(ItemStatistics, Item.id == ItemStatistics.item_id, isouter=True)
-    )
-
-    count_query = select(func.count(Item.id))
-    count_query = count_query.join(Template, Item.template_id == Template.id)
-
-    # Apply filters
-    filters = []
-
-    # Title filter
-    if title:
-        filters.append(Item.title.ilike(f"%{title}%"))
-
-    # Template filter
-    if templateId:
-        filters.append(Item.template_id == templateId)
-
-    # Date range filter
-    if createdTimeStart:
-        created_date_start = datetime.combine(createdTimeStart, datetime.min.time())
-        filters.append(Item.created_at >= created_date_start)
-
-    if createdTimeEnd:
-        created_date_end = datetime.combine(createdTimeEnd, datetime.max.time())
-        filters.append(Item.created_at <= created_date_end)
-
-    # Apply all filters
-    if filters:
-        filter_condition = and_(*filters)
-        query = query.where(filter_condition)
-        count_query = count_query.where(filter_condition)
-
-    # Apply sorting
-    sort_column_map = {
-        "id": Item.id,
-        "title": Item.title,
-        "created_at": Item.created_at,
-        "updated_at": Item.updated_at,
-        "avg_rating": ItemStatistics.avg_rating,
-        "ratings_count": ItemStatistics.ratings_count,
-        "views_count": ItemStatistics.views_count
-    }
-
-    sort_column = sort_column_map.get(sortField, Item.created_at)
+    # Lambda statements: the statement is built, and its cache key computed,
+    # once per filter combination and fieldset instead of on every request;
+    # filter values become bound parameters of the cached compiled SQL
+    query = lambda_stmt(lambda: select(Item.id))
+    for name, column in ITEM_LIST_COLUMNS.items():
+        if name != "id" and wants(selected_fields, name):
+            query += lambda s: s.add_columns(column)
+
+    if wants(selected_fields, "template_name"):
+        query += lambda s: s.join(Template, Item.template_id == Template.id)
+    if wants(selected_fields, "created_by_name"):
+        query += lambda s: s.join(User, Item.created_by == User.id, isouter=True)
+    if wants(selected_fields, *ITEM_STATISTICS_FIELDS) or sortField in ITEM_STATISTICS_FIELDS:
+        query += lambda s: s.join(ItemStatistics, Item.id == ItemStatistics.item_id, isouter=True)
+    # items.template_id is a non-null foreign key, so counting needs no join
+    count_query = lambda_stmt(lambda: select(func.count(Item.id)))
+
+    # Filters apply alike to the page, the count and the facets
+    def filtered(statement):
+        # Title filter
+        if title:
+            title_pattern = f"%{title}%"
+            statement += lambda s: s.where(Item.title.ilike(title_pattern))
+
+        # Template filter
+        if templateId:
+            statement += lambda s: s.where(Item.template_id == templateId)
+
+        # Date range filter
+        if createdTimeStart:
+            created_date_start = datetime.combine(createdTimeStart, datetime.min.time())
+            statement += lambda s: s.where(Item.created_at >= created_date_start)
+
+        if createdTimeEnd:
+            created_date_end = datetime.combine(createdTimeEnd, datetime.max.time())
+            statement += lambda s: s.where(Item.created_at <= created_date_end)
+
+        return statement
+
+    query = filtered(query)
+
+    # Apply sorting; the sort column is part of the cache key
+    sort_column = ITEM_SORT_COLUMNS.get(sortField, Item.created_at)
 
     if sortOrder.lower() == "asc":
-        query = query.order_by(sort_column)
+        query += lambda s: s.order_by(sort_column)
     else:
-        query = query.order_by(sort_column.desc())
-
-    # Get total count
-    total = session.exec(count_query).one()
+        query += lambda s: s.order_by(sort_column.desc())
+
+    # Get total count; with facets it is the sum of the template facet, so the
+    # grouped facet query replaces the count query
+    facet_counts = None
+    if facets:
+        facet_counts = collect_facets(session.execute(filtered(lambda_stmt(lambda: ITEM_FACETS_QUERY))).all())
+        total = sum(facet["count"] for facet in facet_counts["template"])
+    else:
+        total = session.execute(filtered(count_query)).scalar_one()
 
     # Apply pagination
-    query = query.offset(offset).limit(pageSize)
+    query += lambda s: s.offset(offset).limit(pageSize)
 
     # Execute query
-    results = session.exec(query).all()
+    results = session.execute(query).all()
 
-    # Prepare items list
+    # Prepare items list; items without statistics count as unrated
     items_list = []
-    for item, template_name, avg_rating, ratings_count, views_count in results:
-        # Get creator
-        creator = session.get(User, item.created_by)
-
-        items_list.append({
-            "id": item.id,
-            "title": item.title,
-            "slug": item.slug,
-            "template_id": item.template_id,
-            "template_name": template_name,
-            "created_by": item.created_by,
-            "created_by_name": creator.username if creator else None,
-            "created_at": item.created_at,
-            "updated_at": item.updated_at,
-            "avg_rating": float(avg_rating or 0),
-            "ratings_count": int(ratings_count or 0),
-            "views_count": int(views_count or 0)
-        })
-
-    return {
+    for row in results:
+        item = dict(row._mapping)
+        if "avg_rating" in item:
+            item["avg_rating"] = float(item["avg_rating"] or 0)
+        for name in ("ratings_count", "views_count"):
+            if name in item:
+                item[name] = int(item[name] or 0)
+        items_list.append(item)
+
+    response = {
         "list": items_list,
         "pageNo": pageNo,
         "pageSize": pageSize,
         "total": total
     }
+    if facet_counts is not None:
+        response["facets"] = facet_counts
+    return response
 
 
-@router.get("/{item_id}", response_model=ItemResponse)
-async def get_item_details(
-        item_id: int,
+@router.post("/import", summary="Bulk import items from CSV or NDJSON")
+async def import_items(
+        templateId: int = Query(...),
+        createdBy: Optional[int] = Query(None),
+        format: Optional[str] = Query(None),
+        file: UploadFile = File(...),
         session: Session = Depends(get_session),
         current_user: AdminUser = Depends(get_current_user)
 ):
     """
-    Get detailed information about a specific item including field values.
+    Import items of a template from a CSV or NDJSON file.
+    Columns are `title`, optional `slug` and `created_by`, and one column per template field name.
+    Invalid rows are reported individually and do not stop the import.
     """
-    # Query item with template and stats
+    template = session.get(Template, templateId)
+    if not template:
+        raise HTTPException(status_code=404, detail="Template not found")
+
+    fmt = detect_format(file.filename, format)
+    if fmt is None:
+        raise HTTPException(status_code=400, detail="Unsupported file format, expected csv or ndjson")
+
+    # Parsing and inserting a large file blocks, so it runs in the threadpool, not on the event loop
+    stream = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+    importer = ItemImporter(session, template.id, created_by=createdBy)
+    result = await run_in_threadpool(importer.run, read_records(stream, fmt))
+    if result.imported:
+        response_cache.invalidate("items")
+
+    logger.info(f"Item import into template {template.id} by admin user: {current_user.id} ({current_user.username})")
+
+    return result.to_dict()
+
+
+def load_item_details(session: Session, condition) -> Optional[Dict[str, Any]]:
+    """Item details (with template name, creator, statistics and field values) of the item matching `condition`"""
+    # Query item with template, creator and stats
     query = (
         select(
             Item,
             Template.display_name.label("template_name"),
+            User.username.label("created_by_name"),
             ItemStatistics.avg_rating,
             ItemStatistics.ratings_count,
             ItemStatistics.views_count
         )
         .join(Template, Item.template_id == Template.id)
+        .join(User, Item.created_by == User.id, isouter=True)
         .join(ItemStatistics, Item.id == ItemStatistics.item_id, isouter=True)
-        .where(Item.id == item_id)
+        .where(condition)
     )
 
     result = session.exec(query).first()
 
     if not result:
-        raise HTTPException(status_code=404, detail="Item not found")
-
-    item, template_name, avg_rating, ratings_count, views_count = result
+        return None
 
-    # Get creator
-    creator = session.get(User, item.created_by)
+    item, template_name, created_by_name, avg_rating, ratings_count, views_count = result
 
     # Get field values
     field_values_query = (
         select(ItemFieldValue, TemplateField)
         .join(TemplateField, ItemFieldValue.field_id == TemplateField.id)
-        .where(ItemFieldValue.item_id == item_id)
+        .where(ItemFieldValue.item_id == item.id)
     )
 
     field_values_result = session.exec(field_values_query).all()
@@ -183,17 +290,7 @@ async def get_item_details(
     field_values = []
     for field_value, template_field in field_values_result:
         # Determine the value based on field type
-        value = None
-        if template_field.field_type == "text" or template_field.field_type == "textarea"  or template_field.field_type == "select":
-            value = field_value.text_value
-        elif template_field.field_type == "number":
-            value = field_value.numeric_value
-        elif template_field.field_type == "date":
-            value = field_value.date_value
-        elif template_field.field_type == "boolean":
-            value = field_value.boolean_value
-        elif template_field.field_type in ["json", "multiselect"]:
-            value = field_value.json_value
+        value = read_field_value(field_value, template_field.field_type)
 
         field_values.append({
             "field_id": field_value.field_id,
@@ -210,7 +307,7 @@ async def get_item_details(
         "template_id": item.template_id,
         "template_name": template_name,
         "created_by": item.created_by,
-        "created_by_name": creator.username if creator else None,
+        "created_by_name": created_by_name,
         "created_at": item.created_at,
         "updated_at": item.updated_at,
         "avg_rating": float(avg_rating or 0),
@@ -220,12 +317,44 @@ async def get_item_details(
     }
 
 
-@router.get("/{item_id}/ratings", response_model=RatingListResponse)
+@router.get("/by-slug/{slug}", response_model=ItemResponse)
+async def get_item_by_slug(
+        slug: str,
+        session: Session = Depends(get_read_session),
+        current_user: AdminUser = Depends(get_current_user)
+):
+    """
+    Get detailed information about an item by its slug.
+    """
+    details = item_cache.get_or_load(None, slug, lambda: load_item_details(session, Item.slug == slug))
+    if details is None:
+        raise HTTPException(status_code=404, detail="Item not found")
+    return details
+
+
+@router.get("/{item_id}", response_model=ItemResponse)
+async def get_item_details(
+        item_id: int,
+        session: Session = Depends(get_read_session),
+        current_user: AdminUser = Depends(get_current_user)
+):
+    """
+    Get detailed information about a specific item including field values.
+    Details of recently requested items are served from the item cache.
+    """
+    details = item_cache.get_or_load(item_id, None, lambda: load_item_details(session, Item.id == item_id))
+    if details is None:
+        raise HTTPException(status_code=404, detail="Item not found")
+    return details
+
+
+@router.get("/{item_id}/ratings", response_model=RatingListResponse, response_model_exclude_unset=True)
 async def get_item_ratings(
         item_id: int,
         pageNo: int = Query(1),
         pageSize: int = Query(10),
-        session: Session = Depends(get_session),
+        selected_fields: Optional[Set[str]] = Depends(sparse_fields(RATING_LIST_FIELDS)),
+        session: Session = Depends(get_read_session),
         current_user: AdminUser = Depends(get_current_user)
 ):
     """
@@ -239,10 +368,20 @@ async def get_item_ratings(
     # Calculate offset for pagination
     offset = (pageNo - 1) * pageSize
 
-    # Query ratings
-    query = select(UserRating).where(UserRating.item_id == item_id)
+    # Query ratings, loading only the requested columns
+    rating_columns = [name for name in RATING_LIST_FIELDS if name != "username" and wants(selected_fields, name)]
+    query = (
+        select(UserRating)
+        .where(UserRating.item_id == item_id)
+        .options(load_only(*(getattr(UserRating, name) for name in rating_columns)))
+    )
     count_query = select(func.count(UserRating.id)).where(UserRating.item_id == item_id)
 
+    # Usernames come from the same query
+    with_username = wants(selected_fields, "username")
+    if with_username:
+        query = query.add_columns(User.username).join(User, UserRating.user_id == User.id, isouter=True)
+
     # Sort by creation date (newest first)
     query = query.order_by(UserRating.created_at.desc())
 
@@ -253,24 +392,18 @@ async def get_item_ratings(
     query = query.offset(offset).limit(pageSize)
 
     # Execute query
-    ratings = session.exec(query).all()
+    rows = session.execute(query).all()
 
     # Format response
     ratings_list = []
-    for rating in ratings:
-        # Get user info
-        user = session.get(User, rating.user_id)
-
-        ratings_list.append({
-            "id": rating.id,
-            "item_id": rating.item_id,
-            "user_id": rating.user_id,
-            "username": user.username if user else "Unknown",
-            "rating": float(rating.rating),
-            "review_text": rating.review_text,
-            "created_at": rating.created_at,
-            "updated_at": rating.updated_at
-        })
+    for row in rows:
+        rating = row[0]
+        values = {name: getattr(rating, name) for name in rating_columns}
+        if "rating" in values:
+            values["rating"] = float(values["rating"])
+        if with_username:
+            values["username"] = row.username or "Unknown"
+        ratings_list.append(values)
 
     return {
         "list": ratings_list,
@@ -306,13 +439,18 @@ async def delete_item(
     ).all():
         session.delete(field_value)
 
-    # Delete ratings
+    # Delete ratings, then recompute the activity of their reviewers
+    reviewer_ids = set()
     for rating in session.exec(
             select(UserRating).where(UserRating.item_id == item_id)
     ).all():
+        reviewer_ids.add(rating.user_id)
         session.delete(rating)
+    session.flush()
+    summarize_reviewers(session, reviewer_ids)
 
-    # Delete statistics
+    # Delete statistics and the item's leaderboard ranking
+    remove_item_ranking(session, item_id)
     statistics = session.exec(
         select(ItemStatistics).where(ItemStatistics.item_id == item_id)
     ).first()
@@ -322,6 +460,8 @@ async def delete_item(
     # Delete the item
     session.delete(item)
     session.commit()
+    response_cache.invalidate("items", "ratings", "leaderboards", "reviewers")
+    item_cache.invalidate(item_id)
 
     logger.info(f"Deleted item ID: {item_id} by admin user: {current_user.id} ({current_user.username})")
 
@@ -1,18 +1,32 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import Float, cast, literal_column, tuple_
+from sqlalchemy.dialects.postgresql import ARRAY, aggregate_order_by, array
 from sqlmodel import select, Session, func
-from app.db.session import get_session
+from starlette.concurrency import run_in_threadpool
+from app.db.session import get_read_session
 from app.models.item import Item
+from app.models.item_ranking import ItemRanking
+from app.models.reviewer_activity import ReviewerActivity
+from app.models.user import User
+from app.models.user_rating import UserRating
+from app.models.template_rating_prior import TemplateRatingPrior
 from app.models.template import Template
 from app.models.item_statistics import ItemStatistics
 from app.api.v1.endpoints.users import get_current_user
 from app.models.admin_user import AdminUser
-from typing import Dict
+from app.core.response_cache import cached_response
+from app.services.leaderboards import LEADERBOARD_MIN_RATINGS, refresh_leaderboards
+from app.services.reviewer_activity import refresh_reviewers
+from app.lib.cursors import decode_cursor, encode_cursor
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
 
 router = APIRouter(prefix="/statistics", tags=["statistics"])
 
 @router.get("/total", summary="Get total statistics")
+@cached_response(ttl=30, tags=("items", "templates", "ratings"))
 async def get_total_statistics(
-    session: Session = Depends(get_session),
+    session: Session = Depends(get_read_session),
     current_user: AdminUser = Depends(get_current_user)
 ) -> Dict:
     """
@@ -49,4 +63,286 @@ async def get_total_statistics(
             "average_rating": round(float(avg_rating_result[0]), 2),
             "total_ratings": avg_rating_result[1] or 0
         }
-    } 
\ No newline at end of file
+    }
+
+
+# Percentiles of the item ratings reported per template
+TEMPLATE_RATING_PERCENTILES = (0.25, 0.5, 0.75, 0.9)
+
+
+def template_statistics_query(most_viewed: int):
+    """
+    One row per template: counts, rating mean and percentiles, and its most
+    viewed items as a JSON array. row_number() ranks the items of each
+    template by views in the same pass that feeds the aggregates, and the
+    percentiles are one ordered-set aggregate over the rated items.
+    """
+    ranked = (
+        select(
+            Item.template_id,
+            Item.id,
+            Item.title,
+            Item.slug,
+            ItemStatistics.avg_rating,
+            ItemStatistics.ratings_count,
+            ItemStatistics.views_count,
+            func.row_number().over(
+                partition_by=Item.template_id,
+                order_by=(ItemStatistics.views_count.desc().nulls_last(), Item.id)
+            ).label("views_rank")
+        )
+        .outerjoin(ItemStatistics, ItemStatistics.item_id == Item.id)
+        .subquery("ranked")
+    )
+    rated = ranked.c.ratings_count > 0
+    return (
+        select(
+            Template.id,
+            Template.name,
+            Template.display_name,
+            func.count(ranked.c.id).label("item_count"),
+            func.count(ranked.c.id).filter(rated).label("rated_item_count"),
+            func.coalesce(func.sum(ranked.c.ratings_count), 0).label("ratings_count"),
+            func.coalesce(func.sum(ranked.c.views_count), 0).label("views_count"),
+            # Mean over all ratings: item averages weighted by their rating counts
+            (
+                func.sum(ranked.c.avg_rating * ranked.c.ratings_count)
+                / func.nullif(func.sum(ranked.c.ratings_count), 0)
+            ).label("mean_rating"),
+            func.percentile_cont(
+                cast(array([literal_column(repr(p)) for p in TEMPLATE_RATING_PERCENTILES]), ARRAY(Float()))
+            ).within_group(ranked.c.avg_rating).filter(rated).label("percentiles"),
+            func.json_agg(
+                aggregate_order_by(
+                    func.json_build_object(
+                        "item_id", ranked.c.id,
+                        "title", ranked.c.title,
+                        "slug", ranked.c.slug,
+                        "views_count", func.coalesce(ranked.c.views_count, 0)
+                    ),
+                    ranked.c.views_rank
+                )
+            ).filter(ranked.c.views_rank <= most_viewed).label("most_viewed")
+        )
+        .outerjoin(ranked, ranked.c.template_id == Template.id)
+        .group_by(Template.id)
+        .order_by(Template.id)
+    )
+
+
+def _rounded(value) -> float:
+    return None if value is None else round(float(value), 2)
+
+
+@router.get("/templates", summary="Get statistics per template")
+@cached_response(ttl=60, tags=("items", "templates", "ratings"))
+async def get_template_statistics(
+    mostViewed: int = Query(5, ge=0, le=50),
+    session: Session = Depends(get_read_session),
+    current_user: AdminUser = Depends(get_current_user)
+) -> Dict:
+    """
+    Statistics of every template in one query, for the template overview:
+    item and rating counts, mean rating over all ratings, median and
+    percentiles of the items' average ratings (rated items only), total
+    views and the `mostViewed` most viewed items.
+    """
+    templates: List[Dict] = []
+    for row in session.exec(template_statistics_query(mostViewed)).all():
+        percentiles = dict(zip(TEMPLATE_RATING_PERCENTILES, row.percentiles or ()))
+        templates.append({
+            "template_id": row.id,
+            "name": row.name,
+            "display_name": row.display_name,
+            "item_count": row.item_count,
+            "rated_item_count": row.rated_item_count,
+            "ratings_count": row.ratings_count,
+            "views_count": row.views_count,
+            "mean_rating": _rounded(row.mean_rating),
+            "median_rating": _rounded(percentiles.get(0.5)),
+            "rating_percentiles": {f"p{round(p * 100)}": _rounded(percentiles.get(p)) for p in TEMPLATE_RATING_PERCENTILES},
+            "most_viewed": row.most_viewed or []
+        })
+    return {"list": templates}
+
+
+@router.get("/leaderboards/{template_id}", summary="Get the top rated items of a template")
+@cached_response(ttl=60, tags=("leaderboards",))
+async def get_leaderboard(
+    template_id: int,
+    limit: int = Query(10, ge=1, le=100),
+    session: Session = Depends(get_read_session),
+    current_user: AdminUser = Depends(get_current_user)
+) -> Dict:
+    """
+    Top rated items of a template by weighted score: the item's average
+    rating pulled towards the template mean by ADMIN_LEADERBOARD_MIN_RATINGS
+    virtual ratings, so items with few ratings do not outrank established ones.
+    Scores are precomputed in item_rankings and refreshed in the background.
+    """
+    prior = session.get(TemplateRatingPrior, template_id)
+    if prior is None:
+        if session.get(Template, template_id) is None:
+            raise HTTPException(status_code=404, detail="Template not found")
+
+    rows = session.exec(
+        select(
+            ItemRanking.item_id,
+            Item.title,
+            Item.slug,
+            ItemRanking.score,
+            ItemRanking.avg_rating,
+            ItemRanking.ratings_count
+        )
+        .join(Item, Item.id == ItemRanking.item_id)
+        .where(ItemRanking.template_id == template_id)
+        .order_by(ItemRanking.score.desc(), ItemRanking.item_id)
+        .limit(limit)
+    ).all()
+
+    return {
+        "template_id": template_id,
+        "min_ratings": LEADERBOARD_MIN_RATINGS,
+        "template_mean": round(prior.scored_mean, 4) if prior else None,
+        "refreshed_at": prior.refreshed_at if prior else None,
+        "list": [
+            {
+                "rank": rank,
+                "item_id": row.item_id,
+                "title": row.title,
+                "slug": row.slug,
+                "score": round(row.score, 4),
+                "avg_rating": row.avg_rating,
+                "ratings_count": row.ratings_count
+            }
+            for rank, row in enumerate(rows, start=1)
+        ]
+    }
+
+
+@router.post("/leaderboards/refresh", summary="Refresh the leaderboards now")
+async def refresh_leaderboards_now(
+    full: bool = Query(False),
+    current_user: AdminUser = Depends(get_current_user)
+) -> Dict:
+    """
+    Apply the statistics changed since the last refresh; `full=true` rebuilds
+    every ranking. Refreshes also run every ADMIN_LEADERBOARD_REFRESH_SECONDS.
+    """
+    result = await run_in_threadpool(refresh_leaderboards, full)
+    if result is None:
+        raise HTTPException(status_code=409, detail="A refresh is already running")
+    return result
+
+
+# Orders of the reviewer list, largest or latest first, each backed by an index on reviewer_activity
+REVIEWER_SORTS = {
+    "ratings": ReviewerActivity.ratings_count,
+    "recent": ReviewerActivity.last_rated_at,
+    "deviation": ReviewerActivity.avg_deviation,
+}
+# Window of the recentRatingsCount of each reviewer
+RECENT_ACTIVITY_DAYS = 30
+
+
+def _cursor_value(sort: str, value):
+    """Sort value of a decoded cursor (cursors hold datetimes as strings)"""
+    if sort == "recent":
+        return datetime.fromisoformat(value)
+    if sort == "ratings":
+        return int(value)
+    return float(value)
+
+
+@router.get("/reviewers", summary="Get reviewers by activity")
+@cached_response(ttl=60, tags=("reviewers",))
+async def get_reviewers(
+    sort: str = Query("ratings", description="ratings, recent or deviation"),
+    minRatings: int = Query(1, ge=1),
+    cursor: Optional[str] = None,
+    pageSize: int = Query(20, ge=1, le=100),
+    session: Session = Depends(get_read_session),
+    current_user: AdminUser = Depends(get_current_user)
+) -> Dict:
+    """
+    Reviewers (users with ratings) ordered by rating count (`ratings`), last
+    rating (`recent`) or mean absolute deviation of their ratings from the
+    other ratings of the same items (`deviation`), largest first. Pass the
+    `nextCursor` of a page as `cursor` to get the next one. Reads the
+    reviewer_activity summaries, refreshed in the background.
+    """
+    sort_column = REVIEWER_SORTS.get(sort)
+    if sort_column is None:
+        raise HTTPException(status_code=400, detail=f"sort must be one of: {', '.join(REVIEWER_SORTS)}")
+
+    recent_since = datetime.utcnow() - timedelta(days=RECENT_ACTIVITY_DAYS)
+    # Counted per row of the page with ix_user_ratings_user_id_created_at
+    recent_ratings = (
+        select(func.count(UserRating.id))
+        .where(UserRating.user_id == ReviewerActivity.user_id, UserRating.created_at >= recent_since)
+        .scalar_subquery()
+    )
+    query = (
+        select(ReviewerActivity, User.username, User.nickname, recent_ratings.label("recent_ratings_count"))
+        .join(User, User.id == ReviewerActivity.user_id)
+        .order_by(sort_column.desc(), ReviewerActivity.user_id.desc())
+        .limit(pageSize + 1)
+    )
+    if minRatings > 1:
+        query = query.where(ReviewerActivity.ratings_count >= minRatings)
+    if sort == "deviation":
+        query = query.where(ReviewerActivity.avg_deviation.is_not(None))
+    if cursor:
+        try:
+            value, user_id = decode_cursor(cursor, 2)
+            after = (_cursor_value(sort, value), int(user_id))
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        query = query.where(tuple_(sort_column, ReviewerActivity.user_id) < after)
+
+    # One extra row tells whether there is a next page
+    rows = session.exec(query).all()
+    has_more = len(rows) > pageSize
+    rows = rows[:pageSize]
+
+    next_cursor = None
+    if has_more:
+        last = rows[-1][0]
+        next_cursor = encode_cursor(getattr(last, sort_column.key), last.user_id)
+
+    return {
+        "list": [
+            {
+                "user_id": activity.user_id,
+                "username": username,
+                "nickname": nickname,
+                "ratings_count": activity.ratings_count,
+                "recent_ratings_count": recent_count,
+                "avg_rating": _rounded(activity.avg_rating),
+                "avg_deviation": _rounded(activity.avg_deviation),
+                "avg_bias": _rounded(activity.avg_bias),
+                "first_rated_at": activity.first_rated_at,
+                "last_rated_at": activity.last_rated_at
+            }
+            for activity, username, nickname, recent_count in rows
+        ],
+        "pageSize": pageSize,
+        "nextCursor": next_cursor
+    }
+
+
+@router.post("/reviewers/refresh", summary="Refresh the reviewer activity now")
+async def refresh_reviewers_now(
+    full: bool = Query(False),
+    current_user: AdminUser = Depends(get_current_user)
+) -> Dict:
+    """
+    Summarize the reviewers whose ratings changed since the last refresh;
+    `full=true` rebuilds every summary, also measuring all deviations against
+    the current item averages. Refreshes also run every
+    ADMIN_REVIEWER_REFRESH_SECONDS.
+    """
+    result = await run_in_threadpool(refresh_reviewers, full)
+    if result is None:
+        raise HTTPException(status_code=409, detail="A refresh is already running")
+    return result
@@ -1,18 +1,43 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Header, Response
 from sqlmodel import select, Session, func, delete
-from typing import List, Optional, Dict, Any
-from app.db.session import get_session
+from sqlalchemy import lambda_stmt
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import aliased
+from typing import List, Optional, Dict, Any, Set
+from app.db.session import get_session, get_read_session
 from app.models.template import Template
 from app.models.template_field import TemplateField
+from app.models.template_rating_prior import TemplateRatingPrior
 from app.models.admin_user import AdminUser
 from app.schemas.template import TemplateCreate, TemplateResponse
 from app.api.v1.endpoints.users import get_current_user
+from app.lib.fieldsets import project, sparse_fields, wants
+from app.services.template_cache import template_cache, etag_matches
+from app.core.response_cache import cached_response, response_cache
+from app.services.template_clone import copy_template_contents
+from app.services.template_fields import (
+    FieldDiffError,
+    apply_field_diff,
+    compute_field_diff,
+    field_payload,
+    insert_fields,
+    load_field_rows,
+)
 from datetime import datetime
 import logging
 
 router = APIRouter(prefix="/templates", tags=["templates"])
 logger = logging.getLogger(__name__)
 
+Creator = aliased(AdminUser, name="creator")
+Updater = aliased(AdminUser, name="updater")
+
+TEMPLATE_LIST_FIELDS = (
+    "id", "name", "display_name", "description", "full_marks", "status", "is_published",
+    "created_at", "updated_at", "created_by", "updated_by", "creator_name", "updater_name",
+    "field_count", "fields"
+)
+
 @router.post("", status_code=status.HTTP_201_CREATED, response_model=TemplateResponse)
 @router.post("/", status_code=status.HTTP_201_CREATED, response_model=TemplateResponse)
 async def create_template(
@@ -33,24 +58,11 @@ async def create_template(
     session.commit()
     session.refresh(db_template)
 
-    # Create template fields
-    for field in template.fields:
-        db_field = TemplateField(
-            template_id=db_template.id,
-            name=field.name,
-            display_name=field.display_name,
-            description=field.description,
-            field_type=field.field_type,
-            is_required=field.is_required,
-            is_searchable=field.is_searchable,
-            is_filterable=field.is_filterable,
-            display_order=field.display_order,
-            data_source_id=field.data_source_id,
-            validation_rules=field.validation_rules
-        )
-        session.add(db_field)
+    # Create template fields with a single multi-row insert
+    insert_fields(session, db_template.id, [field_payload(field) for field in template.fields])
 
     session.commit()
+    response_cache.invalidate("templates")
 
     # Load creator name
     creator = session.get(AdminUser, current_user.id)
@@ -100,15 +112,17 @@ async def update_template(
         session: Session = Depends(get_session),
         current_user: AdminUser = Depends(get_current_user)
 ):
-    logger.info(f"=== TEMPLATE UPDATE START ===")
-    logger.info(f"Template ID: {template_id}")
-    logger.info(f"Current User: {current_user.username} (ID: {current_user.id})")
-
     # Check if template exists
     db_template = session.get(Template, template_id)
     if not db_template:
         raise HTTPException(status_code=404, detail="Template not found")
 
+    # Compare the payload with the stored fields
+    try:
+        diff = compute_field_diff(load_field_rows(session, template_id), template.fields)
+    except FieldDiffError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
     # Update template fields only if provided
     db_template.name = template.name
     db_template.display_name = template.display_name
@@ -116,65 +130,22 @@ async def update_template(
     db_template.full_marks = template.full_marks
     db_template.updated_by = current_user.id
     db_template.updated_at = datetime.utcnow()
+    session.add(db_template)
+    session.flush()
 
-    # Fetch existing fields
-    existing_fields = {
-        field.id: field for field in session.exec(
-            select(TemplateField).where(TemplateField.template_id == template_id)
-        ).all()
-    }
-
-    # Process incoming fields
-    incoming_field_ids = set()
-    for field_data in template.fields:
-        if field_data.id is not None and field_data.id != -1:
-            # Update existing field
-            if field_data.id in existing_fields:
-                db_field = existing_fields[field_data.id]
-                db_field.name = field_data.name
-                db_field.display_name = field_data.display_name
-                db_field.description = field_data.description
-                db_field.field_type = field_data.field_type
-                db_field.is_required = field_data.is_required
-                db_field.is_searchable = field_data.is_searchable
-                db_field.is_filterable = field_data.is_filterable
-                db_field.display_order = field_data.display_order
-                db_field.data_source_id = field_data.data_source_id
-                db_field.validation_rules = field_data.validation_rules
-                session.add(db_field)
-                incoming_field_ids.add(field_data.id)
-            else:
-                raise HTTPException(status_code=400, detail=f"Field with id {field_data.id} does not exist")
-        else:
-            # Check for duplicate field name
-            existing_field_names = {field.name for field in existing_fields.values()}
-            if field_data.name in existing_field_names:
-                raise HTTPException(status_code=400,
-                                    detail=f"Field with name {field_data.name} already exists for this template")
-            # Create new field
-            db_field = TemplateField(
-                template_id=db_template.id,
-                name=field_data.name,
-                display_name=field_data.display_name,
-                description=field_data.description,
-                field_type=field_data.field_type,
-                is_required=field_data.is_required,
-                is_searchable=field_data.is_searchable,
-                is_filterable=field_data.is_filterable,
-                display_order=field_data.display_order,
-                data_source_id=field_data.data_source_id,
-                validation_rules=field_data.validation_rules
-            )
-            session.add(db_field)
-
-    # Delete fields not in the payload
-    for field_id in existing_fields:
-        if field_id not in incoming_field_ids:
-            session.delete(existing_fields[field_id])
+    # Apply inserts, updates and deletes with one bulk statement each
+    apply_field_diff(session, template_id, diff, db_template.updated_at)
 
     session.commit()
+    template_cache.bump(template_id)
+    response_cache.invalidate("templates")
     session.refresh(db_template)
 
+    logger.info(
+        f"Updated template ID: {template_id} by user: {current_user.id}, {current_user.username} "
+        f"(fields: +{len(diff.inserts)} ~{len(diff.updates)} -{len(diff.deletes)})"
+    )
+
     # Load creator and updater
     creator = session.get(AdminUser, db_template.created_by) if db_template.created_by else None
     updater = session.get(AdminUser, current_user.id)
@@ -217,74 +188,100 @@ async def update_template(
 
 @router.get("")
 @router.get("/")
+@cached_response(ttl=60, tags=("templates", "admin_users"))
 async def get_templates(
         page_no: int = Query(1, alias="pageNo"),
         page_size: int = Query(10, alias="pageSize"),
         search: Optional[str] = None,
         is_published: Optional[bool] = None,
         status: Optional[str] = None,  # Added status filter similar to your frontend
-        session: Session = Depends(get_session)
+        selected_fields: Optional[Set[str]] = Depends(sparse_fields(TEMPLATE_LIST_FIELDS)),
+        session: Session = Depends(get_read_session)
 ):
     # Calculate offset for pagination
     offset = (page_no - 1) * page_size
 
-    # Construct base query
-    query = select(Template)
-    count_query = select(func.count(Template.id))
+    # Lambda statements are built and keyed once per filter combination
+    # (see get_items); creator and updater names come from the same statement,
+    # joined only when requested
+    query = lambda_stmt(lambda: select(Template))
+    if wants(selected_fields, "creator_name"):
+        query += lambda s: (
+            s.add_columns(Creator.username.label("creator_name"))
+            .join(Creator, Template.created_by == Creator.id, isouter=True)
+        )
+    if wants(selected_fields, "updater_name"):
+        query += lambda s: (
+            s.add_columns(Updater.username.label("updater_name"))
+            .join(Updater, Template.updated_by == Updater.id, isouter=True)
+        )
+    count_query = lambda_stmt(lambda: select(func.count(Template.id)))
 
     # Add filters
     if is_published is not None:
-        query = query.where(Template.is_published == is_published)
-        count_query = count_query.where(Template.is_published == is_published)
+        query += lambda s: s.where(Template.is_published == is_published)
+        count_query += lambda s: s.where(Template.is_published == is_published)
 
     # Handle status filter (convert from string to boolean)
-    if status is not None:
-        if status.lower() == "published":
-            query = query.where(Template.is_published == True)
-            count_query = count_query.where(Template.is_published == True)
-        elif status.lower() == "draft":
-            query = query.where(Template.is_published == False)
-            count_query = count_query.where(Template.is_published == False)
+    if status is not None and status.lower() in ("published", "draft"):
+        published = status.lower() == "published"
+        query += lambda s: s.where(Template.is_published == published)
+        count_query += lambda s: s.where(Template.is_published == published)
 
     # Add search filter if provided
     if search:
         search_term = f"%{search}%"
-        query = query.where(
+        query += lambda s: s.where(
             (Template.name.ilike(search_term)) |
             (Template.display_name.ilike(search_term)) |
             (Template.description.ilike(search_term))
         )
-        count_query = count_query.where(
+        count_query += lambda s: s.where(
             (Template.name.ilike(search_term)) |
             (Template.display_name.ilike(search_term)) |
             (Template.description.ilike(search_term))
         )
 
     # Get total count for pagination
-    total = session.exec(count_query).one()
+    total = session.execute(count_query).scalar_one()
 
     # Apply pagination
-    query = query.offset(offset).limit(page_size)
+    query += lambda s: s.offset(offset).limit(page_size)
 
     # Execute query
-    templates = session.exec(query).all()
+    rows = session.execute(query).all()
+
+    # Fields of every template on the page in one query; a field count alone
+    # is counted by the database
+    template_ids = [row[0].id for row in rows]
+    fields_by_template: Dict[int, List[TemplateField]] = {template_id: [] for template_id in template_ids}
+    field_counts: Dict[int, int] = {}
+    if template_ids and wants(selected_fields, "fields"):
+        fields = session.execute(lambda_stmt(
+            lambda: select(TemplateField)
+            .where(TemplateField.template_id.in_(template_ids))
+            .order_by(TemplateField.template_id, TemplateField.id)
+        )).scalars().all()
+        for field in fields:
+            fields_by_template[field.template_id].append(field)
+        field_counts = {template_id: len(template_fields) for template_id, template_fields in fields_by_template.items()}
+    elif template_ids and wants(selected_fields, "field_count"):
+        field_counts = dict(session.execute(lambda_stmt(
+            lambda: select(TemplateField.template_id, func.count(TemplateField.id))
+            .where(TemplateField.template_id.in_(template_ids))
+            .group_by(TemplateField.template_id)
+        )).all())
 
     # Process templates
     template_list = []
-    for tmpl in templates:
-        # Get creator and updater
-        creator = session.get(AdminUser, tmpl.created_by) if tmpl.created_by else None
-        updater = session.get(AdminUser, tmpl.updated_by) if tmpl.updated_by else None
-
-        # Get fields
-        fields = session.exec(
-            select(TemplateField).where(TemplateField.template_id == tmpl.id)
-        ).all()
+    for row in rows:
+        tmpl = row[0]
+        fields = fields_by_template[tmpl.id]
 
         # Get field count
-        field_count = len(fields)
+        field_count = field_counts.get(tmpl.id, 0)
 
-        template_list.append({
+        template_list.append(project({
             "id": tmpl.id,
             "name": tmpl.name,
             "displayName": tmpl.display_name,  # Convert to camelCase for frontend
@@ -296,8 +293,8 @@ async def get_templates(
             "updatedAt": tmpl.updated_at.isoformat(),
             "createdBy": tmpl.created_by,
             "updatedBy": tmpl.updated_by,
-            "creatorName": creator.username if creator else None,
-            "updaterName": updater.username if updater else None,
+            "creatorName": getattr(row, "creator_name", None),
+            "updaterName": getattr(row, "updater_name", None),
             "fieldCount": field_count,  # Add field count for the UI
             "fields": [
                 {
@@ -315,7 +312,7 @@ async def get_templates(
                 }
                 for field in fields
             ]
-        })
+        }, selected_fields))
 
     # Return in the same format as your users endpoint
     return {
@@ -326,12 +323,11 @@ async def get_templates(
     }
 
 
-@router.get("/{template_id}", response_model=TemplateResponse)
-async def get_template(template_id: int, session: Session = Depends(get_session)):
+def load_template_definition(session: Session, template_id: int) -> Optional[Dict[str, Any]]:
     template = session.get(Template, template_id)
 
     if not template:
-        raise HTTPException(status_code=404, detail="Template not found")
+        return None
 
     # Get creator and updater
     creator = session.get(AdminUser, template.created_by) if template.created_by else None
@@ -374,6 +370,26 @@ async def get_template(template_id: int, session: Session = Depends(get_session)
     }
 
 
+@router.get("/{template_id}", response_model=TemplateResponse)
+async def get_template(
+        template_id: int,
+        response: Response,
+        if_none_match: Optional[str] = Header(None),
+        session: Session = Depends(get_session)
+):
+    # Served from the definition cache without touching the database on a hit
+    cached = template_cache.get_or_load(template_id, lambda: load_template_definition(session, template_id))
+
+    if cached is None:
+        raise HTTPException(status_code=404, detail="Template not found")
+
+    if etag_matches(if_none_match, cached.etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": cached.etag})
+
+    response.headers["ETag"] = cached.etag
+    return cached.payload
+
+
 @router.patch("/{template_id}/publish")
 async def publish_template(
         template_id: int,
@@ -391,6 +407,8 @@ async def publish_template(
 
     session.add(template)
     session.commit()
+    template_cache.bump(template_id)
+    response_cache.invalidate("templates")
 
     return {"status": "success", "message": "Template published successfully"}
 
@@ -412,6 +430,8 @@ async def unpublish_template(
 
     session.add(template)
     session.commit()
+    template_cache.bump(template_id)
+    response_cache.invalidate("templates")
 
     return {"status": "success", "message": "Template unpublished successfully"}
 
@@ -432,9 +452,16 @@ async def delete_template(
         delete(TemplateField).where(TemplateField.template_id == template_id)
     )
 
+    # Its leaderboard prior; the template has no items left to rank
+    session.exec(
+        delete(TemplateRatingPrior).where(TemplateRatingPrior.template_id == template_id)
+    )
+
     # Delete the template
     session.delete(template)
     session.commit()
+    template_cache.bump(template_id)
+    response_cache.invalidate("templates")
 
     logger.info(f"Deleting template ID: {template_id} by user: {current_user.id}, {current_user.username}")
 
@@ -444,6 +471,7 @@ async def delete_template(
 @router.post("/{template_id}/clone")
 async def clone_template(
         template_id: int,
+        include_items: bool = Query(False, alias="includeItems"),
         session: Session = Depends(get_session),
         current_user: AdminUser = Depends(get_current_user)
 ):
@@ -462,43 +490,35 @@ async def clone_template(
         created_by=current_user.id,
         updated_by=current_user.id
     )
-    session.add(new_template)
-    session.flush()  # Get the new ID
-
-    # Get all fields from the original template
-    original_fields = session.exec(
-        select(TemplateField).where(TemplateField.template_id == template_id)
-    ).all()
+    # Copy fields (and items with their field values) inside the database
+    try:
+        session.add(new_template)
+        session.flush()  # Get the new ID
+        copied = copy_template_contents(session, template_id, new_template.id, include_items=include_items)
+        session.commit()
+    except IntegrityError as e:
+        session.rollback()
+        logger.warning(f"Clone of template {template_id} failed: {e.orig}")
+        raise HTTPException(status_code=409, detail="Template could not be cloned because of conflicting data")
 
-    # Clone each field
-    for field in original_fields:
-        new_field = TemplateField(
-            template_id=new_template.id,
-            name=field.name,
-            display_name=field.display_name,
-            description=field.description,
-            field_type=field.field_type,
-            is_required=field.is_required,
-            is_searchable=field.is_searchable,
-            is_filterable=field.is_filterable,
-            display_order=field.display_order,
-            data_source_id=field.data_source_id,
-            validation_rules=field.validation_rules
-        )
-        session.add(new_field)
-
-    session.commit()
     session.refresh(new_template)
+    template_cache.bump(new_template.id)
+    response_cache.invalidate("templates", "items")
 
     # Load creator name
     creator = session.get(AdminUser, current_user.id)
     creator_name = creator.username if creator else None
 
-    logger.info(f"Clone template: {new_template.id}, {new_template.name} by user: {current_user.id}, {current_user.username}")
+    logger.info(
+        f"Clone template: {new_template.id}, {new_template.name} by user: {current_user.id}, {current_user.username} "
+        f"({copied.fields} fields, {copied.items} items)"
+    )
 
     return {
         "status": "success",
         "message": "Template cloned successfully",
+        "cloned_fields": copied.fields,
+        "cloned_items": copied.items,
         "template": {
             "id": new_template.id,
             "name": new_template.name,
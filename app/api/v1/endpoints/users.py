@@ -1,19 +1,37 @@
 import os
+from typing import Optional, Set
 from fastapi import APIRouter, Depends, HTTPException, status
 from app.core.security import oauth2_scheme, hash_password
 from jose import jwt, JWTError
 from sqlmodel import select
 from sqlalchemy import func
-from sqlalchemy.orm import joinedload
-from app.db.session import get_session
+from sqlalchemy.orm import joinedload, load_only
+from app.db.session import get_session, get_read_session
 from app.models.admin_user import AdminUser
 from app.models.admin_role import AdminRole
 from app.schemas.user import UserCreate, UserUpdate, UserResponse
+from app.services.template_cache import template_cache
+from app.core.response_cache import cached_response, response_cache
+from app.lib.fieldsets import sparse_fields, wants
 from datetime import datetime
 
 SECRET_KEY = os.getenv("ADMIN_JWT_SECRET", "admin_default_secret_key")
 router = APIRouter(prefix="/users", tags=["users"])
 
+# Fields of the user list and the AdminUser column behind each one
+USER_LIST_FIELDS = (
+    "id", "username", "email", "role_id", "role_name", "created_time", "updated_time", "updated_by", "updated_by_name"
+)
+USER_LIST_COLUMNS = {
+    "id": AdminUser.id,
+    "username": AdminUser.username,
+    "email": AdminUser.email,
+    "role_id": AdminUser.role_id,
+    "created_time": AdminUser.created_time,
+    "updated_time": AdminUser.updated_time,
+    "updated_by": AdminUser.updated_by,
+}
+
 async def get_current_user(token: str = Depends(oauth2_scheme), session=Depends(get_session)):
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=["HS256"])
@@ -62,7 +80,8 @@ async def read_users_me(current_user: AdminUser = Depends(get_current_user), ses
     }
 
 @router.get("/roles")
-async def get_all_roles(session=Depends(get_session)):
+@cached_response(ttl=300, tags=("roles",))
+async def get_all_roles(session=Depends(get_read_session)):
     query = select(AdminRole)
     result = session.execute(query)
     roles = result.scalars().all()
@@ -70,11 +89,24 @@ async def get_all_roles(session=Depends(get_session)):
 
 @router.get("", summary="Get users by pagination")
 @router.get("/", summary="Get users by pagination")
-async def get_users_paginated(pageNo: int = 1, pageSize: int = 10, session=Depends(get_session)):
+async def get_users_paginated(
+        pageNo: int = 1,
+        pageSize: int = 10,
+        selected_fields: Optional[Set[str]] = Depends(sparse_fields(USER_LIST_FIELDS)),
+        session=Depends(get_read_session)
+):
     offset = (pageNo - 1) * pageSize
 
-    # Query for paginated users and eagerly load the 'role' relationship
-    statement = select(AdminUser).offset(offset).limit(pageSize).options(joinedload(AdminUser.role))
+    # Query for paginated users with only the requested columns
+    # (updated_by is needed to look up updater names)
+    columns = [
+        column for name, column in USER_LIST_COLUMNS.items()
+        if wants(selected_fields, name) or (name == "updated_by" and wants(selected_fields, "updated_by_name"))
+    ]
+    statement = select(AdminUser).offset(offset).limit(pageSize).options(load_only(*columns))
+    # Eagerly load the 'role' relationship when role names are requested
+    if wants(selected_fields, "role_name"):
+        statement = statement.options(joinedload(AdminUser.role))
     result = session.execute(statement)
     users_list = result.scalars().all()
 
@@ -83,28 +115,32 @@ async def get_users_paginated(pageNo: int = 1, pageSize: int = 10, session=Depen
     total = session.execute(count_statement).scalar_one()
 
     # Collect all unique updated_by IDs from the user list
-    updated_by_ids = {user.updated_by for user in users_list if user.updated_by is not None}
     updater_mapping = {}
+    updated_by_ids = set()
+    if wants(selected_fields, "updated_by_name"):
+        updated_by_ids = {user.updated_by for user in users_list if user.updated_by is not None}
     if updated_by_ids:
         statement_updater = select(AdminUser).where(AdminUser.id.in_(updated_by_ids))
         result_updater = session.execute(statement_updater)
         updaters = result_updater.scalars().all()
         updater_mapping = {u.id: u.username for u in updaters}
 
-    # Enrich each user with roleName and updatedByName
+    # Enrich each user with roleName and updatedByName; only requested fields
+    # are read, the other columns were never loaded (ResponseWrapperMiddleware
+    # camelCases the keys)
     enriched_users = []
     for user in users_list:
-        enriched_users.append({
-            "id": user.id,
-            "username": user.username,
-            "email": user.email,
-            "roleId": user.role_id,
-            "roleName": user.role.name if user.role else None,
-            "createdTime": user.created_time,
-            "updatedTime": user.updated_time,
-            "updatedBy": user.updated_by,
-            "updatedByName": updater_mapping.get(user.updated_by, None)
-        })
+        values = {}
+        for name in USER_LIST_FIELDS:
+            if not wants(selected_fields, name):
+                continue
+            if name == "role_name":
+                values[name] = user.role.name if user.role else None
+            elif name == "updated_by_name":
+                values[name] = updater_mapping.get(user.updated_by, None)
+            else:
+                values[name] = getattr(user, name)
+        enriched_users.append(values)
 
     return {
         "list": enriched_users,
@@ -161,6 +197,7 @@ async def create_user(
     session.add(db_user)
     session.commit()
     session.refresh(db_user)
+    response_cache.invalidate("admin_users")
 
     return {
         "id": db_user.id,
@@ -201,6 +238,8 @@ async def update_user(
                 detail="Username already taken"
             )
         db_user.username = user_data.username
+        # Cached template definitions embed creator/updater usernames
+        template_cache.clear()
 
     # Check email uniqueness if being updated
     if user_data.email and user_data.email != db_user.email:
@@ -236,6 +275,7 @@ async def update_user(
     session.add(db_user)
     session.commit()
     session.refresh(db_user)
+    response_cache.invalidate("admin_users")
 
     # Get role name if not loaded
     if not role and db_user.role_id:
@@ -278,5 +318,6 @@ async def delete_user(
     # Delete the user
     session.delete(db_user)
     session.commit()
+    response_cache.invalidate("admin_users")
 
     return {"status": "success", "message": "User deleted successfully"}
\ No newline at end of file
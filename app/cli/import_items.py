@@ -0,0 +1,53 @@
+"""
+Bulk import items from a CSV or NDJSON file.
+
+Usage:
+    python -m app.cli.import_items --template-id 1 --created-by 1 items.csv
+"""
+import argparse
+import json
+import sys
+import time
+
+from sqlmodel import Session
+
+import app.db.base  # noqa: F401
+from app.db.session import engine
+from app.services.item_import import BATCH_SIZE, ItemImporter, detect_format, read_records
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk import items for a template")
+    parser.add_argument("path", help="CSV or NDJSON file, '-' for stdin")
+    parser.add_argument("--template-id", type=int, required=True)
+    parser.add_argument("--created-by", type=int, help="default user id for rows without created_by")
+    parser.add_argument("--format", choices=["csv", "ndjson"], help="defaults to the file extension")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    fmt = detect_format(args.path, args.format)
+    if fmt is None:
+        parser.error("cannot detect the file format, pass --format")
+
+    stream = sys.stdin if args.path == "-" else open(args.path, encoding="utf-8-sig", newline="")
+    started = time.perf_counter()
+    try:
+        with Session(engine) as session:
+            importer = ItemImporter(
+                session, args.template_id, created_by=args.created_by, batch_size=args.batch_size
+            )
+            result = importer.run(read_records(stream, fmt))
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+    elapsed = time.perf_counter() - started
+    summary = result.to_dict()
+    summary["elapsed_seconds"] = round(elapsed, 2)
+    summary["items_per_second"] = round(result.imported / elapsed, 1) if elapsed else None
+    print(json.dumps(summary, indent=2))
+    return 0 if result.failed == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,147 @@
+import asyncio
+import json
+import logging
+import math
+import os
+import time
+from typing import Dict, Optional
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+ADMISSION_CONTROL = os.getenv("ADMIN_ADMISSION_CONTROL", "1") == "1"
+# How long a request may wait for a slot before it is shed
+MAX_WAIT_SECONDS = float(os.getenv("ADMIN_ADMISSION_MAX_WAIT_SECONDS", "2"))
+
+# Never limited: probes, metrics and login must keep working while the API is saturated.
+# Keep the limits below the pool size + overflow so these always find a connection.
+UNLIMITED_PREFIXES = ("/health", "/metrics", "/api/v1/auth")
+# Long running imports and copies get their own small group so they cannot starve reads
+BULK_ROUTES = (("POST", "/api/v1/items/import"), ("POST", "/api/v1/templates/*/clone"))
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+# group: (concurrent requests, queued requests)
+GROUP_LIMITS = {
+    "read": (8, 32),
+    "write": (4, 16),
+    "bulk": (1, 2),
+}
+
+
+def _group_limit(group: str, kind: str, default: int) -> int:
+    return int(os.getenv(f"ADMIN_ADMISSION_{group.upper()}_{kind}", str(default)))
+
+
+class RequestGroup:
+    """A concurrency limit with a bounded queue of waiting requests"""
+
+    def __init__(self, name: str, limit: int, queue: int):
+        self.name = name
+        self.limit = limit
+        self.queue = queue
+        self.active = 0
+        self.waiting = 0
+        self._semaphore = asyncio.Semaphore(limit)
+
+    async def acquire(self, timeout: float) -> Optional[str]:
+        """Take a slot; return the reason the request is shed instead"""
+        if self._semaphore.locked():
+            if self.waiting >= self.queue:
+                return "queue_full"
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), timeout)
+            except asyncio.TimeoutError:
+                return "timeout"
+            finally:
+                self.waiting -= 1
+        else:
+            await self._semaphore.acquire()
+        self.active += 1
+        return None
+
+    def release(self):
+        self.active -= 1
+        self._semaphore.release()
+
+
+def classify(method: str, path: str) -> Optional[str]:
+    if path.startswith(UNLIMITED_PREFIXES):
+        return None
+    for bulk_method, pattern in BULK_ROUTES:
+        if method == bulk_method and path_matches(pattern, path):
+            return "bulk"
+    return "read" if method in SAFE_METHODS else "write"
+
+
+def path_matches(pattern: str, path: str) -> bool:
+    pattern_parts = pattern.strip("/").split("/")
+    path_parts = path.strip("/").split("/")
+    return len(pattern_parts) == len(path_parts) and all(
+        expected in ("*", actual) for expected, actual in zip(pattern_parts, path_parts)
+    )
+
+
+class AdmissionControlMiddleware:
+    """
+    Limits concurrent requests per route group. A request that finds its
+    group full waits in a bounded queue for up to MAX_WAIT_SECONDS; when the
+    queue is full or the wait runs out it fails fast with 503 and Retry-After
+    instead of piling up on the connection pool.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self.groups: Dict[str, RequestGroup] = {
+            name: RequestGroup(
+                name,
+                _group_limit(name, "LIMIT", limit),
+                _group_limit(name, "QUEUE", queue)
+            )
+            for name, (limit, queue) in GROUP_LIMITS.items()
+        }
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not ADMISSION_CONTROL:
+            await self.app(scope, receive, send)
+            return
+
+        group_name = classify(scope["method"], scope["path"])
+        if group_name is None:
+            await self.app(scope, receive, send)
+            return
+
+        group = self.groups[group_name]
+        started = time.perf_counter()
+        reason = await group.acquire(MAX_WAIT_SECONDS)
+        if reason is not None:
+            metrics.inc("admission_shed", "Requests rejected by admission control", group=group_name, reason=reason)
+            logger.warning(
+                "Shed %s %s (group %s: %s, %d active, %d waiting, waited %.0f ms)",
+                scope["method"], scope["path"], group_name, reason, group.active, group.waiting,
+                (time.perf_counter() - started) * 1000
+            )
+            await self._reject(send)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            group.release()
+
+    @staticmethod
+    async def _reject(send: Send):
+        body = json.dumps({"code": "503", "data": {}, "message": "Server busy, please retry"}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(max(1, math.ceil(MAX_WAIT_SECONDS))).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,195 @@
+import asyncio
+import logging
+import os
+import time
+from contextvars import ContextVar
+from typing import Optional, Set
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.admission import path_matches
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DEADLINE_SECONDS = float(os.getenv("ADMIN_REQUEST_DEADLINE_SECONDS", "15"))
+
+# (method, path pattern, seconds); the first match wins, "*" matches one path segment
+ROUTE_DEADLINES = (
+    ("POST", "/api/v1/items/import", float(os.getenv("ADMIN_IMPORT_DEADLINE_SECONDS", "600"))),
+    ("POST", "/api/v1/templates/*/clone", 120.0),
+    ("GET", "/api/v1/items", float(os.getenv("ADMIN_LIST_DEADLINE_SECONDS", "5"))),
+    ("GET", "/api/v1/templates", float(os.getenv("ADMIN_LIST_DEADLINE_SECONDS", "5"))),
+    ("POST", "/api/v1/statistics/leaderboards/refresh", 120.0),
+    ("POST", "/api/v1/statistics/reviewers/refresh", 120.0),
+    ("GET", "/api/v1/statistics/*", 5.0),
+    ("GET", "/health/*", 2.0),
+)
+
+
+class RequestDeadline:
+    __slots__ = ("route", "seconds", "expires_at", "connections")
+
+    def __init__(self, route: str, seconds: float):
+        self.route = route
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+        # Driver connections this request currently has checked out
+        self.connections: Set = set()
+
+    def remaining(self) -> float:
+        return self.expires_at - time.monotonic()
+
+    def cancel_queries(self):
+        for connection in list(self.connections):
+            try:
+                connection.cancel_safe()
+            except Exception:
+                logger.warning("Could not cancel the query of %s", self.route, exc_info=True)
+
+
+class DeadlineExceeded(Exception):
+    def __init__(self, deadline: RequestDeadline):
+        super().__init__(f"{deadline.route} exceeded its {deadline.seconds:g}s deadline")
+        self.deadline = deadline
+
+
+_current_deadline: ContextVar[Optional[RequestDeadline]] = ContextVar("request_deadline", default=None)
+
+
+def current_deadline() -> Optional[RequestDeadline]:
+    return _current_deadline.get()
+
+
+def check_deadline():
+    """Raise DeadlineExceeded when the current request ran out of time (no-op outside requests)"""
+    deadline = _current_deadline.get()
+    if deadline is not None and deadline.remaining() <= 0:
+        raise DeadlineExceeded(deadline)
+
+
+def deadline_for(method: str, path: str) -> float:
+    for route_method, pattern, seconds in ROUTE_DEADLINES:
+        if method == route_method and path_matches(pattern, path):
+            return seconds
+    return DEFAULT_DEADLINE_SECONDS
+
+
+def _apply_statement_timeout(session, transaction, connection):
+    """Bound every statement of the request's transaction by the time the request has left"""
+    deadline = _current_deadline.get()
+    if deadline is None:
+        return
+    remaining_ms = int(deadline.remaining() * 1000)
+    if remaining_ms <= 0:
+        raise DeadlineExceeded(deadline)
+    connection.exec_driver_sql(f"SET LOCAL statement_timeout = {remaining_ms}")
+    deadline.connections.add(connection.connection.driver_connection)
+    connection.connection.info["request_deadline"] = deadline
+
+
+def _release_connection(dbapi_connection, connection_record):
+    deadline = connection_record.info.pop("request_deadline", None)
+    if deadline is not None:
+        deadline.connections.discard(dbapi_connection)
+
+
+def install_deadlines(engine: Engine):
+    if not event.contains(Session, "after_begin", _apply_statement_timeout):
+        event.listen(Session, "after_begin", _apply_statement_timeout)
+    if not event.contains(engine, "checkin", _release_connection):
+        event.listen(engine, "checkin", _release_connection)
+
+
+def _has_body(scope: Scope) -> bool:
+    for name, value in scope["headers"]:
+        if name == b"transfer-encoding" or (name == b"content-length" and value != b"0"):
+            return True
+    return False
+
+
+class DeadlineMiddleware:
+    """
+    Gives every request a deadline (ROUTE_DEADLINES, else
+    ADMIN_REQUEST_DEADLINE_SECONDS). Its database transactions get the
+    remaining time as statement_timeout, and once it expires, or the client
+    disconnects, the request's running queries are cancelled and it is
+    stopped at its next await. Queries run synchronously on the event loop
+    (the async def endpoints) block it, so for those statement_timeout is
+    what bounds them; disconnects are noticed once the loop is free again.
+    """
+
+    def __init__(self, app: ASGIApp, timeout_response=None):
+        self.app = app
+        self.timeout_response = timeout_response
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        deadline = RequestDeadline(scope["path"], deadline_for(scope["method"], scope["path"]))
+        token = _current_deadline.set(deadline)
+        response_started = False
+        response_complete = asyncio.Event()
+        disconnected = asyncio.Event()
+        # Without a body the app never needs `receive`, so it can be watched for a disconnect
+        watch = not _has_body(scope)
+        body_sent = False
+
+        async def app_receive() -> Message:
+            nonlocal body_sent
+            if not watch:
+                message = await receive()
+                if message["type"] == "http.disconnect" and not response_complete.is_set():
+                    disconnected.set()
+                return message
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": b"", "more_body": False}
+            await disconnected.wait()
+            return {"type": "http.disconnect"}
+
+        async def app_send(message: Message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            elif message["type"] == "http.response.body" and not message.get("more_body", False):
+                response_complete.set()
+            await send(message)
+
+        async def watch_disconnect():
+            # Servers report a disconnect once the response is complete too; only earlier ones count
+            while (await receive())["type"] != "http.disconnect":
+                pass
+            if not response_complete.is_set():
+                disconnected.set()
+
+        app_task = asyncio.ensure_future(self.app(scope, app_receive, app_send))
+        waiters = {app_task, asyncio.ensure_future(disconnected.wait()), asyncio.ensure_future(response_complete.wait())}
+        if watch:
+            waiters.add(asyncio.ensure_future(watch_disconnect()))
+        try:
+            await asyncio.wait(waiters, timeout=max(deadline.remaining(), 0), return_when=asyncio.FIRST_COMPLETED)
+            if not app_task.done() and not response_complete.is_set():
+                if disconnected.is_set():
+                    logger.info("Client disconnected, cancelling %s %s", scope["method"], scope["path"])
+                else:
+                    logger.warning("%s %s exceeded its %gs deadline", scope["method"], scope["path"], deadline.seconds)
+                deadline.cancel_queries()
+                app_task.cancel()
+                try:
+                    await app_task
+                except (asyncio.CancelledError, Exception):
+                    pass
+                if not disconnected.is_set() and not response_started and self.timeout_response:
+                    await self.timeout_response(deadline)(scope, receive, send)
+                return
+            # The response is out; let the app finish what it does after sending it
+            await app_task
+        finally:
+            for waiter in waiters:
+                waiter.cancel()
+            _current_deadline.reset(token)
@@ -1,6 +1,12 @@
 import logging
 from fastapi import Request, HTTPException, status
 from fastapi.responses import JSONResponse
+from sqlalchemy.exc import OperationalError
+
+from app.core.deadlines import DeadlineExceeded, RequestDeadline, current_deadline
+
+# SQLSTATE of statements cancelled by statement_timeout or a cancel request
+QUERY_CANCELED = "57014"
 
 logger = logging.getLogger("uvicorn.error")
 
@@ -26,4 +32,29 @@ async def generic_exception_handler(request: Request, exc: Exception):
             "data": {},
             "message": "500 Internal Server Error"
         }
-    )
\ No newline at end of file
+    )
+
+# Requests that ran past their deadline (see app/core/deadlines.py)
+def deadline_exceeded_response(deadline: RequestDeadline) -> JSONResponse:
+    return JSONResponse(
+        status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+        content={
+            "code": "504",
+            "data": {"route": deadline.route, "deadlineMs": int(deadline.seconds * 1000)},
+            "message": "Request timed out"
+        }
+    )
+
+
+async def deadline_exceeded_handler(request: Request, exc: DeadlineExceeded):
+    logger.warning(str(exc))
+    return deadline_exceeded_response(exc.deadline)
+
+
+# Database errors: statements cancelled by statement_timeout become timeouts, the rest are 500s
+async def database_error_handler(request: Request, exc: OperationalError):
+    deadline = current_deadline()
+    if getattr(exc.orig, "sqlstate", None) == QUERY_CANCELED and deadline is not None:
+        logger.warning(f"Query cancelled after the {deadline.seconds:g}s deadline of {deadline.route}")
+        return deadline_exceeded_response(deadline)
+    return await generic_exception_handler(request, exc)
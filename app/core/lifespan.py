@@ -0,0 +1,129 @@
+import asyncio
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Callable, List
+
+from fastapi import FastAPI
+from sqlalchemy.orm import configure_mappers
+from sqlmodel import Session, select
+from starlette.concurrency import run_in_threadpool
+
+import app.db.base  # noqa: F401
+from app.api.v1.endpoints.templates import load_template_definition
+from app.db.session import engine, replicas, warm_pool, POOL_SIZE
+from app.models.template import Template
+from app.services.leaderboards import LEADERBOARD_REFRESH_SECONDS, refresh_leaderboards
+from app.services.reviewer_activity import REVIEWER_REFRESH_SECONDS, refresh_reviewers
+from app.services.template_cache import template_cache
+from app.services.validation import get_template_validator
+
+logger = logging.getLogger(__name__)
+
+# Most recently updated templates whose definitions and validators are loaded at startup
+WARMUP_TEMPLATES = int(os.getenv("ADMIN_WARMUP_TEMPLATES", "50"))
+
+_shutdown_callbacks: List[Callable[[], Any]] = []
+
+# Summary tables refreshed in the background: (name, refresh, seconds between runs; 0 = off)
+PERIODIC_REFRESHES = (
+    ("leaderboards", refresh_leaderboards, LEADERBOARD_REFRESH_SECONDS),
+    ("reviewer activity", refresh_reviewers, REVIEWER_REFRESH_SECONDS),
+)
+
+
+def on_shutdown(callback: Callable[[], Any]):
+    """
+    Register work to flush before the engine is disposed: a function (run in
+    the threadpool) or a coroutine function. Run in reverse registration order.
+    """
+    _shutdown_callbacks.append(callback)
+    return callback
+
+
+def prime_caches(limit: int = WARMUP_TEMPLATES) -> int:
+    """Load template definitions and compiled validators (with their data source options)"""
+    with Session(engine) as session:
+        template_ids = session.exec(
+            select(Template.id).order_by(Template.updated_at.desc()).limit(limit)
+        ).all()
+        for template_id in template_ids:
+            template_cache.get_or_load(template_id, lambda: load_template_definition(session, template_id))
+            get_template_validator(session, template_id)
+    return len(template_ids)
+
+
+async def run_periodically(name: str, refresh: Callable[[], object], interval: float):
+    while True:
+        # Shielded, so on shutdown a running refresh commits before the pool is closed
+        refreshing = asyncio.ensure_future(run_in_threadpool(refresh))
+        try:
+            await asyncio.shield(refreshing)
+        except asyncio.CancelledError:
+            await asyncio.gather(refreshing, return_exceptions=True)
+            raise
+        except Exception:
+            logger.exception(f"Refreshing the {name} failed")
+        await asyncio.sleep(interval)
+
+
+def warm_up() -> dict:
+    timings = {}
+    started = time.perf_counter()
+    configure_mappers()
+    timings["mappers_ms"] = round((time.perf_counter() - started) * 1000, 1)
+
+    started = time.perf_counter()
+    timings["connections"] = warm_pool(POOL_SIZE)
+    timings["pool_ms"] = round((time.perf_counter() - started) * 1000, 1)
+
+    started = time.perf_counter()
+    timings["templates"] = prime_caches()
+    timings["caches_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    return timings
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Warm up before accepting traffic and start the periodic refreshes. On
+    shutdown stop reporting ready, stop the refreshes (letting a running one
+    commit), flush registered work and close the pool's connections.
+    """
+    app.state.ready = False
+    started = time.perf_counter()
+    try:
+        timings = await run_in_threadpool(warm_up)
+    except Exception:
+        # Still start: /health/ready keeps failing until the database is reachable
+        logger.exception("Warm-up failed")
+        timings = {}
+    app.state.startup_seconds = time.perf_counter() - started
+    app.state.ready = True
+    logger.info("Startup completed in %.0f ms %s", app.state.startup_seconds * 1000, timings)
+
+    refreshers = [
+        asyncio.ensure_future(run_periodically(name, refresh, interval))
+        for name, refresh, interval in PERIODIC_REFRESHES if interval > 0
+    ]
+
+    yield
+
+    app.state.ready = False
+    for refresher in refreshers:
+        refresher.cancel()
+    await asyncio.gather(*refreshers, return_exceptions=True)
+    for callback in reversed(_shutdown_callbacks):
+        try:
+            if asyncio.iscoroutinefunction(callback):
+                await callback()
+            else:
+                await run_in_threadpool(callback)
+        except Exception:
+            logger.exception("Shutdown callback %s failed", getattr(callback, "__name__", callback))
+    for db_engine in [engine, *replicas.engines]:
+        db_engine.dispose()
+    logger.info("Shutdown completed")
+    for handler in logging.getLogger().handlers:
+        handler.flush()
@@ -0,0 +1,168 @@
+import time
+from typing import Any, Dict, List, Tuple
+
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class _Histogram:
+    __slots__ = ("buckets", "count", "total")
+
+    def __init__(self):
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value: float):
+        self.count += 1
+        self.total += value
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if value <= bound:
+                self.buckets[i] += 1
+                break
+
+
+class MetricsRegistry:
+    """
+    Request metrics kept in plain dicts. They are only updated from the event
+    loop thread by MetricsMiddleware, so no lock is taken on the request path;
+    gauges such as pool usage and cache counters are read at scrape time.
+    """
+
+    def __init__(self):
+        self.requests: Dict[Tuple[str, str, int], int] = {}
+        self.latency: Dict[Tuple[str, str], _Histogram] = {}
+        self.in_flight = 0
+        self.caches: Dict[str, Any] = {}
+        self.engines: Dict[str, Any] = {}
+        self.counters: Dict[Tuple[str, str], Dict[Tuple[Tuple[str, str], ...], int]] = {}
+
+    def register_cache(self, name: str, cache: Any):
+        """Expose an object with `hits` and `misses` attributes"""
+        self.caches[name] = cache
+
+    def register_engine(self, name: str, engine: Any):
+        self.engines[name] = engine
+
+    def inc(self, name: str, help_text: str, amount: int = 1, **labels: str):
+        """Increment a labelled counter (exposed as `<name>_total`)"""
+        series = self.counters.setdefault((name, help_text), {})
+        key = tuple(sorted(labels.items()))
+        series[key] = series.get(key, 0) + amount
+
+    def observe_request(self, method: str, route: str, status: int, duration: float):
+        key = (method, route, status)
+        self.requests[key] = self.requests.get(key, 0) + 1
+        histogram = self.latency.get((method, route))
+        if histogram is None:
+            histogram = self.latency[(method, route)] = _Histogram()
+        histogram.observe(duration)
+
+    def render(self) -> str:
+        lines: List[str] = []
+
+        lines.append("# HELP http_requests_total Requests handled, by route and status")
+        lines.append("# TYPE http_requests_total counter")
+        for (method, route, status), count in sorted(self.requests.items()):
+            lines.append(f'http_requests_total{{method="{method}",route="{route}",status="{status}"}} {count}')
+
+        lines.append("# HELP http_request_duration_seconds Request latency, by route")
+        lines.append("# TYPE http_request_duration_seconds histogram")
+        for (method, route), histogram in sorted(self.latency.items()):
+            labels = f'method="{method}",route="{route}"'
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS, histogram.buckets):
+                cumulative += count
+                lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {histogram.count}')
+            lines.append(f"http_request_duration_seconds_sum{{{labels}}} {histogram.total:.6f}")
+            lines.append(f"http_request_duration_seconds_count{{{labels}}} {histogram.count}")
+
+        lines.append("# HELP http_requests_in_flight Requests currently being handled")
+        lines.append("# TYPE http_requests_in_flight gauge")
+        lines.append(f"http_requests_in_flight {self.in_flight}")
+
+        if self.engines:
+            for metric, help_text, read in (
+                    ("db_pool_size", "Configured pool size", lambda p: p.size()),
+                    ("db_pool_checked_out", "Connections currently checked out", lambda p: p.checkedout()),
+                    ("db_pool_overflow", "Connections opened beyond the pool size", lambda p: max(p.overflow(), 0)),
+            ):
+                lines.append(f"# HELP {metric} {help_text}")
+                lines.append(f"# TYPE {metric} gauge")
+                for name, engine in sorted(self.engines.items()):
+                    try:
+                        value = read(engine.pool)
+                    except AttributeError:
+                        continue
+                    lines.append(f'{metric}{{engine="{name}"}} {value}')
+
+        if self.caches:
+            lines.append("# HELP cache_hits_total Cache lookups served from the cache")
+            lines.append("# TYPE cache_hits_total counter")
+            for name, cache in sorted(self.caches.items()):
+                lines.append(f'cache_hits_total{{cache="{name}"}} {cache.hits}')
+            lines.append("# HELP cache_misses_total Cache lookups that had to load")
+            lines.append("# TYPE cache_misses_total counter")
+            for name, cache in sorted(self.caches.items()):
+                lines.append(f'cache_misses_total{{cache="{name}"}} {cache.misses}')
+            lines.append("# HELP cache_hit_ratio Hits over lookups since start")
+            lines.append("# TYPE cache_hit_ratio gauge")
+            for name, cache in sorted(self.caches.items()):
+                lookups = cache.hits + cache.misses
+                lines.append(f'cache_hit_ratio{{cache="{name}"}} {cache.hits / lookups if lookups else 0:.4f}')
+
+        for (name, help_text), series in sorted(self.counters.items()):
+            lines.append(f"# HELP {name}_total {help_text}")
+            lines.append(f"# TYPE {name}_total counter")
+            for labels, value in sorted(series.items()):
+                rendered = ",".join(f'{k}="{v}"' for k, v in labels)
+                lines.append(f"{name}_total{{{rendered}}} {value}" if rendered else f"{name}_total {value}")
+
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording latency and status per route template"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        metrics.in_flight += 1
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            metrics.in_flight -= 1
+            # The router stores the matched route in the scope; label by its
+            # path template to keep the number of series bounded
+            route = scope.get("route")
+            metrics.observe_request(
+                scope["method"],
+                getattr(route, "path", "unmatched"),
+                status_code,
+                time.perf_counter() - started
+            )
+
+
+async def metrics_endpoint(request: Request):
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
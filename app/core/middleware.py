@@ -1,8 +1,12 @@
 import json
+import time
 from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 from fastapi.responses import JSONResponse
 from fastapi import Request
 
+from app.db.session import READ_AFTER_WRITE_SECONDS, READ_PRIMARY_COOKIE
+
 
 def to_camel(string: str) -> str:
     if not string or "_" not in string:
@@ -75,4 +79,38 @@ class ResponseWrapperMiddleware(BaseHTTPMiddleware):
                 status_code=response.status_code,
                 headers=headers,
             )
-        return response
\ No newline at end of file
+        return response
+
+
+# --------------------------------------------------
+# Read-your-writes with read replicas
+# --------------------------------------------------
+class ReadAfterWriteMiddleware:
+    """
+    After a successful write, set a short-lived cookie that makes
+    get_read_session send the client's reads to the primary until replicas
+    have caught up.
+    """
+
+    SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["method"] in self.SAFE_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message: Message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                until = time.time() + READ_AFTER_WRITE_SECONDS
+                cookie = (
+                    f"{READ_PRIMARY_COOKIE}={until:.0f}; Max-Age={READ_AFTER_WRITE_SECONDS}; "
+                    "Path=/; HttpOnly; SameSite=Lax"
+                )
+                message["headers"] = [*message.get("headers", []), (b"set-cookie", cookie.encode("latin-1"))]
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
@@ -0,0 +1,205 @@
+import functools
+import inspect
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
+from urllib.parse import urlencode
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+
+from app.db.session import READ_AFTER_WRITE_SECONDS, reads_primary, replicas
+from app.models.admin_user import AdminUser
+
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("ADMIN_RESPONSE_CACHE_MAX_ENTRIES", "2048"))
+
+
+class CacheBackend(ABC):
+    """
+    Storage used by the response cache. Values are JSON-compatible objects.
+    Implement this interface to plug in another store.
+    """
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Any]:
+        ...
+
+    @abstractmethod
+    def set(self, key: str, value: Any, ttl: float, tags: Iterable[str]):
+        ...
+
+    @abstractmethod
+    def invalidate_tags(self, tags: Iterable[str]) -> int:
+        """Drop every entry carrying one of the tags and return how many were dropped"""
+
+    @abstractmethod
+    def clear(self):
+        ...
+
+
+class MemoryLRUBackend(CacheBackend):
+    def __init__(self, max_entries: int = RESPONSE_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        # key -> (expires at, tags, value)
+        self._entries: "OrderedDict[str, Tuple[float, Tuple[str, ...], Any]]" = OrderedDict()
+        self._keys_by_tag: Dict[str, Set[str]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, _, value = entry
+            if expires_at < time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: float, tags: Iterable[str]):
+        tags = tuple(tags)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + ttl, tags, value)
+            for tag in tags:
+                self._keys_by_tag.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate_tags(self, tags: Iterable[str]) -> int:
+        removed = 0
+        with self._lock:
+            for tag in tags:
+                for key in self._keys_by_tag.pop(tag, set()):
+                    if key in self._entries:
+                        self._remove(key)
+                        removed += 1
+        return removed
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_tag.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _remove(self, key: str):
+        _, tags, _ = self._entries.pop(key)
+        for tag in tags:
+            keys = self._keys_by_tag.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_tag[tag]
+
+
+class ResponseCache:
+    def __init__(self, backend: Optional[CacheBackend] = None):
+        self.backend = backend or MemoryLRUBackend()
+        self.hits = 0
+        self.misses = 0
+        # tag -> monotonic time of its last invalidation
+        self._invalidated_at: Dict[str, float] = {}
+
+    def configure(self, backend: CacheBackend):
+        self.backend = backend
+
+    def invalidate(self, *tags: str) -> int:
+        now = time.monotonic()
+        for tag in tags:
+            self._invalidated_at[tag] = now
+        return self.backend.invalidate_tags(tags)
+
+    def recently_invalidated(self, tags: Iterable[str], seconds: float) -> bool:
+        """True when one of `tags` was invalidated less than `seconds` ago"""
+        since = time.monotonic() - seconds
+        return any(self._invalidated_at.get(tag, 0) > since for tag in tags)
+
+    def clear(self):
+        self.backend.clear()
+
+
+response_cache = ResponseCache()
+
+
+def make_cache_key(request: Request, role: str) -> str:
+    # Query parameters sorted and empty ones dropped, so equivalent URLs share an entry
+    query = urlencode(sorted((k, v) for k, v in request.query_params.multi_items() if v != ""))
+    return f"{role}:{request.url.path}?{query}"
+
+
+def _role_of(kwargs: Dict[str, Any]) -> str:
+    # The role_id column, not the role relationship, which could be lazy-loaded on every hit
+    for value in kwargs.values():
+        if isinstance(value, AdminUser):
+            return f"role{value.role_id}" if value.role_id is not None else "none"
+    return "public"
+
+
+def cached_response(ttl: float = 60, tags: Iterable[str] = ()):
+    """
+    Cache the result of a GET endpoint, keyed by path, normalized query string
+    and the role of the current admin user (when the endpoint depends on one).
+    Entries expire after `ttl` seconds or when one of `tags` is invalidated by
+    a write handler through `response_cache.invalidate(...)`.
+
+    Place it below the router decorators:
+
+        @router.get("/total")
+        @cached_response(ttl=30, tags=("items",))
+        async def get_total_statistics(...):
+    """
+    tags = tuple(tags)
+
+    def decorator(endpoint):
+        signature = inspect.signature(endpoint)
+        request_param = next(
+            (name for name, p in signature.parameters.items() if p.annotation is Request),
+            None
+        )
+        # Ask FastAPI for the request when the endpoint does not already take it
+        if request_param is None:
+            signature = signature.replace(parameters=[
+                *signature.parameters.values(),
+                inspect.Parameter("_cache_request", inspect.Parameter.KEYWORD_ONLY, annotation=Request),
+            ])
+
+        @functools.wraps(endpoint)
+        async def wrapper(**kwargs):
+            if request_param is None:
+                request = kwargs.pop("_cache_request")
+            else:
+                request = kwargs[request_param]
+
+            # A client in its read-after-write window reads the primary; a cached
+            # entry may come from a lagging replica, so it neither reads nor fills it
+            if reads_primary(request):
+                return await endpoint(**kwargs)
+
+            key = make_cache_key(request, _role_of(kwargs))
+            cached = response_cache.backend.get(key)
+            if cached is not None:
+                response_cache.hits += 1
+                return cached
+
+            response_cache.misses += 1
+            result = await endpoint(**kwargs)
+            if isinstance(result, Response):
+                return result
+            result = jsonable_encoder(result)
+            # Right after a write the result may have been read from a replica that
+            # has not applied it yet; caching it would outlive the read-after-write window
+            if not (replicas.engines and response_cache.recently_invalidated(tags, READ_AFTER_WRITE_SECONDS)):
+                response_cache.backend.set(key, result, ttl, tags)
+            return result
+
+        wrapper.__signature__ = signature
+        return wrapper
+
+    return decorator
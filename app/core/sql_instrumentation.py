@@ -0,0 +1,129 @@
+import json
+import logging
+import os
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Optional
+
+from fastapi import Request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.middleware.base import BaseHTTPMiddleware
+
+logger = logging.getLogger("app.sql")
+
+# Repeated statement shapes are tracked in development only
+DETECT_N_PLUS_ONE = os.getenv(
+    "ADMIN_SQL_DETECT_N_PLUS_ONE",
+    "1" if os.getenv("ADMIN_ENV", "production").lower() in ("dev", "development", "local") else "0"
+) == "1"
+N_PLUS_ONE_THRESHOLD = int(os.getenv("ADMIN_SQL_N_PLUS_ONE_THRESHOLD", "5"))
+
+_PARAMETER = re.compile(r"%\(\w+\)s|\$\d+|\?|'[^']*'|\b\d+\b")
+_PARAMETER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def statement_shape(statement: str) -> str:
+    """Statement text with literals and parameters (including expanded IN lists) replaced by '?'"""
+    shape = _PARAMETER.sub("?", statement)
+    shape = _PARAMETER_LIST.sub("(?)", shape)
+    return _WHITESPACE.sub(" ", shape).strip()
+
+
+class RequestSQLStats:
+    __slots__ = ("statements", "db_time", "shapes")
+
+    def __init__(self):
+        self.statements = 0
+        self.db_time = 0.0
+        self.shapes: Optional[Counter] = Counter() if DETECT_N_PLUS_ONE else None
+
+    def repeated_shapes(self, threshold: int = N_PLUS_ONE_THRESHOLD):
+        if not self.shapes:
+            return []
+        return [(shape, count) for shape, count in self.shapes.most_common() if count >= threshold]
+
+
+# Set by the middleware for the duration of a request. Requests run their
+# endpoint and sync dependencies in copies of this context, which share the
+# same stats object.
+_current_stats: ContextVar[Optional[RequestSQLStats]] = ContextVar("request_sql_stats", default=None)
+
+
+def current_sql_stats() -> Optional[RequestSQLStats]:
+    return _current_stats.get()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_started"].pop()
+    stats = _current_stats.get()
+    if stats is None:
+        return
+    stats.statements += 1
+    stats.db_time += time.perf_counter() - started
+    if stats.shapes is not None:
+        stats.shapes[statement_shape(statement)] += 1
+
+
+def _handle_error(exception_context):
+    started = exception_context.connection.info.get("query_started") if exception_context.connection else None
+    if started:
+        started.pop()
+
+
+def instrument_engine(engine: Engine):
+    if event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+class SQLInstrumentationMiddleware(BaseHTTPMiddleware):
+    """
+    Counts statements and database time per request, reports them in a
+    Server-Timing header and a structured log line, and in development warns
+    about statements repeated often enough to be an N+1 loop.
+    """
+
+    async def dispatch(self, request: Request, call_next):
+        stats = RequestSQLStats()
+        token = _current_stats.set(stats)
+        started = time.perf_counter()
+        try:
+            response = await call_next(request)
+        finally:
+            _current_stats.reset(token)
+        duration = time.perf_counter() - started
+
+        response.headers.append(
+            "Server-Timing",
+            f'db;dur={stats.db_time * 1000:.1f};desc="{stats.statements} queries", '
+            f"app;dur={duration * 1000:.1f}"
+        )
+
+        if stats.statements:
+            repeated = stats.repeated_shapes()
+            record = {
+                "event": "request_sql",
+                "method": request.method,
+                "path": request.url.path,
+                "status": response.status_code,
+                "statements": stats.statements,
+                "db_ms": round(stats.db_time * 1000, 2),
+                "duration_ms": round(duration * 1000, 2),
+            }
+            if repeated:
+                record["repeated_statements"] = [{"count": count, "sql": shape[:300]} for shape, count in repeated]
+                logger.warning(json.dumps(record))
+            else:
+                logger.info(json.dumps(record))
+
+        return response
@@ -0,0 +1,17 @@
+# Import every model so SQLModel's metadata and the mapper registry know all of
+# them (relationships reference each other by name). Scripts that do not go
+# through app.main import this module before using the models.
+from app.models.admin_role import AdminRole  # noqa: F401
+from app.models.admin_user import AdminUser  # noqa: F401
+from app.models.field_data_source import FieldDataSource  # noqa: F401
+from app.models.field_data_source_option import FieldDataSourceOption  # noqa: F401
+from app.models.item import Item  # noqa: F401
+from app.models.item_field_value import ItemFieldValue  # noqa: F401
+from app.models.item_ranking import ItemRanking  # noqa: F401
+from app.models.item_statistics import ItemStatistics  # noqa: F401
+from app.models.reviewer_activity import ReviewerActivity  # noqa: F401
+from app.models.template import Template  # noqa: F401
+from app.models.template_field import TemplateField  # noqa: F401
+from app.models.template_rating_prior import TemplateRatingPrior  # noqa: F401
+from app.models.user import User  # noqa: F401
+from app.models.user_rating import UserRating  # noqa: F401
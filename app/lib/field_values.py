@@ -0,0 +1,92 @@
+import json
+from datetime import date, datetime
+from typing import Any, Optional
+
+# ItemFieldValue column that stores the value for each template field type
+FIELD_VALUE_COLUMNS = {
+    "text": "text_value",
+    "textarea": "text_value",
+    "select": "text_value",
+    "number": "numeric_value",
+    "date": "date_value",
+    "boolean": "boolean_value",
+    "json": "json_value",
+    "multiselect": "json_value",
+}
+
+VALUE_COLUMNS = ("text_value", "numeric_value", "date_value", "boolean_value", "json_value")
+
+_TRUE_STRINGS = {"true", "1", "yes", "y", "on"}
+_FALSE_STRINGS = {"false", "0", "no", "n", "off"}
+
+
+def value_column(field_type: str) -> Optional[str]:
+    """ItemFieldValue column of a field type; None for unknown types"""
+    return FIELD_VALUE_COLUMNS.get(field_type)
+
+
+def read_field_value(field_value, field_type: str) -> Any:
+    """Return the stored value of an ItemFieldValue according to its field type (None for unknown types)"""
+    column = value_column(field_type)
+    return getattr(field_value, column) if column is not None else None
+
+
+def coerce_field_value(field_type: str, raw: Any) -> Optional[Any]:
+    """
+    Convert a raw value (a string from CSV or a JSON scalar from NDJSON) to the
+    Python type stored for the given field type. Empty values become None.
+    Raises ValueError when the value cannot be converted or the field type is
+    unknown.
+    """
+    if raw is None or (isinstance(raw, str) and raw.strip() == ""):
+        return None
+
+    column = value_column(field_type)
+    if column is None:
+        raise ValueError(f"unsupported field type '{field_type}'")
+
+    if column == "text_value":
+        if isinstance(raw, (dict, list)):
+            raise ValueError("expected a text value")
+        return str(raw)
+
+    if column == "numeric_value":
+        if isinstance(raw, bool):
+            raise ValueError("expected a number")
+        try:
+            return float(raw)
+        except (TypeError, ValueError):
+            raise ValueError(f"'{raw}' is not a number")
+
+    if column == "date_value":
+        if isinstance(raw, datetime):
+            return raw.date()
+        if isinstance(raw, date):
+            return raw
+        try:
+            return date.fromisoformat(str(raw).strip()[:10])
+        except ValueError:
+            raise ValueError(f"'{raw}' is not a date (expected YYYY-MM-DD)")
+
+    if column == "boolean_value":
+        if isinstance(raw, bool):
+            return raw
+        text = str(raw).strip().lower()
+        if text in _TRUE_STRINGS:
+            return True
+        if text in _FALSE_STRINGS:
+            return False
+        raise ValueError(f"'{raw}' is not a boolean")
+
+    # json / multiselect
+    if isinstance(raw, str):
+        text = raw.strip()
+        if text[:1] in ("[", "{", '"'):
+            try:
+                return json.loads(text)
+            except ValueError:
+                raise ValueError("invalid JSON value")
+        if field_type == "multiselect":
+            return [part.strip() for part in text.split(",") if part.strip()]
+        raise ValueError("invalid JSON value")
+    return raw
@@ -0,0 +1,49 @@
+import re
+from typing import Any, Callable, Dict, Iterable, Optional, Set
+
+from fastapi import HTTPException, Query
+
+_CAMEL_BOUNDARY = re.compile(r"(?<!^)(?=[A-Z])")
+
+
+def to_snake(name: str) -> str:
+    return _CAMEL_BOUNDARY.sub("_", name).lower()
+
+
+def sparse_fields(allowed: Iterable[str]) -> Callable[..., Optional[Set[str]]]:
+    """
+    Dependency for the `fields=` parameter of list endpoints, e.g.
+    `fields=id,title,avgRating` (camelCase or snake_case). It resolves to the
+    set of requested snake_case field names, always including `id`, or to None
+    when the parameter is absent and every field is returned.
+    """
+    allowed = tuple(allowed)
+
+    def dependency(
+            fields: Optional[str] = Query(None, description=f"Comma separated subset of: {', '.join(allowed)}")
+    ) -> Optional[Set[str]]:
+        if fields is None:
+            return None
+        requested = {to_snake(name.strip()) for name in fields.split(",") if name.strip()}
+        unknown = requested.difference(allowed)
+        if unknown:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown fields: {', '.join(sorted(unknown))}; allowed: {', '.join(allowed)}"
+            )
+        requested.add("id")
+        return requested
+
+    return dependency
+
+
+def wants(fields: Optional[Set[str]], *names: str) -> bool:
+    """True when any of `names` is requested (always, without a fieldset)"""
+    return fields is None or not fields.isdisjoint(names)
+
+
+def project(row: Dict[str, Any], fields: Optional[Set[str]]) -> Dict[str, Any]:
+    """Keep the requested keys of a response row; its keys may be camelCase"""
+    if fields is None:
+        return row
+    return {key: value for key, value in row.items() if to_snake(key) in fields}
@@ -4,8 +4,26 @@ from fastapi.middleware.cors import CORSMiddleware
 import logging
 from app.api.v1.api import router as api_v1_router
 from app.api.root import router as root_router
-from app.core.middleware import ResponseWrapperMiddleware
-from app.core.error_handlers import http_exception_handler, generic_exception_handler
+from app.api.health import router as health_router
+from app.core.lifespan import lifespan, on_shutdown
+from app.core.middleware import ResponseWrapperMiddleware, ReadAfterWriteMiddleware
+from app.core.sql_instrumentation import SQLInstrumentationMiddleware, instrument_engine
+from app.core.metrics import MetricsMiddleware, metrics, metrics_endpoint
+from app.core.admission import AdmissionControlMiddleware
+from app.core.response_cache import response_cache
+from app.services.template_cache import template_cache
+from app.services.options_resolver import options_resolver
+from app.services.item_cache import item_cache
+from app.db.session import engine, replicas
+from app.core.deadlines import DeadlineExceeded, DeadlineMiddleware, install_deadlines
+from app.core.error_handlers import (
+    http_exception_handler,
+    generic_exception_handler,
+    deadline_exceeded_handler,
+    deadline_exceeded_response,
+    database_error_handler,
+)
+from sqlalchemy.exc import OperationalError
 
 # Configure logging (this example uses the uvicorn logger)
 logger = logging.getLogger("uvicorn.error")
@@ -17,9 +35,14 @@ app = FastAPI(
     description="This API handles authentication and user operations for Rating Admin",
     version="1.0.0",
     docs_url="/docs",   # Swagger UI available at /docs
-    redoc_url="/redoc"  # ReDoc available at /redoc
+    redoc_url="/redoc",  # ReDoc available at /redoc
+    lifespan=lifespan  # Warm-up before serving, engine disposal on shutdown
 )
 
+# Per route group concurrency limits; excess requests get 503 + Retry-After instead of
+# queueing on the pool. Added first so the CORS headers are set on rejections too.
+app.add_middleware(AdmissionControlMiddleware)
+
 # Allow all origins
 app.add_middleware(
     CORSMiddleware,
@@ -32,13 +55,49 @@ app.add_middleware(
 # Add the middleware to the app
 app.add_middleware(ResponseWrapperMiddleware)
 
+# Keep clients that just wrote on the primary while replicas catch up
+if replicas.engines:
+    app.add_middleware(ReadAfterWriteMiddleware)
+
+# Per-request SQL statement counts and timings (outermost, so it sees the final response)
+for db_engine in [engine, *replicas.engines]:
+    instrument_engine(db_engine)
+app.add_middleware(SQLInstrumentationMiddleware)
+
+# Per-route deadlines, propagated to Postgres as statement_timeout; queries are
+# cancelled when the deadline passes or the client disconnects
+for db_engine in [engine, *replicas.engines]:
+    install_deadlines(db_engine)
+app.add_middleware(DeadlineMiddleware, timeout_response=deadline_exceeded_response)
+
+# Prometheus metrics: request latency per route, pool usage and cache hit ratios
+metrics.register_engine("primary", engine)
+for index, replica_engine in enumerate(replicas.engines):
+    metrics.register_engine(f"replica{index}", replica_engine)
+metrics.register_cache("template_definitions", template_cache)
+metrics.register_cache("responses", response_cache)
+metrics.register_cache("data_source_options", options_resolver)
+metrics.register_cache("item_details", item_cache)
+app.add_middleware(MetricsMiddleware)
+
+# Cancel option fetches and close the dynamic query login's pool before the engines are disposed
+on_shutdown(options_resolver.close)
+
 # Register global exception handlers:
 app.add_exception_handler(HTTPException, http_exception_handler)
+app.add_exception_handler(DeadlineExceeded, deadline_exceeded_handler)
+app.add_exception_handler(OperationalError, database_error_handler)
 app.add_exception_handler(Exception, generic_exception_handler)
 
 app.include_router(api_v1_router, prefix="/api/v1")
 app.include_router(root_router)
+app.include_router(health_router)
+
+# Plain text Prometheus exposition, registered on the app itself rather than the API routers.
+# A FastAPI route (not add_route) so the router sets scope["route"] and scrapes get their own label
+app.get("/metrics", include_in_schema=False)(metrics_endpoint)
 
 if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    # Multi-worker launcher (uvloop/httptools); same as `python -m app.server`
+    from app.server import main
+    main()
\ No newline at end of file
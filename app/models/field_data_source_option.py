@@ -1,11 +1,22 @@
 from sqlmodel import Field, Relationship
 from typing import Optional
 from datetime import datetime
+from sqlalchemy import Index, text
 from app.lib.model_base import CamelModel
 
 
 class FieldDataSourceOption(CamelModel, table=True):
     __tablename__ = "field_data_source_options"
+    __table_args__ = (
+        # Backs the prefix search and keyset pagination of GET /data-sources/{id}/options;
+        # the "C" collation lets range conditions on the prefix use the index
+        Index(
+            "ix_field_data_source_options_search",
+            "data_source_id",
+            text('lower(display_text) COLLATE "C"'),
+            "id",
+        ),
+    )
 
     id: Optional[int] = Field(default=None, primary_key=True)
     data_source_id: int = Field(foreign_key="field_data_sources.id")
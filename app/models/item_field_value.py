@@ -11,8 +11,8 @@ class ItemFieldValue(CamelModel, table=True):
     __tablename__ = "item_field_values"
 
     id: Optional[int] = Field(default=None, primary_key=True)
-    item_id: int = Field(foreign_key="items.id")
-    field_id: int = Field(foreign_key="template_fields.id")
+    item_id: int = Field(foreign_key="items.id", index=True)
+    field_id: int = Field(foreign_key="template_fields.id", index=True)
     text_value: Optional[str] = None
     numeric_value: Optional[float] = None
     date_value: Optional[date] = None
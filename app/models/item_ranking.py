@@ -0,0 +1,24 @@
+# app/models/item_ranking.py
+from sqlmodel import Field
+from datetime import datetime
+from sqlalchemy import Index, text
+from app.lib.model_base import CamelModel
+
+
+class ItemRanking(CamelModel, table=True):
+    """Precomputed leaderboard score of a rated item (see app/services/leaderboards.py)"""
+    __tablename__ = "item_rankings"
+    __table_args__ = (
+        # The top N of a template is a range read of this index
+        Index("ix_item_rankings_leaderboard", "template_id", text("score DESC"), "item_id"),
+        # Where the next incremental refresh starts
+        Index("ix_item_rankings_stats_calculated_at", "stats_calculated_at"),
+    )
+
+    item_id: int = Field(foreign_key="items.id", primary_key=True)
+    template_id: int = Field(foreign_key="templates.id")
+    score: float
+    avg_rating: float
+    ratings_count: int
+    # item_statistics.last_calculated_at of the statistics the score was computed from
+    stats_calculated_at: datetime
@@ -2,11 +2,16 @@
 from sqlmodel import Field, Relationship
 from typing import Optional
 from datetime import datetime
+from sqlalchemy import Index
 from app.lib.model_base import CamelModel
 
 
 class ItemStatistics(CamelModel, table=True):
     __tablename__ = "item_statistics"
+    __table_args__ = (
+        # Finds the statistics changed since the last leaderboard refresh
+        Index("ix_item_statistics_last_calculated_at", "last_calculated_at"),
+    )
 
     item_id: int = Field(foreign_key="items.id", primary_key=True)
     avg_rating: float = Field(default=0)
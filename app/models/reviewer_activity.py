@@ -0,0 +1,33 @@
+# app/models/reviewer_activity.py
+from sqlmodel import Field
+from typing import Optional
+from datetime import datetime
+from sqlalchemy import Index
+from app.lib.model_base import CamelModel
+
+
+class ReviewerActivity(CamelModel, table=True):
+    """Rating activity of a User, maintained by app/services/reviewer_activity.py"""
+    __tablename__ = "reviewer_activity"
+    __table_args__ = (
+        # One per sort order of GET /statistics/reviewers (keyset pagination)
+        Index("ix_reviewer_activity_ratings_count", "ratings_count", "user_id"),
+        Index("ix_reviewer_activity_last_rated_at", "last_rated_at", "user_id"),
+        Index("ix_reviewer_activity_avg_deviation", "avg_deviation", "user_id"),
+        # Where the next incremental refresh starts
+        Index("ix_reviewer_activity_ratings_updated_at", "ratings_updated_at"),
+    )
+
+    user_id: int = Field(foreign_key="user.id", primary_key=True)
+    ratings_count: int
+    avg_rating: float
+    # Mean absolute and signed difference between the user's ratings and the
+    # average of the other ratings of the same items; None when no rated item
+    # has other ratings
+    avg_deviation: Optional[float] = None
+    avg_bias: Optional[float] = None
+    first_rated_at: datetime
+    last_rated_at: datetime
+    # Latest user_ratings.updated_at of the user's ratings
+    ratings_updated_at: datetime
+    refreshed_at: datetime = Field(default_factory=datetime.utcnow)
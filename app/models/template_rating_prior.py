@@ -0,0 +1,17 @@
+# app/models/template_rating_prior.py
+from sqlmodel import Field
+from datetime import datetime
+from app.lib.model_base import CamelModel
+
+
+class TemplateRatingPrior(CamelModel, table=True):
+    """Mean rating of a template's ranked items, the prior of their leaderboard scores"""
+    __tablename__ = "template_rating_priors"
+
+    template_id: int = Field(foreign_key="templates.id", primary_key=True)
+    # Running sums over item_rankings: avg_rating * ratings_count, and ratings_count
+    rating_sum: float = Field(default=0)
+    ratings_count: int = Field(default=0)
+    # Mean the template's scores were last computed with
+    scored_mean: float = Field(default=0)
+    refreshed_at: datetime = Field(default_factory=datetime.utcnow)
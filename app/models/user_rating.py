@@ -2,11 +2,18 @@
 from sqlmodel import Field, Relationship
 from typing import Optional
 from datetime import datetime
+from sqlalchemy import Index
 from app.lib.model_base import CamelModel
 
 
 class UserRating(CamelModel, table=True):
     __tablename__ = "user_ratings"
+    __table_args__ = (
+        # A user's ratings over time: reviewer summaries and recent activity
+        Index("ix_user_ratings_user_id_created_at", "user_id", "created_at"),
+        # Finds the users whose ratings changed since the last reviewer refresh
+        Index("ix_user_ratings_updated_at", "updated_at"),
+    )
 
     id: Optional[int] = Field(default=None, primary_key=True)
     item_id: int = Field(foreign_key="items.id")
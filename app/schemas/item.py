@@ -45,19 +45,27 @@ class ItemResponse(BaseModel):
     field_values: Optional[List[ItemFieldValueBase]] = None
 
 
+# List rows only carry the fields requested through `fields=` (the endpoints
+# return them with response_model_exclude_unset), so every field is optional
 class ItemListItem(BaseModel):
     id: int
-    title: str
-    slug: str
-    template_id: int
-    template_name: str
-    created_by: int
+    title: Optional[str] = None
+    slug: Optional[str] = None
+    template_id: Optional[int] = None
+    template_name: Optional[str] = None
+    created_by: Optional[int] = None
     created_by_name: Optional[str] = None
-    created_at: datetime
-    updated_at: datetime
-    avg_rating: float = 0
-    ratings_count: int = 0
-    views_count: int = 0
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    avg_rating: Optional[float] = None
+    ratings_count: Optional[int] = None
+    views_count: Optional[int] = None
+
+
+class FacetCount(BaseModel):
+    value: Union[int, str, None]
+    label: Optional[str] = None
+    count: int
 
 
 class ItemListResponse(BaseModel):
@@ -65,6 +73,8 @@ class ItemListResponse(BaseModel):
     pageNo: int
     pageSize: int
     total: int
+    # Only with facets=true: "template", "rating_band" and "created_month"
+    facets: Optional[Dict[str, List[FacetCount]]] = None
 
 
 class RatingBase(APIBaseModel):
@@ -76,15 +86,16 @@ class RatingCreate(RatingBase):
     item_id: int
 
 
+# Rating list rows, optional for the same reason as ItemListItem
 class RatingResponse(BaseModel):
     id: int
-    item_id: int
-    user_id: int
-    username: str
-    rating: float
+    item_id: Optional[int] = None
+    user_id: Optional[int] = None
+    username: Optional[str] = None
+    rating: Optional[float] = None
     review_text: Optional[str] = None
-    created_at: datetime
-    updated_at: datetime
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
 
 
 class RatingListResponse(BaseModel):
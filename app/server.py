@@ -0,0 +1,213 @@
+"""
+Production entry point: a pre-forking supervisor running uvicorn workers on
+uvloop and httptools that share one listening socket.
+
+Usage:
+    python -m app.server --workers 4 --port 8000 --preload --max-requests 10000
+
+Caches are per worker process; see the README before running more than one.
+
+With --preload the app is imported once in the supervisor and workers are
+forked from it, sharing its memory and starting faster; without it every
+worker imports the app itself, which a code reload (SIGHUP) then picks up.
+Workers leave gracefully after --max-requests (plus a random jitter, so they
+do not all restart together) and are replaced by the supervisor.
+
+Signals: SIGTERM/SIGINT shut every worker down gracefully, SIGHUP replaces
+the workers one at a time.
+"""
+import argparse
+import logging
+import os
+import random
+import signal
+import sys
+import time
+from typing import Dict
+
+import uvicorn
+
+APP_TARGET = "app.main:app"
+
+logger = logging.getLogger("uvicorn.error")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=os.getenv("ADMIN_SERVER_HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("ADMIN_SERVER_PORT", "8000")))
+    # One by default: the in-process caches only see the writes of their own worker (see README)
+    parser.add_argument("--workers", type=int, default=int(os.getenv("ADMIN_SERVER_WORKERS", "1")))
+    parser.add_argument("--preload", action="store_true", default=os.getenv("ADMIN_SERVER_PRELOAD", "0") == "1",
+                        help="import the app before forking the workers")
+    parser.add_argument("--max-requests", type=int, default=int(os.getenv("ADMIN_SERVER_MAX_REQUESTS", "0")),
+                        help="recycle a worker after this many requests (0 = never)")
+    parser.add_argument("--max-requests-jitter", type=int,
+                        default=int(os.getenv("ADMIN_SERVER_MAX_REQUESTS_JITTER", "0")))
+    parser.add_argument("--keep-alive", type=int, default=int(os.getenv("ADMIN_SERVER_KEEP_ALIVE", "5")),
+                        help="seconds an idle keep-alive connection stays open")
+    parser.add_argument("--backlog", type=int, default=int(os.getenv("ADMIN_SERVER_BACKLOG", "2048")))
+    parser.add_argument("--graceful-timeout", type=int, default=int(os.getenv("ADMIN_SERVER_GRACEFUL_TIMEOUT", "30")),
+                        help="seconds in-flight requests get to finish on shutdown")
+    parser.add_argument("--log-level", default=os.getenv("ADMIN_SERVER_LOG_LEVEL", "info"))
+    parser.add_argument("--no-access-log", action="store_true")
+    return parser.parse_args(argv)
+
+
+def build_config(args) -> uvicorn.Config:
+    app = APP_TARGET
+    if args.preload:
+        from app.main import app
+
+    return uvicorn.Config(
+        app,
+        host=args.host,
+        port=args.port,
+        loop="uvloop",
+        http="httptools",
+        lifespan="on",
+        backlog=args.backlog,
+        timeout_keep_alive=args.keep_alive,
+        timeout_graceful_shutdown=args.graceful_timeout,
+        log_level=args.log_level,
+        access_log=not args.no_access_log,
+        proxy_headers=True,
+    )
+
+
+class Supervisor:
+    def __init__(self, config: uvicorn.Config, args):
+        self.config = config
+        self.args = args
+        self.workers: Dict[int, float] = {}
+        self.stopping = False
+        self.reloading = False
+        self.deadline = 0.0
+        self.socket = None
+
+    def spawn(self):
+        pid = os.fork()
+        if pid:
+            self.workers[pid] = time.monotonic()
+            return
+
+        # Worker process: drop the supervisor's handlers, uvicorn installs its own.
+        # SIGHUP is meant for the supervisor only.
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        signal.signal(signal.SIGHUP, signal.SIG_IGN)
+        if self.args.preload:
+            # Never share pooled connections opened before the fork: the primary,
+            # replica and dynamic options pools all start empty in the worker
+            from app.db.session import engine, replicas
+            from app.services.options_resolver import query_engine
+            engine.dispose(close=False)
+            replicas.dispose(close=False)
+            if query_engine is not None:
+                query_engine.dispose(close=False)
+        if self.args.max_requests:
+            self.config.limit_max_requests = self.args.max_requests + random.randint(0, self.args.max_requests_jitter)
+        # os._exit skips the supervisor's cleanup inherited by the fork; the exit
+        # status is kept so reap() notices workers that fail at startup
+        try:
+            uvicorn.Server(self.config).run(sockets=[self.socket])
+        except SystemExit as e:
+            # sys.exit() takes None (success), a status or a message (failure)
+            os._exit(e.code if isinstance(e.code, int) else 0 if e.code is None else 1)
+        except BaseException:
+            logger.exception("Worker %s crashed", os.getpid())
+            os._exit(1)
+        os._exit(0)
+
+    def stop(self, signum, frame):
+        if self.stopping:
+            return
+        logger.info("Supervisor %s received %s, stopping %d workers", os.getpid(),
+                    signal.Signals(signum).name, len(self.workers))
+        self.stopping = True
+        self.deadline = time.monotonic() + self.args.graceful_timeout + 5
+        self.signal_workers(signal.SIGTERM)
+
+    def reload(self, signum, frame):
+        self.reloading = True
+
+    def signal_workers(self, sig):
+        for pid in list(self.workers):
+            try:
+                os.kill(pid, sig)
+            except ProcessLookupError:
+                self.workers.pop(pid, None)
+
+    def reap(self):
+        while self.workers:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                self.workers.clear()
+                return
+            if pid == 0:
+                return
+            started = self.workers.pop(pid, None)
+            if started is None or self.stopping:
+                continue
+            code = os.waitstatus_to_exitcode(status)
+            if code != 0 and time.monotonic() - started < 1:
+                # A worker dying straight away usually fails at import; don't spin
+                logger.error("Worker %s exited with %s right after starting", pid, code)
+                time.sleep(1)
+            else:
+                logger.info("Worker %s exited with %s, replacing it", pid, code)
+
+    def replace_workers(self):
+        """Replace the workers one at a time so capacity never drops by more than one"""
+        self.reloading = False
+        logger.info("Replacing %d workers", len(self.workers))
+        for pid in list(self.workers):
+            self.spawn()
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+            while pid in self.workers and not self.stopping:
+                time.sleep(0.1)
+                self.reap()
+
+    def run(self):
+        self.socket = self.config.bind_socket()
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        signal.signal(signal.SIGHUP, self.reload)
+        logger.info("Supervisor %s starting %d workers (preload=%s, uvloop, httptools)",
+                    os.getpid(), self.args.workers, self.args.preload)
+
+        while True:
+            self.reap()
+            if self.stopping:
+                if not self.workers:
+                    break
+                if time.monotonic() > self.deadline:
+                    logger.warning("Killing %d workers still running after the graceful timeout", len(self.workers))
+                    self.signal_workers(signal.SIGKILL)
+            elif self.reloading:
+                self.replace_workers()
+            else:
+                while len(self.workers) < self.args.workers:
+                    self.spawn()
+            time.sleep(0.2)
+
+        self.socket.close()
+        logger.info("Supervisor %s stopped", os.getpid())
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    config = build_config(args)
+    if args.workers <= 1 and not args.max_requests:
+        # A single worker needs no supervisor
+        uvicorn.Server(config).run()
+        return
+    Supervisor(config, args).run()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,189 @@
+import os
+from decimal import Decimal
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import Integer, Row, String, bindparam, cast, func, insert, select, tuple_
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlmodel import Session
+
+from app.models.field_data_source_option import FieldDataSourceOption
+from app.schemas.data_source import DataSourceOptionCreate
+
+# Largest code point: appended to a prefix it bounds every string starting with it
+_MAX_CHAR = "\U0010ffff"
+
+# Data source types whose options are computed instead of stored as rows
+RANGE_SOURCE_TYPE = "range"
+# Largest range accepted when a range data source is created
+MAX_RANGE_OPTIONS = int(os.getenv("ADMIN_RANGE_MAX_OPTIONS", "1000000"))
+
+
+def sort_key():
+    """Option order of the search index: case-insensitive display text, compared bytewise"""
+    return func.lower(FieldDataSourceOption.display_text).collate("C")
+
+
+def _build_insert_statement():
+    table = FieldDataSourceOption.__table__
+    incoming = func.unnest(
+        cast(bindparam("p_value"), ARRAY(String())),
+        cast(bindparam("p_display_text"), ARRAY(String())),
+    ).table_valued("value", "display_text", with_ordinality="position").render_derived(name="incoming")
+    now = bindparam("b_now")
+    return (
+        insert(table)
+        .from_select(
+            ["data_source_id", "value", "display_text", "created_at", "updated_at"],
+            select(
+                bindparam("b_data_source_id", type_=Integer()),
+                incoming.c.value,
+                incoming.c.display_text,
+                now,
+                now,
+            ).select_from(incoming).order_by(incoming.c.position)
+        )
+        .returning(table.c.id, table.c.value, table.c.display_text)
+    )
+
+
+_INSERT_OPTIONS = _build_insert_statement()
+
+
+def insert_options(session: Session, data_source_id: int, options: List[DataSourceOptionCreate], now) -> List[Dict[str, Any]]:
+    """
+    Insert all options of a data source with a single INSERT ... SELECT FROM
+    unnest(...) (see app/services/template_fields.py) and return the new rows
+    in payload order. The caller commits.
+    """
+    if not options:
+        return []
+    rows = session.execute(_INSERT_OPTIONS, {
+        "b_data_source_id": data_source_id,
+        "b_now": now,
+        "p_value": [option.value for option in options],
+        "p_display_text": [option.display_text for option in options],
+    }).mappings().all()
+    return sorted((dict(row) for row in rows), key=lambda row: row["id"])
+
+
+def search_options(
+        session: Session,
+        data_source_id: int,
+        prefix: Optional[str] = None,
+        after: Optional[Tuple[str, int]] = None,
+        limit: int = 50
+) -> List[Row]:
+    """
+    A page of (option, sort_key) rows ordered by sort_key() and id, optionally
+    limited to options whose display text starts with `prefix`
+    (case-insensitive). `after` is the (sort_key, id) of the last row of the
+    previous page.
+    """
+    key = sort_key()
+    query = (
+        select(FieldDataSourceOption, key.label("sort_key"))
+        .where(FieldDataSourceOption.data_source_id == data_source_id)
+    )
+    if prefix:
+        # A range instead of LIKE so the index is used in generic plans of the prepared statement too
+        lowered = func.lower(prefix)
+        query = query.where(key >= lowered, key < lowered + _MAX_CHAR)
+    if after is not None:
+        query = query.where(tuple_(key, FieldDataSourceOption.id) > tuple_(*after))
+    query = query.order_by(key, FieldDataSourceOption.id).limit(limit)
+    return list(session.execute(query).all())
+
+
+class RangeOptions:
+    """
+    Options of a `range` data source, computed from its configuration
+    (`start`, `end`, `step` and an optional `format` such as "{value} km")
+    instead of stored as FieldDataSourceOption rows. Length, indexing and
+    membership are O(1) whatever the size of the range. Values are exact
+    decimals, so fractional steps do not drift.
+    """
+
+    def __init__(self, start: Any, end: Any, step: Any = 1, format: Optional[str] = None):
+        try:
+            self.start = Decimal(str(start))
+            self.end = Decimal(str(end))
+            self.step = Decimal(str(step))
+        except ArithmeticError:
+            raise ValueError("start, end and step must be numbers")
+        if not all(d.is_finite() for d in (self.start, self.end, self.step)):
+            raise ValueError("start, end and step must be finite numbers")
+        if self.step <= 0:
+            raise ValueError("step must be positive")
+        if self.end < self.start:
+            raise ValueError("end must not be lower than start")
+        self.format = format
+        # Values are written with as many decimals as start or step need
+        self._places = max(-self.start.as_tuple().exponent, -self.step.as_tuple().exponent, 0)
+        try:
+            self._length = int((self.end - self.start) // self.step) + 1
+        except ArithmeticError:
+            # The number of steps exceeds the decimal precision
+            raise ValueError("the range has too many values")
+        if format is not None:
+            self.display(self.value_at(0))
+
+    @classmethod
+    def from_configuration(cls, configuration: Optional[Dict[str, Any]]) -> "RangeOptions":
+        """Raises ValueError when the configuration does not describe a valid range"""
+        configuration = configuration or {}
+        if configuration.get("start") is None or configuration.get("end") is None:
+            raise ValueError("range data sources need a start and an end")
+        return cls(
+            configuration["start"],
+            configuration["end"],
+            configuration.get("step", 1),
+            configuration.get("format")
+        )
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __contains__(self, value: Any) -> bool:
+        try:
+            number = Decimal(str(value).strip())
+            if not number.is_finite() or number < self.start or number > self.end:
+                return False
+            return (number - self.start) % self.step == 0
+        except ArithmeticError:
+            return False
+
+    def value_at(self, index: int) -> str:
+        if not 0 <= index < self._length:
+            raise IndexError(index)
+        return f"{self.start + index * self.step:.{self._places}f}"
+
+    def display(self, value: str) -> str:
+        if self.format is None:
+            return value
+        try:
+            return self.format.format(value=Decimal(value))
+        except (KeyError, IndexError, ValueError):
+            raise ValueError("format must be a template such as '{value} km'")
+
+    def option(self, index: int) -> Dict[str, Any]:
+        value = self.value_at(index)
+        return {"id": None, "value": value, "display_text": self.display(value)}
+
+    def options(
+            self,
+            offset: int = 0,
+            prefix: Optional[str] = None,
+            end: Optional[int] = None
+    ) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """
+        (index, option) pairs from `offset` up to `end` (exclusive, the whole
+        range by default), lazily. With a prefix only options whose display
+        text starts with it (case-insensitive) are yielded; finding them walks
+        the range, so callers bound the walk with `end`.
+        """
+        prefix = prefix.lower() if prefix else None
+        end = self._length if end is None else min(end, self._length)
+        for index in range(max(offset, 0), end):
+            option = self.option(index)
+            if prefix is None or option["display_text"].lower().startswith(prefix):
+                yield index, option
@@ -0,0 +1,129 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from app.db.session import READ_AFTER_WRITE_SECONDS, replicas
+from app.services.template_cache import template_cache
+
+ITEM_CACHE_MAX_ENTRIES = int(os.getenv("ADMIN_ITEM_CACHE_MAX_ENTRIES", "5000"))
+# Ratings and statistics are written outside this API, so entries also expire
+ITEM_CACHE_TTL_SECONDS = float(os.getenv("ADMIN_ITEM_CACHE_TTL_SECONDS", "30"))
+
+
+class ItemDetailCache:
+    """
+    LRU read-through cache of assembled item details, keyed by id with a
+    slug index. An entry is served while it is younger than the TTL and its
+    template version (see TemplateDefinitionCache) is unchanged, so template
+    edits that rename fields are picked up without knowing which items are
+    cached. Writers to an item, its ratings or its statistics call
+    invalidate(item_id).
+    """
+
+    def __init__(self, max_entries: int = ITEM_CACHE_MAX_ENTRIES, ttl: float = ITEM_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        # item id -> (expires at, template id, template version, details)
+        self._entries: "OrderedDict[int, Tuple[float, int, int, Dict[str, Any]]]" = OrderedDict()
+        self._ids_by_slug: Dict[str, int] = {}
+        # Invalidation counter, and item id -> (counter value, monotonic time) of its last invalidation
+        self._invalidations = 0
+        self._invalidated: Dict[int, Tuple[int, float]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, item_id: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(item_id)
+            if entry is not None:
+                expires_at, template_id, version, details = entry
+                if expires_at > time.monotonic() and version == template_cache.version(template_id):
+                    self._entries.move_to_end(item_id)
+                    self.hits += 1
+                    return details
+                self._remove(item_id)
+            self.misses += 1
+            return None
+
+    def get_by_slug(self, slug: str) -> Optional[Dict[str, Any]]:
+        item_id = self._ids_by_slug.get(slug)
+        if item_id is None:
+            self.misses += 1
+            return None
+        return self.get(item_id)
+
+    def get_or_load(
+            self,
+            item_id: Optional[int],
+            slug: Optional[str],
+            loader: Callable[[], Optional[Dict[str, Any]]]
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Return the cached details of the item with this id (or slug) or build
+        them with `loader`. Template versions are read before loading, so
+        details loaded while their template changes are stored as already stale.
+        Details of an item invalidated during the load are returned but not
+        stored, and neither are details loaded within READ_AFTER_WRITE_SECONDS
+        of its invalidation when replicas are configured.
+        """
+        details = self.get(item_id) if item_id is not None else self.get_by_slug(slug)
+        if details is not None:
+            return details
+
+        versions = template_cache.snapshot()
+        started = self._invalidations
+        details = loader()
+        if details is None:
+            return None
+
+        template_id = details["template_id"]
+        with self._lock:
+            invalidated = self._invalidated.get(details["id"])
+            if invalidated is not None:
+                counter, at = invalidated
+                if counter > started or (replicas.engines and time.monotonic() - at < READ_AFTER_WRITE_SECONDS):
+                    return details
+            if details["id"] in self._entries:
+                self._remove(details["id"])
+            self._entries[details["id"]] = (
+                time.monotonic() + self.ttl,
+                template_id,
+                versions.get(template_id, 0),
+                details
+            )
+            self._ids_by_slug[details["slug"]] = details["id"]
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+        return details
+
+    def invalidate(self, item_id: int):
+        with self._lock:
+            now = time.monotonic()
+            self._invalidations += 1
+            self._invalidated[item_id] = (self._invalidations, now)
+            # Loads last far less than a TTL, so older invalidations cannot race anymore
+            if len(self._invalidated) > self.max_entries:
+                self._invalidated = {
+                    key: value for key, value in self._invalidated.items() if now - value[1] < self.ttl
+                }
+            if item_id in self._entries:
+                self._remove(item_id)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._ids_by_slug.clear()
+
+    def _remove(self, item_id: int):
+        _, _, _, details = self._entries.pop(item_id)
+        if self._ids_by_slug.get(details["slug"]) == item_id:
+            del self._ids_by_slug[details["slug"]]
+
+
+item_cache = ItemDetailCache()
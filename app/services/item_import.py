@@ -0,0 +1,321 @@
+import csv
+import json
+import logging
+import re
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlmodel import Session, select
+
+from app.core.deadlines import check_deadline
+from app.lib.field_values import VALUE_COLUMNS, coerce_field_value, value_column
+from app.models.item import Item
+from app.models.item_field_value import ItemFieldValue
+from app.models.user import User
+from app.services.validation import get_template_validator
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+
+# Columns that belong to the item itself rather than to a template field
+ITEM_COLUMNS = {"title", "slug", "created_by"}
+
+SUPPORTED_FORMATS = ("csv", "ndjson")
+
+# (row number, record, parse error)
+RawRecord = Tuple[int, Optional[Dict[str, Any]], Optional[str]]
+
+
+class RowError(Exception):
+    def __init__(self, message: str, column: Optional[str] = None):
+        super().__init__(message)
+        self.message = message
+        self.column = column
+
+
+@dataclass
+class ImportRowError:
+    row: int
+    message: str
+    column: Optional[str] = None
+
+
+@dataclass
+class ImportResult:
+    template_id: int
+    total_rows: int = 0
+    imported: int = 0
+    failed: int = 0
+    errors: List[ImportRowError] = field(default_factory=list)
+
+    def add_error(self, row: int, message: str, column: Optional[str] = None):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(ImportRowError(row=row, message=message, column=column))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "template_id": self.template_id,
+            "total_rows": self.total_rows,
+            "imported": self.imported,
+            "failed": self.failed,
+            "errors_truncated": self.failed > len(self.errors),
+            "errors": [
+                {"row": e.row, "column": e.column, "message": e.message}
+                for e in self.errors
+            ],
+        }
+
+
+@dataclass
+class PreparedRow:
+    row: int
+    item: Dict[str, Any]
+    values: List[Dict[str, Any]]
+
+
+def slugify(text: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", text.lower()).strip("-")
+
+
+def detect_format(filename: Optional[str], explicit: Optional[str] = None) -> Optional[str]:
+    if explicit:
+        fmt = explicit.lower()
+        return "ndjson" if fmt in ("jsonl", "ndjson") else fmt if fmt in SUPPORTED_FORMATS else None
+    name = (filename or "").lower()
+    if name.endswith(".csv"):
+        return "csv"
+    if name.endswith((".ndjson", ".jsonl")):
+        return "ndjson"
+    return None
+
+
+def read_csv_records(stream: TextIO) -> Iterator[RawRecord]:
+    reader = csv.DictReader(stream)
+    for row_no, record in enumerate(reader, start=1):
+        if None in record:
+            yield row_no, None, "Row has more values than the header"
+            continue
+        yield row_no, record, None
+
+
+def read_ndjson_records(stream: TextIO) -> Iterator[RawRecord]:
+    row_no = 0
+    for line in stream:
+        if not line.strip():
+            continue
+        row_no += 1
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield row_no, None, f"Invalid JSON: {e}"
+            continue
+        if not isinstance(record, dict):
+            yield row_no, None, "Each line must be a JSON object"
+            continue
+        yield row_no, record, None
+
+
+def read_records(stream: TextIO, fmt: str) -> Iterator[RawRecord]:
+    if fmt == "csv":
+        return read_csv_records(stream)
+    return read_ndjson_records(stream)
+
+
+class ItemImporter:
+    """
+    Imports items of one template in batches. Each batch is written with a
+    multi-row INSERT ... RETURNING for items followed by a multi-row INSERT of
+    their field values, and committed on its own so a bad row never discards
+    rows that were already imported.
+    """
+
+    def __init__(
+            self,
+            session: Session,
+            template_id: int,
+            created_by: Optional[int] = None,
+            batch_size: int = BATCH_SIZE
+    ):
+        self.session = session
+        self.template_id = template_id
+        self.created_by = created_by
+        self.batch_size = batch_size
+        self.result = ImportResult(template_id=template_id)
+
+        self.validator = get_template_validator(session, template_id)
+        self.fields_by_name = self.validator.fields_by_name
+        self.known_columns = ITEM_COLUMNS | set(self.fields_by_name)
+
+        self._seen_slugs: set = set()
+        self._known_users: set = set()
+
+    def run(self, records: Iterable[RawRecord]) -> ImportResult:
+        batch: List[PreparedRow] = []
+        for row_no, record, parse_error in records:
+            self.result.total_rows += 1
+            if parse_error:
+                self.result.add_error(row_no, parse_error)
+                continue
+            try:
+                batch.append(self._prepare_row(row_no, record))
+            except RowError as e:
+                self.result.add_error(row_no, e.message, e.column)
+                continue
+
+            if len(batch) >= self.batch_size:
+                # Batches committed so far are kept when the request runs out of time
+                check_deadline()
+                self._flush(batch)
+                batch = []
+
+        if batch:
+            self._flush(batch)
+
+        logger.info(
+            f"Imported {self.result.imported}/{self.result.total_rows} items "
+            f"into template {self.template_id} ({self.result.failed} failed)"
+        )
+        return self.result
+
+    def _prepare_row(self, row_no: int, record: Dict[str, Any]) -> PreparedRow:
+        unknown = [key for key in record if key not in self.known_columns]
+        if unknown:
+            raise RowError(f"Unknown column '{unknown[0]}'", unknown[0])
+
+        title = str(record.get("title") or "").strip()
+        if not title:
+            raise RowError("Title is required", "title")
+        if len(title) > 200:
+            raise RowError("Title must be at most 200 characters", "title")
+
+        slug = str(record.get("slug") or "").strip() or slugify(title)
+        if not slug:
+            raise RowError("Cannot derive a slug from the title, provide a slug column", "slug")
+        if len(slug) > 255:
+            raise RowError("Slug must be at most 255 characters", "slug")
+        if slug in self._seen_slugs:
+            raise RowError(f"Duplicate slug '{slug}' in import file", "slug")
+
+        created_by = record.get("created_by") or self.created_by
+        if created_by in (None, ""):
+            raise RowError("created_by is required", "created_by")
+        try:
+            created_by = int(created_by)
+        except (TypeError, ValueError):
+            raise RowError(f"'{created_by}' is not a valid user id", "created_by")
+
+        coerced = {}
+        for name, raw in record.items():
+            template_field = self.fields_by_name.get(name)
+            if template_field is None:
+                continue
+            try:
+                coerced[name] = coerce_field_value(template_field.field_type, raw)
+            except ValueError as e:
+                raise RowError(str(e), name)
+
+        errors = self.validator.validate(coerced, first_only=True)
+        if errors:
+            column, message = errors[0]
+            raise RowError(message, column)
+
+        values = []
+        for name, value in coerced.items():
+            if value is None:
+                continue
+            template_field = self.fields_by_name[name]
+            row = dict.fromkeys(VALUE_COLUMNS)
+            row["field_id"] = template_field.id
+            row[value_column(template_field.field_type)] = value
+            values.append(row)
+
+        self._seen_slugs.add(slug)
+        return PreparedRow(
+            row=row_no,
+            item={"title": title, "slug": slug, "created_by": created_by},
+            values=values,
+        )
+
+    def _check_users(self, batch: List[PreparedRow]) -> List[PreparedRow]:
+        user_ids = {r.item["created_by"] for r in batch} - self._known_users
+        if user_ids:
+            found = self.session.exec(select(User.id).where(User.id.in_(user_ids))).all()
+            self._known_users.update(found)
+
+        valid = []
+        for prepared in batch:
+            if prepared.item["created_by"] in self._known_users:
+                valid.append(prepared)
+            else:
+                self.result.add_error(
+                    prepared.row, f"User {prepared.item['created_by']} does not exist", "created_by"
+                )
+        return valid
+
+    def _insert(self, batch: List[PreparedRow]) -> Dict[str, int]:
+        now = datetime.utcnow()
+        item_rows = [
+            {**prepared.item, "template_id": self.template_id, "created_at": now, "updated_at": now}
+            for prepared in batch
+        ]
+        # Core statements on the tables (not the ORM entities) so psycopg receives
+        # a single multi-row INSERT per batch instead of one statement per row.
+        # Rows whose slug already exists are skipped by the database and not returned.
+        items = Item.__table__
+        statement = (
+            insert(items)
+            .on_conflict_do_nothing(index_elements=[items.c.slug])
+            .returning(items.c.id, items.c.slug)
+        )
+        connection = self.session.connection()
+        inserted = {slug: item_id for item_id, slug in connection.execute(statement, item_rows)}
+
+        value_rows = []
+        for prepared in batch:
+            item_id = inserted.get(prepared.item["slug"])
+            if item_id is None:
+                continue
+            for value in prepared.values:
+                value_rows.append({**value, "item_id": item_id, "created_at": now, "updated_at": now})
+        if value_rows:
+            connection.execute(insert(ItemFieldValue.__table__), value_rows)
+        return inserted
+
+    def _flush(self, batch: List[PreparedRow]):
+        batch = self._check_users(batch)
+        if not batch:
+            return
+
+        failed_rows: set = set()
+        try:
+            inserted = self._insert(batch)
+            self.session.commit()
+        except SQLAlchemyError:
+            self.session.rollback()
+            logger.warning("Batch insert failed, retrying rows individually", exc_info=True)
+            inserted, failed_rows = self._flush_row_by_row(batch)
+
+        for prepared in batch:
+            if prepared.item["slug"] in inserted:
+                self.result.imported += 1
+            elif prepared.row not in failed_rows:
+                self.result.add_error(prepared.row, f"Slug '{prepared.item['slug']}' already exists", "slug")
+
+    def _flush_row_by_row(self, batch: List[PreparedRow]) -> Tuple[Dict[str, int], set]:
+        inserted: Dict[str, int] = {}
+        failed_rows = set()
+        for prepared in batch:
+            try:
+                inserted.update(self._insert([prepared]))
+                self.session.commit()
+            except SQLAlchemyError as e:
+                self.session.rollback()
+                failed_rows.add(prepared.row)
+                self.result.add_error(prepared.row, str(getattr(e, "orig", e)).splitlines()[0])
+        return inserted, failed_rows
@@ -0,0 +1,248 @@
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import DateTime, Float, Integer, bindparam, cast, delete, func, literal_column, or_, select, update
+from sqlalchemy.dialects.postgresql import ARRAY, insert
+from sqlmodel import Session
+
+from app.core.response_cache import response_cache
+from app.db.session import engine
+from app.models.item import Item
+from app.models.item_ranking import ItemRanking
+from app.models.item_statistics import ItemStatistics
+from app.models.template_rating_prior import TemplateRatingPrior
+
+logger = logging.getLogger(__name__)
+
+# Ratings an item needs before its own average weighs as much as the template mean
+LEADERBOARD_MIN_RATINGS = float(os.getenv("ADMIN_LEADERBOARD_MIN_RATINGS", "10"))
+# Seconds between incremental refreshes; 0 disables the background refresh
+LEADERBOARD_REFRESH_SECONDS = float(os.getenv("ADMIN_LEADERBOARD_REFRESH_SECONDS", "60"))
+# How far the template mean may move before all scores of the template are recomputed
+LEADERBOARD_PRIOR_TOLERANCE = float(os.getenv("ADMIN_LEADERBOARD_PRIOR_TOLERANCE", "0.01"))
+# Statistics may commit after a refresh saw newer ones, so refreshes look back this far
+STATISTICS_LAG = timedelta(minutes=5)
+# Advisory lock held by the refreshing transaction, so workers do not refresh at the same time
+_REFRESH_LOCK_ID = 0x6c656164
+
+
+def weighted_score(avg_rating: float, ratings_count: int, mean: float) -> float:
+    """
+    Bayesian average: the item's average pulled towards the template mean,
+    less the more ratings the item has. Two 10/10 ratings no longer beat a
+    9.2 over five hundred ratings.
+    """
+    return (ratings_count * avg_rating + LEADERBOARD_MIN_RATINGS * mean) / (ratings_count + LEADERBOARD_MIN_RATINGS)
+
+
+def _build_upsert_statement():
+    incoming = func.unnest(
+        cast(bindparam("p_item_id"), ARRAY(Integer())),
+        cast(bindparam("p_template_id"), ARRAY(Integer())),
+        cast(bindparam("p_score"), ARRAY(Float())),
+        cast(bindparam("p_avg_rating"), ARRAY(Float())),
+        cast(bindparam("p_ratings_count"), ARRAY(Integer())),
+        cast(bindparam("p_stats_calculated_at"), ARRAY(DateTime())),
+    ).table_valued(
+        "item_id", "template_id", "score", "avg_rating", "ratings_count", "stats_calculated_at"
+    ).render_derived(name="incoming")
+    statement = insert(ItemRanking.__table__).from_select(
+        ["item_id", "template_id", "score", "avg_rating", "ratings_count", "stats_calculated_at"],
+        select(incoming)
+    )
+    return statement.on_conflict_do_update(
+        index_elements=["item_id"],
+        set_={name: statement.excluded[name] for name in (
+            "template_id", "score", "avg_rating", "ratings_count", "stats_calculated_at"
+        )}
+    )
+
+
+# INSERT ... SELECT FROM unnest(...) ON CONFLICT DO UPDATE (see app/services/template_fields.py)
+_UPSERT_RANKINGS = _build_upsert_statement()
+
+
+def _build_add_to_priors_statement():
+    incoming = func.unnest(
+        cast(bindparam("p_template_id"), ARRAY(Integer())),
+        cast(bindparam("p_rating_sum"), ARRAY(Float())),
+        cast(bindparam("p_ratings_count"), ARRAY(Integer())),
+    ).table_valued("template_id", "rating_sum", "ratings_count").render_derived(name="incoming")
+    table = TemplateRatingPrior.__table__
+    statement = insert(table).from_select(
+        ["template_id", "rating_sum", "ratings_count", "scored_mean", "refreshed_at"],
+        select(
+            incoming.c.template_id,
+            incoming.c.rating_sum,
+            incoming.c.ratings_count,
+            literal_column("0"),
+            bindparam("b_now", type_=DateTime()),
+        )
+    )
+    return statement.on_conflict_do_update(
+        index_elements=["template_id"],
+        set_={
+            "rating_sum": table.c.rating_sum + statement.excluded.rating_sum,
+            "ratings_count": table.c.ratings_count + statement.excluded.ratings_count,
+            "refreshed_at": statement.excluded.refreshed_at,
+        }
+    ).returning(table.c.template_id, table.c.rating_sum, table.c.ratings_count, table.c.scored_mean)
+
+
+# Adds (rating sum, ratings count) deltas to the template priors, creating missing ones
+_ADD_TO_PRIORS = _build_add_to_priors_statement()
+
+
+def _changed_statistics(session: Session, since: Optional[datetime]):
+    """Statistics with no ranking yet or newer than the one ranked, with the ranked values"""
+    query = (
+        select(
+            ItemStatistics.item_id,
+            Item.template_id,
+            ItemStatistics.avg_rating,
+            ItemStatistics.ratings_count,
+            ItemStatistics.last_calculated_at,
+            ItemRanking.template_id.label("ranked_template_id"),
+            ItemRanking.avg_rating.label("ranked_avg_rating"),
+            ItemRanking.ratings_count.label("ranked_ratings_count"),
+        )
+        .join(Item, Item.id == ItemStatistics.item_id)
+        .outerjoin(ItemRanking, ItemRanking.item_id == ItemStatistics.item_id)
+        .where(or_(
+            ItemRanking.item_id.is_(None),
+            ItemStatistics.last_calculated_at > ItemRanking.stats_calculated_at
+        ))
+    )
+    if since is not None:
+        query = query.where(ItemStatistics.last_calculated_at > since)
+    return session.execute(query).all()
+
+
+def refresh_rankings(session: Session, full: bool = False) -> Optional[Dict[str, Any]]:
+    """
+    Bring item_rankings up to date with item_statistics. Only statistics
+    whose last_calculated_at is newer than their ranking are read; the
+    template means are kept as running sums, and a template's scores are
+    recomputed (in one UPDATE over its rankings) only when its mean moved by
+    more than LEADERBOARD_PRIOR_TOLERANCE. `full` rebuilds both tables.
+    Returns None when another transaction is refreshing. The caller commits.
+    """
+    if not session.execute(select(func.pg_try_advisory_xact_lock(_REFRESH_LOCK_ID))).scalar_one():
+        return None
+
+    since = None
+    if full:
+        session.execute(delete(ItemRanking))
+        session.execute(delete(TemplateRatingPrior))
+    else:
+        latest = session.execute(select(func.max(ItemRanking.stats_calculated_at))).scalar_one()
+        if latest is not None:
+            since = latest - STATISTICS_LAG
+
+    rows = _changed_statistics(session, since)
+
+    # Per template: change of (rating sum, ratings count)
+    deltas: Dict[int, List[float]] = {}
+    upserts, removed = [], []
+    for row in rows:
+        if row.ranked_template_id is not None:
+            delta = deltas.setdefault(row.ranked_template_id, [0.0, 0])
+            delta[0] -= row.ranked_avg_rating * row.ranked_ratings_count
+            delta[1] -= row.ranked_ratings_count
+        if row.ratings_count > 0:
+            delta = deltas.setdefault(row.template_id, [0.0, 0])
+            delta[0] += row.avg_rating * row.ratings_count
+            delta[1] += row.ratings_count
+            upserts.append(row)
+        elif row.ranked_template_id is not None:
+            removed.append(row.item_id)
+
+    # Template sums change by increments, so concurrent item deletes
+    # (remove_item_ranking) are not lost; the rows stay locked until commit
+    priors: Dict[int, Any] = {}
+    if deltas:
+        template_ids = list(deltas)
+        priors = {
+            row.template_id: row for row in session.execute(_ADD_TO_PRIORS, {
+                "b_now": datetime.utcnow(),
+                "p_template_id": template_ids,
+                "p_rating_sum": [deltas[template_id][0] for template_id in template_ids],
+                "p_ratings_count": [deltas[template_id][1] for template_id in template_ids],
+            })
+        }
+    scored_means = {template_id: prior.scored_mean for template_id, prior in priors.items()}
+    rescored = []
+    for template_id, prior in priors.items():
+        mean = prior.rating_sum / prior.ratings_count if prior.ratings_count > 0 else 0.0
+        if abs(mean - prior.scored_mean) > LEADERBOARD_PRIOR_TOLERANCE:
+            scored_means[template_id] = mean
+            rescored.append(template_id)
+
+    if removed:
+        session.execute(delete(ItemRanking).where(ItemRanking.item_id.in_(removed)))
+    if upserts:
+        session.execute(_UPSERT_RANKINGS, {
+            "p_item_id": [row.item_id for row in upserts],
+            "p_template_id": [row.template_id for row in upserts],
+            "p_score": [
+                weighted_score(row.avg_rating, row.ratings_count, scored_means[row.template_id])
+                for row in upserts
+            ],
+            "p_avg_rating": [row.avg_rating for row in upserts],
+            "p_ratings_count": [row.ratings_count for row in upserts],
+            "p_stats_calculated_at": [row.last_calculated_at for row in upserts],
+        })
+    for template_id in rescored:
+        mean = scored_means[template_id]
+        session.execute(
+            update(TemplateRatingPrior)
+            .where(TemplateRatingPrior.template_id == template_id)
+            .values(scored_mean=mean)
+        )
+        session.execute(
+            update(ItemRanking)
+            .where(ItemRanking.template_id == template_id)
+            .values(score=(ItemRanking.ratings_count * ItemRanking.avg_rating + LEADERBOARD_MIN_RATINGS * mean)
+                    / (ItemRanking.ratings_count + LEADERBOARD_MIN_RATINGS))
+        )
+
+    return {"changed": len(upserts), "removed": len(removed), "rescoredTemplates": len(rescored)}
+
+
+def remove_item_ranking(session: Session, item_id: int):
+    """
+    Drop the ranking of an item about to be deleted; the caller commits. The
+    shared advisory lock waits for a running refresh, which may have read the
+    ranking already, and keeps refreshes out until the delete commits.
+    """
+    session.execute(select(func.pg_advisory_xact_lock_shared(_REFRESH_LOCK_ID)))
+    ranking = session.execute(
+        delete(ItemRanking)
+        .where(ItemRanking.item_id == item_id)
+        .returning(ItemRanking.template_id, ItemRanking.avg_rating, ItemRanking.ratings_count)
+    ).first()
+    if ranking is None:
+        return
+    session.execute(
+        update(TemplateRatingPrior)
+        .where(TemplateRatingPrior.template_id == ranking.template_id)
+        .values(
+            rating_sum=TemplateRatingPrior.rating_sum - ranking.avg_rating * ranking.ratings_count,
+            ratings_count=TemplateRatingPrior.ratings_count - ranking.ratings_count
+        )
+    )
+
+
+def refresh_leaderboards(full: bool = False) -> Optional[Dict[str, Any]]:
+    started = time.perf_counter()
+    with Session(engine) as session:
+        result = refresh_rankings(session, full)
+        session.commit()
+    if result is not None and (result["changed"] or result["removed"]):
+        response_cache.invalidate("leaderboards")
+        logger.info(f"Refreshed leaderboards in {(time.perf_counter() - started) * 1000:.0f} ms: {result}")
+    return result
+
@@ -0,0 +1,298 @@
+import asyncio
+import functools
+import hashlib
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import httpx
+from sqlalchemy import text
+from starlette.concurrency import run_in_threadpool
+
+from app.core.deadlines import current_deadline
+from app.db.session import make_engine
+from app.models.field_data_source import FieldDataSource
+
+logger = logging.getLogger(__name__)
+
+# Data source types whose options are fetched from `configuration` when requested
+API_SOURCE_TYPE = "api"
+DYNAMIC_SOURCE_TYPE = "dynamic"
+RESOLVED_SOURCE_TYPES = (API_SOURCE_TYPE, DYNAMIC_SOURCE_TYPE)
+
+# Per-source defaults, overridable with `ttl`, `stale_ttl` and `timeout` in the configuration
+DEFAULT_TTL_SECONDS = float(os.getenv("ADMIN_OPTIONS_TTL_SECONDS", "300"))
+DEFAULT_STALE_SECONDS = float(os.getenv("ADMIN_OPTIONS_STALE_SECONDS", "3600"))
+DEFAULT_TIMEOUT_SECONDS = float(os.getenv("ADMIN_OPTIONS_TIMEOUT_SECONDS", "5"))
+# Fetches running at once over all sources
+FETCH_CONCURRENCY = int(os.getenv("ADMIN_OPTIONS_FETCH_CONCURRENCY", "4"))
+MAX_OPTIONS = int(os.getenv("ADMIN_OPTIONS_MAX_ITEMS", "50000"))
+# Hosts api sources may fetch from, comma separated; "*.example.com" matches its
+# subdomains. Empty: api sources are disabled.
+ALLOWED_HOSTS = [host.strip().lower() for host in os.getenv("ADMIN_OPTIONS_ALLOWED_HOSTS", "").split(",") if host.strip()]
+# Login dynamic queries run as, granted SELECT on the tables they may read
+# only. Unset: dynamic sources are disabled. The app's own login cannot be
+# used: a query could read any table, and SET ROLE can be undone from SQL.
+QUERY_DATABASE_URL = os.getenv("ADMIN_OPTIONS_QUERY_DATABASE_URL", "")
+
+query_engine = make_engine(QUERY_DATABASE_URL) if QUERY_DATABASE_URL else None
+
+
+class OptionsFetchError(Exception):
+    pass
+
+
+def host_allowed(url: str) -> bool:
+    host = (urlsplit(url).hostname or "").lower()
+    for allowed in ALLOWED_HOSTS:
+        if host == allowed or (allowed.startswith("*.") and host.endswith(allowed[1:])):
+            return True
+    return False
+
+
+def validate_configuration(source_type: str, configuration: Optional[Dict[str, Any]]):
+    """Raises ValueError when an api or dynamic configuration cannot be resolved"""
+    configuration = configuration or {}
+    if source_type == API_SOURCE_TYPE:
+        url = configuration.get("url")
+        if not isinstance(url, str) or not url.startswith(("http://", "https://")):
+            raise ValueError("api data sources need an http(s) url")
+        if not host_allowed(url):
+            raise ValueError("the url's host is not in ADMIN_OPTIONS_ALLOWED_HOSTS")
+        if configuration.get("method", "GET").upper() not in ("GET", "POST"):
+            raise ValueError("method must be GET or POST")
+    elif source_type == DYNAMIC_SOURCE_TYPE:
+        if query_engine is None:
+            raise ValueError("dynamic data sources need ADMIN_OPTIONS_QUERY_DATABASE_URL")
+        if not isinstance(configuration.get("query"), str) or not configuration["query"].strip():
+            raise ValueError("dynamic data sources need a SQL query")
+    for name in ("ttl", "stale_ttl", "timeout"):
+        if name in configuration:
+            try:
+                if float(configuration[name]) < 0:
+                    raise ValueError
+            except (TypeError, ValueError):
+                raise ValueError(f"{name} must be a non-negative number of seconds")
+
+
+@dataclass(frozen=True)
+class ResolvedOptions:
+    """Options fetched for a data source, with the same paging interface as RangeOptions"""
+    items: Tuple[Dict[str, Any], ...]
+    fetched_at: float
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def options(
+            self,
+            offset: int = 0,
+            prefix: Optional[str] = None,
+            end: Optional[int] = None
+    ) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        prefix = prefix.lower() if prefix else None
+        end = len(self.items) if end is None else min(end, len(self.items))
+        for index in range(max(offset, 0), end):
+            option = self.items[index]
+            if prefix is None or option["display_text"].lower().startswith(prefix):
+                yield index, option
+
+
+def _option(value: Any, display_text: Any = None) -> Dict[str, Any]:
+    value = str(value)
+    return {"id": None, "value": value, "display_text": value if display_text is None else str(display_text)}
+
+
+def _options_from_json(payload: Any, configuration: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Options from a JSON response: the list found at `items_path` (dot
+    separated, the document itself by default), whose elements are scalars or
+    objects read with `value_key` and `label_key`.
+    """
+    items = payload
+    for key in filter(None, configuration.get("items_path", "").split(".")):
+        items = items.get(key) if isinstance(items, dict) else None
+    if not isinstance(items, list):
+        raise OptionsFetchError("the response holds no option list")
+
+    value_key = configuration.get("value_key", "value")
+    label_key = configuration.get("label_key", "label")
+    options = []
+    for item in items:
+        if isinstance(item, dict):
+            if item.get(value_key) is None:
+                continue
+            options.append(_option(item[value_key], item.get(label_key)))
+        elif item is not None:
+            options.append(_option(item))
+    return options
+
+
+async def _fetch_api(configuration: Dict[str, Any], timeout: float) -> List[Dict[str, Any]]:
+    # Checked again here, as the allowlist may have changed since the source was created.
+    # Redirects are not followed, so they cannot lead to another host.
+    if not host_allowed(configuration["url"]):
+        raise OptionsFetchError(f"{configuration['url']}: host not in ADMIN_OPTIONS_ALLOWED_HOSTS")
+    try:
+        async with httpx.AsyncClient(timeout=timeout) as client:
+            response = await client.request(
+                configuration.get("method", "GET").upper(),
+                configuration["url"],
+                params=configuration.get("params"),
+                headers=configuration.get("headers"),
+                json=configuration.get("body"),
+            )
+            response.raise_for_status()
+            payload = response.json()
+    except (httpx.HTTPError, ValueError) as e:
+        raise OptionsFetchError(f"{configuration['url']}: {e}") from e
+    return _options_from_json(payload, configuration)
+
+
+def _fetch_dynamic(configuration: Dict[str, Any], timeout: float) -> List[Dict[str, Any]]:
+    """
+    Run the configured query as the ADMIN_OPTIONS_QUERY_DATABASE_URL login in a
+    read-only transaction; rows are (value[, display text])
+    """
+    if query_engine is None:
+        raise OptionsFetchError("dynamic data sources need ADMIN_OPTIONS_QUERY_DATABASE_URL")
+    try:
+        with query_engine.connect() as connection:
+            connection.exec_driver_sql("SET TRANSACTION READ ONLY")
+            connection.exec_driver_sql(f"SET LOCAL statement_timeout = {max(int(timeout * 1000), 1)}")
+            rows = connection.execute(text(configuration["query"])).fetchmany(MAX_OPTIONS + 1)
+            connection.rollback()
+    except Exception as e:
+        raise OptionsFetchError(f"query failed: {e}") from e
+    return [_option(*row[:2]) for row in rows if row[0] is not None]
+
+
+@dataclass
+class _Entry:
+    fingerprint: str
+    options: ResolvedOptions
+    fresh_until: float
+    stale_until: float
+
+
+class OptionsResolver:
+    """
+    Resolves the options of `api` (HTTP endpoint) and `dynamic` (SQL query)
+    data sources from their configuration.
+
+    - Results are cached per data source for `ttl` seconds; a configuration
+      change is a cache miss.
+    - Concurrent requests for the same source share one fetch.
+    - At most FETCH_CONCURRENCY fetches run at once.
+    - For `stale_ttl` seconds after expiring, the cached options are still
+      served while a background fetch refreshes them, and they are served
+      instead of an error when a fetch fails.
+    """
+
+    def __init__(self, concurrency: int = FETCH_CONCURRENCY):
+        self.concurrency = concurrency
+        self._entries: Dict[int, _Entry] = {}
+        # Running fetches; requests awaiting the same source share them (shielded,
+        # so a cancelled request does not cancel the fetch for the others)
+        self._inflight: Dict[Tuple[int, str], asyncio.Task] = {}
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+
+    def clear(self):
+        self._entries.clear()
+
+    async def close(self):
+        """Stop running fetches, drop the cached options and close the query login's connections"""
+        fetches = list(self._inflight.values())
+        for fetch in fetches:
+            fetch.cancel()
+        await asyncio.gather(*fetches, return_exceptions=True)
+        self._entries.clear()
+        if query_engine is not None:
+            query_engine.dispose()
+
+    async def resolve(self, data_source: FieldDataSource) -> ResolvedOptions:
+        configuration = data_source.configuration or {}
+        fingerprint = hashlib.sha1(
+            json.dumps([data_source.source_type, configuration], sort_keys=True, default=str).encode()
+        ).hexdigest()
+        now = time.monotonic()
+
+        entry = self._entries.get(data_source.id)
+        if entry is not None and entry.fingerprint == fingerprint:
+            if now < entry.fresh_until:
+                self.hits += 1
+                return entry.options
+            if now < entry.stale_until:
+                self.stale_hits += 1
+                self._start_fetch(data_source, fingerprint)
+                return entry.options
+
+        self.misses += 1
+        return await asyncio.shield(self._start_fetch(data_source, fingerprint))
+
+    def _start_fetch(self, data_source: FieldDataSource, fingerprint: str) -> asyncio.Task:
+        """The fetch of this source and configuration, started unless one is already running"""
+        key = (data_source.id, fingerprint)
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(
+                self._fetch(data_source.id, data_source.source_type, data_source.configuration or {}, fingerprint)
+            )
+            self._inflight[key] = task
+            task.add_done_callback(functools.partial(self._fetch_done, key))
+        return task
+
+    def _fetch_done(self, key: Tuple[int, str], task: asyncio.Task):
+        self._inflight.pop(key, None)
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"Fetching the options of data source {key[0]} failed: {task.exception()}")
+
+    async def _fetch(self, source_id: int, source_type: str, configuration: Dict[str, Any], fingerprint: str) -> ResolvedOptions:
+        timeout = float(configuration.get("timeout", DEFAULT_TIMEOUT_SECONDS))
+        deadline = current_deadline()
+        if deadline is not None:
+            timeout = max(min(timeout, deadline.remaining()), 0.1)
+
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        started = time.perf_counter()
+        try:
+            async with self._semaphore:
+                if source_type == API_SOURCE_TYPE:
+                    items = await _fetch_api(configuration, timeout)
+                else:
+                    items = await run_in_threadpool(_fetch_dynamic, configuration, timeout)
+        except OptionsFetchError as e:
+            entry = self._entries.get(source_id)
+            if entry is not None and entry.fingerprint == fingerprint and time.monotonic() < entry.stale_until:
+                logger.warning(f"Serving stale options of data source {source_id}: {e}")
+                return entry.options
+            raise
+
+        if len(items) > MAX_OPTIONS:
+            logger.warning(f"Data source {source_id} returned more than {MAX_OPTIONS} options, truncating")
+            items = items[:MAX_OPTIONS]
+        now = time.monotonic()
+        options = ResolvedOptions(items=tuple(items), fetched_at=time.time())
+        ttl = float(configuration.get("ttl", DEFAULT_TTL_SECONDS))
+        self._entries[source_id] = _Entry(
+            fingerprint=fingerprint,
+            options=options,
+            fresh_until=now + ttl,
+            stale_until=now + ttl + float(configuration.get("stale_ttl", DEFAULT_STALE_SECONDS)),
+        )
+        logger.info(
+            f"Resolved {len(items)} options of data source {source_id} "
+            f"in {(time.perf_counter() - started) * 1000:.0f} ms"
+        )
+        return options
+
+
+options_resolver = OptionsResolver()
@@ -0,0 +1,123 @@
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Any, Collection, Dict, Optional
+
+from sqlalchemy import Integer, any_, bindparam, cast, delete, exists, func, or_, select
+from sqlalchemy.dialects.postgresql import ARRAY, insert
+from sqlmodel import Session
+
+from app.core.response_cache import response_cache
+from app.db.session import engine
+from app.models.item_statistics import ItemStatistics
+from app.models.reviewer_activity import ReviewerActivity
+from app.models.user_rating import UserRating
+
+logger = logging.getLogger(__name__)
+
+# Seconds between incremental refreshes; 0 disables the background refresh
+REVIEWER_REFRESH_SECONDS = float(os.getenv("ADMIN_REVIEWER_REFRESH_SECONDS", "300"))
+# Ratings may commit after a refresh saw newer ones, so refreshes look back this far
+RATINGS_LAG = timedelta(minutes=5)
+# Advisory lock held by the refreshing transaction, so workers do not refresh at the same time
+_REFRESH_LOCK_ID = 0x72657669
+
+SUMMARY_COLUMNS = (
+    "user_id", "ratings_count", "avg_rating", "avg_deviation", "avg_bias",
+    "first_rated_at", "last_rated_at", "ratings_updated_at", "refreshed_at",
+)
+
+
+def _build_summary_statement(all_users: bool):
+    # Average of the other ratings of the item: the user's own rating left out
+    others_avg = (
+        (ItemStatistics.avg_rating * ItemStatistics.ratings_count - UserRating.rating)
+        / func.nullif(ItemStatistics.ratings_count - 1, 0)
+    )
+    summary = (
+        select(
+            UserRating.user_id,
+            func.count(UserRating.id),
+            func.avg(UserRating.rating),
+            func.avg(func.abs(UserRating.rating - others_avg)),
+            func.avg(UserRating.rating - others_avg),
+            func.min(UserRating.created_at),
+            func.max(UserRating.created_at),
+            func.max(UserRating.updated_at),
+            bindparam("b_now"),
+        )
+        .outerjoin(ItemStatistics, ItemStatistics.item_id == UserRating.item_id)
+        .group_by(UserRating.user_id)
+    )
+    if not all_users:
+        summary = summary.where(UserRating.user_id == any_(cast(bindparam("p_user_ids"), ARRAY(Integer()))))
+    statement = insert(ReviewerActivity.__table__).from_select(SUMMARY_COLUMNS, summary)
+    return statement.on_conflict_do_update(
+        index_elements=["user_id"],
+        set_={name: statement.excluded[name] for name in SUMMARY_COLUMNS[1:]}
+    )
+
+
+# Summaries are recomputed from the user's ratings, read through ix_user_ratings_user_id_created_at
+_SUMMARIZE_USERS = _build_summary_statement(all_users=False)
+_SUMMARIZE_ALL = _build_summary_statement(all_users=True)
+
+
+def summarize_reviewers(session: Session, user_ids: Collection[int]) -> int:
+    """
+    Recompute the activity of these users from their ratings, dropping users
+    with none left. Call it after changing or deleting ratings; the caller
+    commits.
+    """
+    user_ids = sorted(set(user_ids))
+    if not user_ids:
+        return 0
+    session.execute(_SUMMARIZE_USERS, {"b_now": datetime.utcnow(), "p_user_ids": user_ids})
+    session.execute(
+        delete(ReviewerActivity)
+        .where(ReviewerActivity.user_id.in_(user_ids))
+        .where(~exists().where(UserRating.user_id == ReviewerActivity.user_id))
+    )
+    return len(user_ids)
+
+
+def refresh_reviewer_activity(session: Session, full: bool = False) -> Optional[Dict[str, Any]]:
+    """
+    Summarize the users whose ratings changed (updated_at newer than their
+    summary) since the last refresh; `full` rebuilds the table. Deviations
+    are measured against item averages that move as others rate, so a user's
+    deviation is as of their own last change or the last full rebuild.
+    Returns None when another transaction is refreshing. The caller commits.
+    """
+    if not session.execute(select(func.pg_try_advisory_xact_lock(_REFRESH_LOCK_ID))).scalar_one():
+        return None
+
+    latest = None if full else session.execute(select(func.max(ReviewerActivity.ratings_updated_at))).scalar_one()
+    if latest is None:
+        session.execute(delete(ReviewerActivity))
+        session.execute(_SUMMARIZE_ALL, {"b_now": datetime.utcnow()})
+        return {"summarized": session.execute(select(func.count()).select_from(ReviewerActivity)).scalar_one()}
+
+    user_ids = session.execute(
+        select(UserRating.user_id)
+        .outerjoin(ReviewerActivity, ReviewerActivity.user_id == UserRating.user_id)
+        .where(UserRating.updated_at > latest - RATINGS_LAG)
+        .where(or_(
+            ReviewerActivity.user_id.is_(None),
+            UserRating.updated_at > ReviewerActivity.ratings_updated_at
+        ))
+        .group_by(UserRating.user_id)
+    ).scalars().all()
+    return {"summarized": summarize_reviewers(session, user_ids)}
+
+
+def refresh_reviewers(full: bool = False) -> Optional[Dict[str, Any]]:
+    started = time.perf_counter()
+    with Session(engine) as session:
+        result = refresh_reviewer_activity(session, full)
+        session.commit()
+    if result is not None and result["summarized"]:
+        response_cache.invalidate("reviewers")
+        logger.info(f"Refreshed reviewer activity in {(time.perf_counter() - started) * 1000:.0f} ms: {result}")
+    return result
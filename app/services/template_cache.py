@@ -0,0 +1,110 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional
+
+
+# Entries also expire, so writes handled by other worker processes are picked up
+TEMPLATE_CACHE_TTL_SECONDS = float(os.getenv("ADMIN_TEMPLATE_CACHE_TTL_SECONDS", "60"))
+
+
+@dataclass(frozen=True)
+class CachedTemplate:
+    version: int
+    etag: str
+    payload: Dict[str, Any]
+    expires_at: float
+
+
+class TemplateDefinitionCache:
+    """
+    In-process cache of assembled template definitions (template, fields and
+    creator/updater names). Every write to a template bumps its version
+    counter; an entry is only served while its version is still current, so a
+    write never has to know which entries exist. Versions are per process, so
+    entries also expire after `ttl` seconds for writes made in other workers.
+    """
+
+    def __init__(self, ttl: float = TEMPLATE_CACHE_TTL_SECONDS):
+        self.ttl = ttl
+        self._entries: Dict[int, CachedTemplate] = {}
+        self._versions: Dict[int, int] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def version(self, template_id: int) -> int:
+        return self._versions.get(template_id, 0)
+
+    def snapshot(self) -> Dict[int, int]:
+        """Versions of all templates, for caches that learn which template they need only after loading"""
+        return dict(self._versions)
+
+    def bump(self, template_id: int) -> int:
+        with self._lock:
+            version = self._versions.get(template_id, 0) + 1
+            self._versions[template_id] = version
+            self._entries.pop(template_id, None)
+        return version
+
+    def clear(self):
+        with self._lock:
+            for template_id in list(self._entries):
+                self._versions[template_id] = self._versions.get(template_id, 0) + 1
+            self._entries.clear()
+
+    def get(self, template_id: int) -> Optional[CachedTemplate]:
+        entry = self._entries.get(template_id)
+        if entry is not None and entry.version == self.version(template_id) and entry.expires_at > time.monotonic():
+            self.hits += 1
+            return entry
+        self.misses += 1
+        return None
+
+    def get_or_load(
+            self,
+            template_id: int,
+            loader: Callable[[], Optional[Dict[str, Any]]]
+    ) -> Optional[CachedTemplate]:
+        """
+        Return the cached definition or build it with `loader`. The version is
+        read before loading, so a definition loaded while a write bumps the
+        version is stored as already stale and reloaded on the next request.
+        """
+        entry = self.get(template_id)
+        if entry is not None:
+            return entry
+
+        version = self.version(template_id)
+        payload = loader()
+        if payload is None:
+            return None
+
+        entry = CachedTemplate(
+            version=version,
+            etag=make_etag(payload),
+            payload=payload,
+            expires_at=time.monotonic() + self.ttl
+        )
+        with self._lock:
+            if version == self.version(template_id):
+                self._entries[template_id] = entry
+        return entry
+
+
+def make_etag(payload: Dict[str, Any]) -> str:
+    body = json.dumps(payload, sort_keys=True, default=str).encode("utf-8")
+    return '"' + hashlib.sha1(body).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+template_cache = TemplateDefinitionCache()
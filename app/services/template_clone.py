@@ -0,0 +1,85 @@
+from dataclasses import dataclass
+from datetime import datetime
+
+from sqlalchemy import text
+from sqlmodel import Session
+
+from app.services.template_fields import FIELD_COLUMNS
+
+_FIELD_COLUMN_LIST = ", ".join(FIELD_COLUMNS)
+_SOURCE_FIELD_COLUMNS = ", ".join(f"f.{name}" for name in FIELD_COLUMNS)
+
+# New ids are drawn from the sequences up front so the old -> new mapping is
+# known before anything is copied; field values are then remapped with joins.
+_MAP_FIELDS = text("""
+    CREATE TEMPORARY TABLE clone_field_map ON COMMIT DROP AS
+    SELECT id AS old_id, nextval(pg_get_serial_sequence('template_fields', 'id')) AS new_id
+    FROM template_fields
+    WHERE template_id = :source_id
+""")
+
+_COPY_FIELDS = text(f"""
+    INSERT INTO template_fields (id, template_id, {_FIELD_COLUMN_LIST}, created_at, updated_at)
+    SELECT m.new_id, :target_id, {_SOURCE_FIELD_COLUMNS}, :now, :now
+    FROM template_fields f
+    JOIN clone_field_map m ON m.old_id = f.id
+""")
+
+_MAP_ITEMS = text("""
+    CREATE TEMPORARY TABLE clone_item_map ON COMMIT DROP AS
+    SELECT id AS old_id, nextval(pg_get_serial_sequence('items', 'id')) AS new_id
+    FROM items
+    WHERE template_id = :source_id
+""")
+
+_COPY_ITEMS = text("""
+    INSERT INTO items (id, template_id, title, slug, created_by, created_at, updated_at)
+    SELECT m.new_id, :target_id, i.title, left(i.slug, 240) || '-' || :slug_suffix, i.created_by, :now, :now
+    FROM items i
+    JOIN clone_item_map m ON m.old_id = i.id
+""")
+
+_COPY_FIELD_VALUES = text("""
+    INSERT INTO item_field_values
+        (item_id, field_id, text_value, numeric_value, date_value, boolean_value, json_value, created_at, updated_at)
+    SELECT im.new_id, fm.new_id, v.text_value, v.numeric_value, v.date_value, v.boolean_value, v.json_value, :now, :now
+    FROM item_field_values v
+    JOIN clone_item_map im ON im.old_id = v.item_id
+    JOIN clone_field_map fm ON fm.old_id = v.field_id
+""")
+
+
+@dataclass
+class CloneResult:
+    fields: int = 0
+    items: int = 0
+    field_values: int = 0
+
+
+def copy_template_contents(
+        session: Session,
+        source_id: int,
+        target_id: int,
+        include_items: bool = False
+) -> CloneResult:
+    """
+    Copy the fields of a template, and optionally its items with their field
+    values, into another template using INSERT ... SELECT statements so no rows
+    pass through the application. Ratings and statistics are not copied; cloned
+    items start without them. Cloned item slugs get a `-<target id>` suffix to
+    stay unique. Must run inside the caller's transaction, which commits.
+    """
+    now = datetime.utcnow()
+    result = CloneResult()
+
+    session.execute(_MAP_FIELDS, {"source_id": source_id})
+    result.fields = session.execute(_COPY_FIELDS, {"target_id": target_id, "now": now}).rowcount
+
+    if include_items:
+        session.execute(_MAP_ITEMS, {"source_id": source_id})
+        result.items = session.execute(
+            _COPY_ITEMS, {"target_id": target_id, "slug_suffix": str(target_id), "now": now}
+        ).rowcount
+        result.field_values = session.execute(_COPY_FIELD_VALUES, {"now": now}).rowcount
+
+    return result
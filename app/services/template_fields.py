@@ -0,0 +1,180 @@
+import json
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import Integer, Text, bindparam, cast, delete, func, insert, select, update
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB
+from sqlmodel import Session
+
+from app.models.template_field import TemplateField
+from app.schemas.template import TemplateFieldCreate
+
+# TemplateField columns written from the template editor payload
+FIELD_COLUMNS = (
+    "name",
+    "display_name",
+    "description",
+    "field_type",
+    "is_required",
+    "is_searchable",
+    "is_filterable",
+    "display_order",
+    "data_source_id",
+    "validation_rules",
+)
+
+
+class FieldDiffError(ValueError):
+    pass
+
+
+@dataclass
+class FieldDiff:
+    inserts: List[Dict[str, Any]] = field(default_factory=list)
+    updates: List[Dict[str, Any]] = field(default_factory=list)
+    deletes: List[int] = field(default_factory=list)
+    unchanged: int = 0
+
+
+def field_payload(field_data: TemplateFieldCreate) -> Dict[str, Any]:
+    return {name: getattr(field_data, name) for name in FIELD_COLUMNS}
+
+
+def load_field_rows(session: Session, template_id: int) -> Dict[int, Dict[str, Any]]:
+    """Current fields of a template as plain rows keyed by id"""
+    table = TemplateField.__table__
+    rows = session.execute(
+        select(table.c.id, *(table.c[name] for name in FIELD_COLUMNS))
+        .where(table.c.template_id == template_id)
+    ).mappings().all()
+    return {row["id"]: dict(row) for row in rows}
+
+
+def compute_field_diff(
+        existing: Dict[int, Dict[str, Any]],
+        incoming: Iterable[TemplateFieldCreate]
+) -> FieldDiff:
+    """
+    Compare the fields sent by the editor with the stored ones. Fields with an id
+    are updates (skipped when nothing changed), fields without an id (or -1) are
+    inserts and stored fields missing from the payload are deletes.
+    """
+    diff = FieldDiff()
+    existing_names = {row["name"] for row in existing.values()}
+    seen_ids = set()
+
+    for field_data in incoming:
+        payload = field_payload(field_data)
+        if field_data.id is not None and field_data.id != -1:
+            current = existing.get(field_data.id)
+            if current is None:
+                raise FieldDiffError(f"Field with id {field_data.id} does not exist")
+            seen_ids.add(field_data.id)
+            if all(current[name] == payload[name] for name in FIELD_COLUMNS):
+                diff.unchanged += 1
+            else:
+                diff.updates.append({"id": field_data.id, **payload})
+        else:
+            if field_data.name in existing_names:
+                raise FieldDiffError(f"Field with name {field_data.name} already exists for this template")
+            diff.inserts.append(payload)
+
+    diff.deletes = [field_id for field_id in existing if field_id not in seen_ids]
+    return diff
+
+
+def _unnest_rows(columns: Tuple[str, ...]):
+    """
+    Table-valued unnest() over one array parameter per column, so a statement
+    carries any number of rows with a fixed set of bind parameters and is
+    compiled once and reused from SQLAlchemy's statement cache.
+    """
+    table = TemplateField.__table__
+    arrays = []
+    for name in columns:
+        column_type = Integer() if name == "id" else table.c[name].type
+        # JSONB values travel as text and are cast back when written
+        element_type = Text() if isinstance(column_type, JSONB) else column_type
+        arrays.append(cast(bindparam(f"p_{name}"), ARRAY(element_type)))
+    return func.unnest(*arrays).table_valued(*columns).render_derived(name="incoming", with_types=False)
+
+
+def _array_params(rows: List[Dict[str, Any]], columns: Tuple[str, ...]) -> Dict[str, List[Any]]:
+    params = {}
+    for name in columns:
+        if name == "validation_rules":
+            params[f"p_{name}"] = [None if row[name] is None else json.dumps(row[name]) for row in rows]
+        else:
+            params[f"p_{name}"] = [row[name] for row in rows]
+    return params
+
+
+def _value(incoming, name: str):
+    column_type = TemplateField.__table__.c[name].type
+    if isinstance(column_type, JSONB):
+        return cast(incoming.c[name], JSONB)
+    return incoming.c[name]
+
+
+def _build_insert_statement():
+    table = TemplateField.__table__
+    incoming = _unnest_rows(FIELD_COLUMNS)
+    now = bindparam("b_now")
+    return insert(table).from_select(
+        ["template_id", *FIELD_COLUMNS, "created_at", "updated_at"],
+        select(
+            bindparam("b_template_id", type_=Integer()),
+            *(_value(incoming, name) for name in FIELD_COLUMNS),
+            now,
+            now,
+        ).select_from(incoming)
+    )
+
+
+def _build_update_statement():
+    table = TemplateField.__table__
+    incoming = _unnest_rows(("id",) + FIELD_COLUMNS)
+    return (
+        update(table)
+        .where(table.c.id == incoming.c.id, table.c.template_id == bindparam("b_template_id"))
+        .values(updated_at=bindparam("b_now"), **{name: _value(incoming, name) for name in FIELD_COLUMNS})
+    )
+
+
+_INSERT_FIELDS = _build_insert_statement()
+_UPDATE_FIELDS = _build_update_statement()
+
+
+def insert_fields(session: Session, template_id: int, rows: List[Dict[str, Any]], now: Optional[datetime] = None):
+    """Insert fields with a single INSERT ... SELECT FROM unnest(...)"""
+    if not rows:
+        return
+    session.execute(_INSERT_FIELDS, {
+        "b_template_id": template_id,
+        "b_now": now or datetime.utcnow(),
+        **_array_params(rows, FIELD_COLUMNS),
+    })
+
+
+def apply_field_diff(session: Session, template_id: int, diff: FieldDiff, now: Optional[datetime] = None):
+    """
+    Write a diff with at most three statements (DELETE, UPDATE ... FROM unnest,
+    INSERT ... SELECT FROM unnest) whatever the number of fields. The caller commits.
+    """
+    table = TemplateField.__table__
+    now = now or datetime.utcnow()
+
+    if diff.deletes:
+        session.execute(
+            delete(table).where(table.c.template_id == template_id, table.c.id.in_(diff.deletes))
+        )
+
+    if diff.updates:
+        session.execute(_UPDATE_FIELDS, {
+            "b_template_id": template_id,
+            "b_now": now,
+            **_array_params(diff.updates, ("id",) + FIELD_COLUMNS),
+        })
+
+    insert_fields(session, template_id, diff.inserts, now)
@@ -0,0 +1,272 @@
+import logging
+import re
+from dataclasses import dataclass
+from datetime import date
+from typing import Any, Callable, Container, Dict, Iterable, List, Optional, Tuple
+
+from sqlmodel import Session, select
+
+from app.models.field_data_source import FieldDataSource
+from app.models.field_data_source_option import FieldDataSourceOption
+from app.services.data_source_options import RANGE_SOURCE_TYPE, RangeOptions
+from app.models.template import Template
+from app.models.template_field import TemplateField
+
+logger = logging.getLogger(__name__)
+
+# A compiled check returns an error message, or None when the value is valid
+Check = Callable[[Any], Optional[str]]
+
+# validation_rules keys accepted for each rule, as sent by the admin frontend (camelCase) or snake_case
+RULE_ALIASES = {
+    "required": ("required",),
+    "min": ("min", "minValue", "min_value"),
+    "max": ("max", "maxValue", "max_value"),
+    "min_length": ("minLength", "min_length"),
+    "max_length": ("maxLength", "max_length"),
+    "pattern": ("pattern", "regex"),
+    "options": ("options", "allowedValues", "allowed_values"),
+}
+
+OPTION_FIELD_TYPES = ("select", "multiselect")
+# Field types min/max and minLength/maxLength apply to
+BOUND_FIELD_TYPES = ("number", "date")
+LENGTH_FIELD_TYPES = ("text", "textarea", "multiselect")
+
+
+@dataclass(frozen=True)
+class FieldSpec:
+    """Plain copy of the TemplateField attributes needed outside a session"""
+    id: int
+    name: str
+    field_type: str
+    is_required: bool
+    data_source_id: Optional[int]
+    validation_rules: Optional[Dict[str, Any]]
+
+    @classmethod
+    def from_model(cls, field: TemplateField) -> "FieldSpec":
+        return cls(
+            id=field.id,
+            name=field.name,
+            field_type=field.field_type,
+            is_required=field.is_required,
+            data_source_id=field.data_source_id,
+            validation_rules=field.validation_rules,
+        )
+
+
+def get_rule(rules: Dict[str, Any], name: str) -> Any:
+    for key in RULE_ALIASES[name]:
+        if rules.get(key) is not None:
+            return rules[key]
+    return None
+
+
+def _bound(field: FieldSpec, raw: Any):
+    if field.field_type == "date":
+        return date.fromisoformat(str(raw)[:10])
+    return float(raw)
+
+
+def _ignore_rule(field: FieldSpec, rule: str, reason: str):
+    logger.warning(f"Ignoring validation rule '{rule}' of field '{field.name}' ({field.field_type}): {reason}")
+
+
+def _compile_field(field: FieldSpec, options: Optional[Container[str]]) -> List[Check]:
+    """
+    Checks of the rules that apply to the field type. Rules that do not apply
+    (a length on a number, a bound on a text) or do not parse are logged and
+    skipped here, so they cannot reject every row at validation time.
+    """
+    rules = field.validation_rules or {}
+    checks: List[Check] = []
+    name = field.name
+
+    for rule in ("min", "max"):
+        raw = get_rule(rules, rule)
+        if raw is None:
+            continue
+        if field.field_type not in BOUND_FIELD_TYPES:
+            _ignore_rule(field, rule, "only number and date fields have bounds")
+            continue
+        try:
+            bound = _bound(field, raw)
+        except (TypeError, ValueError):
+            _ignore_rule(field, rule, f"'{raw}' is not a {field.field_type}")
+            continue
+        if rule == "min":
+            checks.append(lambda v, bound=bound, raw=raw: None if v >= bound else f"Field '{name}' must be at least {raw}")
+        else:
+            checks.append(lambda v, bound=bound, raw=raw: None if v <= bound else f"Field '{name}' must be at most {raw}")
+
+    for rule in ("min_length", "max_length"):
+        raw = get_rule(rules, rule)
+        if raw is None:
+            continue
+        if field.field_type not in LENGTH_FIELD_TYPES:
+            _ignore_rule(field, rule, "only text and multiselect fields have lengths")
+            continue
+        try:
+            length = int(raw)
+        except (TypeError, ValueError):
+            _ignore_rule(field, rule, f"'{raw}' is not an integer")
+            continue
+        if rule == "min_length":
+            checks.append(
+                lambda v, length=length: None if len(v) >= length else f"Field '{name}' must have at least {length} characters"
+            )
+        else:
+            checks.append(
+                lambda v, length=length: None if len(v) <= length else f"Field '{name}' must have at most {length} characters"
+            )
+
+    pattern = get_rule(rules, "pattern")
+    if pattern is not None:
+        try:
+            matcher = re.compile(str(pattern)).fullmatch
+        except re.error as e:
+            _ignore_rule(field, "pattern", f"invalid regular expression ({e})")
+        else:
+            checks.append(lambda v: None if matcher(str(v)) else f"Field '{name}' does not match the required format")
+
+    if options is not None:
+        if field.field_type == "multiselect":
+            def check_options(v):
+                for element in v if isinstance(v, list) else [v]:
+                    if str(element) not in options:
+                        return f"'{element}' is not an allowed option for field '{name}'"
+                return None
+        else:
+            def check_options(v):
+                return None if str(v) in options else f"'{v}' is not an allowed option for field '{name}'"
+        checks.append(check_options)
+
+    return checks
+
+
+class TemplateValidator:
+    """
+    Validation rules of one template version compiled into plain Python checks.
+    Rules are parsed, regexes compiled and option lists turned into sets once,
+    so validating a row is only a loop over prepared closures.
+    """
+
+    def __init__(
+            self,
+            template_id: int,
+            version: Any,
+            fields: Iterable[FieldSpec],
+            options_by_source: Optional[Dict[int, Container[str]]] = None
+    ):
+        self.template_id = template_id
+        self.version = version
+        self.fields = list(fields)
+        self.fields_by_name = {f.name: f for f in self.fields}
+        options_by_source = options_by_source or {}
+
+        self._compiled: List[Tuple[str, bool, List[Check]]] = []
+        for field in self.fields:
+            rules = field.validation_rules or {}
+            required = field.is_required or bool(get_rule(rules, "required"))
+
+            options = None
+            if field.field_type in OPTION_FIELD_TYPES:
+                allowed = get_rule(rules, "options")
+                if allowed is not None and not isinstance(allowed, list):
+                    _ignore_rule(field, "options", "expected a list of options")
+                elif allowed is not None:
+                    options = frozenset(str(o.get("value") if isinstance(o, dict) else o) for o in allowed)
+                elif options_by_source.get(field.data_source_id):
+                    options = options_by_source[field.data_source_id]
+
+            self._compiled.append((field.name, required, _compile_field(field, options)))
+
+    def validate(self, values: Dict[str, Any], first_only: bool = False) -> List[Tuple[str, str]]:
+        """
+        Validate coerced field values keyed by field name.
+        Returns a list of (field name, message); empty when the values are valid.
+        """
+        errors = []
+        for name, required, checks in self._compiled:
+            value = values.get(name)
+            if value is None or value == "" or value == []:
+                if required:
+                    errors.append((name, f"Field '{name}' is required"))
+                    if first_only:
+                        return errors
+                continue
+            for check in checks:
+                try:
+                    message = check(value)
+                except TypeError:
+                    message = f"Field '{name}' has an invalid value"
+                if message:
+                    errors.append((name, message))
+                    if first_only:
+                        return errors
+                    break
+        return errors
+
+
+# template id -> compiled validator of the latest version seen
+_validators: Dict[int, TemplateValidator] = {}
+
+
+def _template_version(session: Session, template_id: int) -> Any:
+    return session.exec(select(Template.updated_at).where(Template.id == template_id)).first()
+
+
+def build_template_validator(session: Session, template_id: int, version: Any = None) -> TemplateValidator:
+    fields = [
+        FieldSpec.from_model(f) for f in session.exec(
+            select(TemplateField)
+            .where(TemplateField.template_id == template_id)
+            .order_by(TemplateField.display_order)
+        ).all()
+    ]
+
+    source_ids = {
+        f.data_source_id for f in fields
+        if f.data_source_id is not None and f.field_type in OPTION_FIELD_TYPES
+    }
+    options_by_source: Dict[int, Container[str]] = {}
+    if source_ids:
+        # Range sources check membership arithmetically instead of loading option rows
+        ranges = session.exec(
+            select(FieldDataSource.id, FieldDataSource.configuration)
+            .where(FieldDataSource.id.in_(source_ids), FieldDataSource.source_type == RANGE_SOURCE_TYPE)
+        ).all()
+        for source_id, configuration in ranges:
+            try:
+                options_by_source[source_id] = RangeOptions.from_configuration(configuration)
+            except ValueError:
+                logger.warning(f"Ignoring invalid range configuration of data source {source_id}", exc_info=True)
+
+        stored: Dict[int, set] = {}
+        rows = session.exec(
+            select(FieldDataSourceOption.data_source_id, FieldDataSourceOption.value)
+            .where(FieldDataSourceOption.data_source_id.in_(source_ids - set(options_by_source)))
+        ).all()
+        for source_id, value in rows:
+            stored.setdefault(source_id, set()).add(value)
+        options_by_source.update((source_id, frozenset(values)) for source_id, values in stored.items())
+
+    return TemplateValidator(template_id, version, fields, options_by_source)
+
+
+def get_template_validator(session: Session, template_id: int) -> TemplateValidator:
+    """
+    Return the compiled validator for a template, rebuilding it only when the
+    template changed since it was compiled.
+    """
+    version = _template_version(session, template_id)
+    validator = _validators.get(template_id)
+    if validator is None or validator.version != version:
+        validator = build_template_validator(session, template_id, version)
+        _validators[template_id] = validator
+    return validator
+
+
+def invalidate_template_validator(template_id: int):
+    _validators.pop(template_id, None)
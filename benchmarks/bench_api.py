@@ -0,0 +1,380 @@
+"""
+Benchmark every API endpoint in-process through an ASGI client against a
+seeded local database (see benchmarks/seed.py), and store the results as
+JSON so runs can be compared.
+
+Usage:
+    python -m benchmarks.bench_api --requests 200 --output results.json
+    python -m benchmarks.bench_api --compare before.json after.json
+
+Responses are measured warm (response and template caches enabled) unless
+--cold is given, which clears the in-process caches before every request.
+The import and clone scenarios remove what they create after each request,
+outside the latencies (their throughput includes it). The periodic
+leaderboard and reviewer refreshes are turned off; the benchmark refreshes
+both tables once before measuring.
+"""
+import argparse
+import asyncio
+import csv
+import io
+import itertools
+import json
+import logging
+import os
+import platform
+import re
+import subprocess
+import sys
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import httpx
+from sqlalchemy import delete, select
+
+# Background refreshes would add database load and cache invalidations to the timed runs
+os.environ["ADMIN_LEADERBOARD_REFRESH_SECONDS"] = "0"
+os.environ["ADMIN_REVIEWER_REFRESH_SECONDS"] = "0"
+
+IMPORT_STARTED = time.perf_counter()
+from app.main import app  # noqa: E402
+IMPORT_SECONDS = time.perf_counter() - IMPORT_STARTED
+
+from app.core.response_cache import response_cache  # noqa: E402
+from app.core.security import create_access_token  # noqa: E402
+from app.db.session import engine  # noqa: E402
+from app.models.item import Item  # noqa: E402
+from app.models.item_field_value import ItemFieldValue  # noqa: E402
+from app.services.item_cache import item_cache  # noqa: E402
+from app.services.template_cache import template_cache  # noqa: E402
+from benchmarks.seed import BENCH_ADMIN_PASSWORD, BENCH_ADMIN_USERNAME  # noqa: E402
+
+_QUERY_COUNT = re.compile(r'desc="(\d+) queries"')
+
+IMPORT_ROWS = 50
+IMPORT_SLUG_PREFIX = "bench-import-"
+# CSV value written for each field type by the import scenario (seeded option values for selects)
+IMPORT_VALUES = {
+    "text": "Imported value",
+    "textarea": "Imported value",
+    "number": "42",
+    "date": "2001-02-03",
+    "boolean": "true",
+    "select": "option-1",
+    "multiselect": "option-1,option-2",
+}
+
+
+@dataclass
+class Scenario:
+    name: str
+    method: str
+    path: str
+    body: Optional[Dict[str, Any]] = None
+    form: Optional[Dict[str, str]] = None
+    auth: bool = True
+    # Multipart files, built anew for every request
+    files: Optional[Callable[[], Dict[str, Tuple[str, bytes]]]] = None
+    # Untimed clean-up after every request, given the client, headers and response
+    after: Optional[Callable[[httpx.AsyncClient, Dict[str, str], httpx.Response], Awaitable[None]]] = None
+    # Run one request at a time whatever --concurrency is (requests that conflict with each other)
+    serial: bool = False
+
+
+def import_file_factory(template: Dict[str, Any]) -> Callable[[], Dict[str, Tuple[str, bytes]]]:
+    """CSV files of IMPORT_ROWS new items of the template, with unique slugs"""
+    fields = [f for f in template["fields"] if f["fieldType"] in IMPORT_VALUES]
+    counter = itertools.count()
+
+    def build():
+        batch = next(counter)
+        out = io.StringIO()
+        writer = csv.writer(out)
+        writer.writerow(["title", "slug", *(f["name"] for f in fields)])
+        for row in range(IMPORT_ROWS):
+            slug = f"{IMPORT_SLUG_PREFIX}{os.getpid()}-{batch}-{row}"
+            writer.writerow([f"Imported {batch}-{row}", slug, *(IMPORT_VALUES[f["fieldType"]] for f in fields)])
+        return {"file": ("items.csv", out.getvalue().encode())}
+
+    return build
+
+
+def _delete_imported_items():
+    with engine.begin() as connection:
+        imported = select(Item.id).where(Item.slug.startswith(IMPORT_SLUG_PREFIX)).scalar_subquery()
+        connection.execute(delete(ItemFieldValue).where(ItemFieldValue.item_id.in_(imported)))
+        connection.execute(delete(Item).where(Item.slug.startswith(IMPORT_SLUG_PREFIX)))
+
+
+async def delete_imported_items(client: httpx.AsyncClient, headers: Dict[str, str], response: httpx.Response):
+    await asyncio.to_thread(_delete_imported_items)
+
+
+async def delete_clone(client: httpx.AsyncClient, headers: Dict[str, str], response: httpx.Response):
+    if response.status_code < 400:
+        clone_id = response.json()["data"]["template"]["id"]
+        await client.delete(f"/api/v1/templates/{clone_id}", headers=headers)
+
+
+def build_scenarios(
+        item_id: int,
+        item_slug: str,
+        template_id: int,
+        template: Dict[str, Any],
+        data_source_id: Optional[int],
+        created_by: int
+) -> List[Scenario]:
+    scenarios = [
+        Scenario("root", "GET", "/", auth=False),
+        Scenario("health_ready", "GET", "/health/ready", auth=False),
+        Scenario("auth_token", "POST", "/api/v1/auth/token", auth=False,
+                 form={"username": BENCH_ADMIN_USERNAME, "password": BENCH_ADMIN_PASSWORD}),
+        Scenario("users_me", "GET", "/api/v1/users/me"),
+        Scenario("users_list", "GET", "/api/v1/users?pageNo=1&pageSize=10"),
+        Scenario("users_roles", "GET", "/api/v1/users/roles"),
+        Scenario("data_sources", "GET", "/api/v1/data-sources"),
+        Scenario("templates_list", "GET", "/api/v1/templates?pageNo=1&pageSize=10"),
+        Scenario("template_detail", "GET", f"/api/v1/templates/{template_id}"),
+        Scenario("template_update", "PUT", f"/api/v1/templates/{template_id}", body=template),
+        Scenario("items_list", "GET", "/api/v1/items?pageNo=1&pageSize=20"),
+        Scenario("items_list_by_template", "GET", f"/api/v1/items?templateId={template_id}&sortField=avg_rating"),
+        Scenario("items_search", "GET", "/api/v1/items?title=Item%2012&pageSize=20"),
+        Scenario("item_detail", "GET", f"/api/v1/items/{item_id}"),
+        Scenario("item_by_slug", "GET", f"/api/v1/items/by-slug/{item_slug}"),
+        Scenario("item_ratings", "GET", f"/api/v1/items/{item_id}/ratings?pageSize=20"),
+        Scenario("statistics_total", "GET", "/api/v1/statistics/total"),
+        Scenario("items_facets", "GET", "/api/v1/items?facets=true&pageSize=20"),
+        Scenario("items_list_fields", "GET", "/api/v1/items?fields=id,title&pageSize=20"),
+        Scenario("templates_list_fields", "GET", "/api/v1/templates?fields=id,name&pageSize=10"),
+        Scenario("users_list_fields", "GET", "/api/v1/users?fields=id,username&pageSize=10"),
+        Scenario("item_ratings_fields", "GET", f"/api/v1/items/{item_id}/ratings?fields=id,rating&pageSize=20"),
+        Scenario("statistics_templates", "GET", "/api/v1/statistics/templates"),
+        Scenario("leaderboard", "GET", f"/api/v1/statistics/leaderboards/{template_id}"),
+        Scenario("reviewers", "GET", "/api/v1/statistics/reviewers?pageSize=20"),
+        Scenario("reviewers_deviation", "GET", "/api/v1/statistics/reviewers?sort=deviation&pageSize=20"),
+    ]
+    if data_source_id is not None:
+        scenarios += [
+            Scenario("data_source_options", "GET", f"/api/v1/data-sources/{data_source_id}/options?pageSize=50"),
+            Scenario("data_source_options_search", "GET",
+                     f"/api/v1/data-sources/{data_source_id}/options?search=Option%2012&pageSize=50"),
+        ]
+    # Writes last, so the reads above see the seeded data
+    scenarios += [
+        Scenario("items_import", "POST", f"/api/v1/items/import?templateId={template_id}&createdBy={created_by}",
+                 files=import_file_factory(template), after=delete_imported_items),
+        Scenario("template_clone", "POST", f"/api/v1/templates/{template_id}/clone",
+                 after=delete_clone, serial=True),
+    ]
+    return scenarios
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+async def run_scenario(
+        client: httpx.AsyncClient,
+        scenario: Scenario,
+        headers: Dict[str, str],
+        requests: int,
+        concurrency: int,
+        cold: bool,
+) -> Dict[str, Any]:
+    durations: List[float] = []
+    queries: List[int] = []
+    errors = 0
+    semaphore = asyncio.Semaphore(1 if scenario.serial else concurrency)
+
+    async def one():
+        nonlocal errors
+        async with semaphore:
+            if cold:
+                response_cache.clear()
+                template_cache.clear()
+                item_cache.clear()
+            started = time.perf_counter()
+            response = await client.request(
+                scenario.method,
+                scenario.path,
+                headers=headers if scenario.auth else None,
+                json=scenario.body,
+                data=scenario.form,
+                files=scenario.files() if scenario.files else None,
+            )
+            durations.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors += 1
+            match = _QUERY_COUNT.search(response.headers.get("server-timing", ""))
+            if match:
+                queries.append(int(match.group(1)))
+            if scenario.after:
+                await scenario.after(client, headers, response)
+
+    # Warm up connections, mappers and caches before measuring
+    for _ in range(min(5, requests)):
+        await one()
+    durations.clear()
+    queries.clear()
+    errors = 0
+
+    started = time.perf_counter()
+    cpu_started = time.process_time()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    cpu = time.process_time() - cpu_started
+    elapsed = time.perf_counter() - started
+
+    durations.sort()
+    return {
+        "requests": requests,
+        "errors": errors,
+        "throughput_rps": round(requests / elapsed, 1),
+        "mean_ms": round(sum(durations) / len(durations) * 1000, 3),
+        "p50_ms": round(percentile(durations, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(durations, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(durations, 0.99) * 1000, 3),
+        # Process CPU (all threads) per request; the database server is not included
+        "cpu_ms": round(cpu / requests * 1000, 3),
+        "queries_per_request": round(sum(queries) / len(queries), 2) if queries else None,
+    }
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run(args) -> Dict[str, Any]:
+    transport = httpx.ASGITransport(app=app)
+    token = create_access_token({"sub": BENCH_ADMIN_USERNAME})
+    headers = {"Authorization": f"Bearer {token}"}
+
+    # ASGITransport does not send lifespan events; run the warm-up the server would run
+    started = time.perf_counter()
+    async with app.router.lifespan_context(app), \
+            httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        startup_seconds = time.perf_counter() - started
+        items = (await client.get("/api/v1/items?pageSize=1", headers=headers)).json()["data"]
+        if not items["list"]:
+            raise SystemExit("No items found: seed the database with python -m benchmarks.seed")
+        item = items["list"][0]
+        template = (await client.get(f"/api/v1/templates/{item['templateId']}")).json()["data"]
+        created_by = (await client.get(f"/api/v1/items/{item['id']}", headers=headers)).json()["data"]["createdBy"]
+        data_sources = (await client.get("/api/v1/data-sources?includeOptions=false", headers=headers)).json()["data"]
+        # A source with stored options (range, api and dynamic sources compute theirs)
+        data_source_id = next(
+            (ds["id"] for ds in data_sources if ds["sourceType"] not in ("range", "api", "dynamic")),
+            None
+        )
+        # With the periodic refreshes off, fill the summary tables once
+        for refresh in ("leaderboards", "reviewers"):
+            await client.post(f"/api/v1/statistics/{refresh}/refresh?full=true", headers=headers)
+
+        scenarios = build_scenarios(
+            item["id"], item["slug"], item["templateId"], template, data_source_id, created_by
+        )
+        if args.only:
+            scenarios = [s for s in scenarios if s.name in args.only]
+
+        results = {}
+        for scenario in scenarios:
+            requests = min(args.requests, 20) if scenario.name == "auth_token" else args.requests
+            results[scenario.name] = await run_scenario(
+                client, scenario, headers, requests, args.concurrency, args.cold
+            )
+            print(format_row(scenario.name, results[scenario.name]), flush=True)
+
+    return {
+        "meta": {
+            "timestamp": datetime.utcnow().isoformat(),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "cold": args.cold,
+            "items_total": items["total"],
+            "app_import_seconds": round(IMPORT_SECONDS, 3),
+            "app_startup_seconds": round(startup_seconds, 3),
+        },
+        "results": results,
+    }
+
+
+def format_row(name: str, result: Dict[str, Any]) -> str:
+    return (
+        f"{name:<28} {result['p50_ms']:>9.2f} {result['p95_ms']:>9.2f} {result['p99_ms']:>9.2f} "
+        f"{result['cpu_ms']:>9.2f} {result['throughput_rps']:>9.1f} {str(result['queries_per_request']):>8} "
+        f"{result['errors']:>6}"
+    )
+
+
+def compare(before_path: str, after_path: str):
+    with open(before_path) as f:
+        before_report = json.load(f)
+    with open(after_path) as f:
+        after_report = json.load(f)
+    before, after = before_report["results"], after_report["results"]
+
+    for key in ("app_import_seconds", "app_startup_seconds"):
+        b, a = before_report["meta"].get(key), after_report["meta"].get(key)
+        if b is not None and a is not None:
+            print(f"{key:<28} {b * 1000:>9.0f} ms -> {a * 1000:.0f} ms")
+
+    print(
+        f"{'endpoint':<28} {'p50 before':>11} {'p50 after':>10} {'change':>8} {'p95 change':>11} "
+        f"{'cpu change':>11} {'queries':>12}"
+    )
+    for name in sorted(set(before) | set(after)):
+        if name not in before or name not in after:
+            print(f"{name:<28} {'only in ' + ('after' if name in after else 'before'):>31}")
+            continue
+        b, a = before[name], after[name]
+        p50_change = (a["p50_ms"] - b["p50_ms"]) / b["p50_ms"] * 100 if b["p50_ms"] else 0
+        p95_change = (a["p95_ms"] - b["p95_ms"]) / b["p95_ms"] * 100 if b["p95_ms"] else 0
+        cpu_change = (a["cpu_ms"] - b["cpu_ms"]) / b["cpu_ms"] * 100 if b.get("cpu_ms") and a.get("cpu_ms") else 0
+        queries = f"{b['queries_per_request']} -> {a['queries_per_request']}"
+        print(
+            f"{name:<28} {b['p50_ms']:>11.2f} {a['p50_ms']:>10.2f} {p50_change:>+7.1f}% "
+            f"{p95_change:>+10.1f}% {cpu_change:>+10.1f}% {queries:>12}"
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200, help="measured requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--cold", action="store_true", help="clear in-process caches before every request")
+    parser.add_argument("--only", nargs="+", help="run only these scenarios")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="compare two result files")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    engine.echo = False
+    logging.disable(logging.WARNING)
+
+    print(f"{'endpoint':<28} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'cpu ms':>9} {'req/s':>9} {'queries':>8} {'errors':>6}")
+    report = asyncio.run(run(args))
+    print(
+        f"app import: {report['meta']['app_import_seconds'] * 1000:.0f} ms, "
+        f"startup: {report['meta']['app_startup_seconds'] * 1000:.0f} ms"
+    )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
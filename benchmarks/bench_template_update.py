@@ -0,0 +1,132 @@
+"""
+Measure saving a large template: the diff-based bulk writer against the
+previous per-field ORM loop. Runs against ADMIN_DATABASE_URL inside a
+transaction that is rolled back, so the database is left untouched.
+
+Usage:
+    python -m benchmarks.bench_template_update [--fields 500]
+"""
+import argparse
+import time
+import uuid
+
+from sqlalchemy import event
+from sqlmodel import Session, select
+
+import app.db.base  # noqa: F401
+from app.db.session import engine
+from app.models.template import Template
+from app.models.template_field import TemplateField
+from app.schemas.template import TemplateFieldCreate
+from app.services.template_fields import (
+    apply_field_diff,
+    compute_field_diff,
+    field_payload,
+    insert_fields,
+    load_field_rows,
+)
+
+
+class StatementCounter:
+    """Counts statements sent to the server, each executemany parameter set counting as one"""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += len(parameters) if executemany else 1
+
+
+def make_payload(existing_ids, field_count):
+    """Keep 80% of the fields (renaming them), drop the rest and add as many new ones"""
+    keep = existing_ids[: int(field_count * 0.8)]
+    payload = [
+        TemplateFieldCreate(
+            id=field_id, name=f"field_{i}", display_name=f"Field {i} (renamed)",
+            field_type="text", display_order=i,
+        )
+        for i, field_id in enumerate(keep)
+    ]
+    for i in range(field_count - len(keep)):
+        payload.append(TemplateFieldCreate(
+            name=f"new_field_{i}", display_name=f"New field {i}", field_type="number",
+            display_order=len(keep) + i, validation_rules={"min": 0},
+        ))
+    return payload
+
+
+def save_row_by_row(session, template_id, payload):
+    """The update_template loop this benchmark compares against"""
+    existing_fields = {
+        f.id: f for f in session.exec(select(TemplateField).where(TemplateField.template_id == template_id)).all()
+    }
+    incoming_field_ids = set()
+    for field_data in payload:
+        if field_data.id is not None:
+            db_field = existing_fields[field_data.id]
+            for name, value in field_payload(field_data).items():
+                setattr(db_field, name, value)
+            session.add(db_field)
+            incoming_field_ids.add(field_data.id)
+        else:
+            existing_field_names = {f.name for f in existing_fields.values()}
+            assert field_data.name not in existing_field_names
+            session.add(TemplateField(template_id=template_id, **field_payload(field_data)))
+    for field_id in existing_fields:
+        if field_id not in incoming_field_ids:
+            session.delete(existing_fields[field_id])
+    session.flush()
+
+
+def save_with_diff(session, template_id, payload):
+    diff = compute_field_diff(load_field_rows(session, template_id), payload)
+    apply_field_diff(session, template_id, diff)
+
+
+def run(session, template_id, field_count, saver, counter):
+    savepoint = session.begin_nested()
+    insert_fields(session, template_id, [
+        field_payload(TemplateFieldCreate(
+            name=f"field_{i}", display_name=f"Field {i}", field_type="text", display_order=i,
+        ))
+        for i in range(field_count)
+    ])
+    existing_ids = sorted(load_field_rows(session, template_id))
+    payload = make_payload(existing_ids, field_count)
+    session.expire_all()
+
+    counter.count = 0
+    started = time.perf_counter()
+    saver(session, template_id, payload)
+    elapsed = time.perf_counter() - started
+    statements = counter.count
+
+    savepoint.rollback()
+    return elapsed, statements
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--fields", type=int, nargs="+", default=[50, 500])
+    args = parser.parse_args(argv)
+
+    engine.echo = False
+    counter = StatementCounter()
+    event.listen(engine, "before_cursor_execute", counter)
+
+    with Session(engine) as session:
+        template = Template(name=f"bench-{uuid.uuid4().hex[:12]}", display_name="Benchmark", description="")
+        session.add(template)
+        session.flush()
+
+        print(f"{'fields':>8} {'saver':>12} {'ms':>10} {'statements':>12}")
+        for field_count in args.fields:
+            for label, saver in (("row-by-row", save_row_by_row), ("diff", save_with_diff)):
+                elapsed, statements = run(session, template.id, field_count, saver, counter)
+                print(f"{field_count:>8} {label:>12} {elapsed * 1000:>10.1f} {statements:>12}")
+
+        session.rollback()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Compare the compiled template validator with interpreting validation_rules per row.
+
+Usage:
+    python -m benchmarks.bench_validation [--rows 100000]
+"""
+import argparse
+import random
+import re
+import time
+from datetime import date
+
+from app.services.validation import FieldSpec, TemplateValidator, get_rule
+
+COUNTRIES = [f"country-{i}" for i in range(250)]
+
+FIELDS = [
+    FieldSpec(1, "year", "number", True, None, {"min": 1900, "max": 2030}),
+    FieldSpec(2, "isbn", "text", False, None, {"pattern": r"\d{3}-\d{10}"}),
+    FieldSpec(3, "summary", "textarea", False, None, {"minLength": 10, "maxLength": 2000}),
+    FieldSpec(4, "country", "select", True, 7, None),
+    FieldSpec(5, "tags", "multiselect", False, None, {"options": ["a", "b", "c", "d"], "maxLength": 3}),
+    FieldSpec(6, "released", "date", False, None, {"min": "1900-01-01"}),
+]
+OPTIONS = {7: COUNTRIES}
+
+
+def interpret(fields, options_by_source, values):
+    """Baseline: read every rule from the JSON dict while validating each row"""
+    errors = []
+    for field in fields:
+        rules = field.validation_rules or {}
+        value = values.get(field.name)
+        if value is None:
+            if field.is_required or get_rule(rules, "required"):
+                errors.append((field.name, "required"))
+            continue
+        for rule in ("min", "max"):
+            bound = get_rule(rules, rule)
+            if bound is None:
+                continue
+            bound = date.fromisoformat(bound) if field.field_type == "date" else float(bound)
+            if (rule == "min" and value < bound) or (rule == "max" and value > bound):
+                errors.append((field.name, rule))
+        min_length = get_rule(rules, "min_length")
+        if min_length is not None and len(value) < int(min_length):
+            errors.append((field.name, "min_length"))
+        max_length = get_rule(rules, "max_length")
+        if max_length is not None and len(value) > int(max_length):
+            errors.append((field.name, "max_length"))
+        pattern = get_rule(rules, "pattern")
+        if pattern is not None and not re.fullmatch(pattern, str(value)):
+            errors.append((field.name, "pattern"))
+        allowed = get_rule(rules, "options") or options_by_source.get(field.data_source_id)
+        if allowed is not None and field.field_type in ("select", "multiselect"):
+            allowed = {str(o) for o in allowed}
+            for element in value if isinstance(value, list) else [value]:
+                if str(element) not in allowed:
+                    errors.append((field.name, "options"))
+    return errors
+
+
+def make_rows(count):
+    rng = random.Random(42)
+    rows = []
+    for _ in range(count):
+        rows.append({
+            "year": float(rng.randint(1890, 2035)),
+            "isbn": f"{rng.randint(100, 999)}-{rng.randint(10 ** 9, 10 ** 10 - 1)}",
+            "summary": "x" * rng.randint(5, 300),
+            "country": rng.choice(COUNTRIES + ["atlantis"]),
+            "tags": rng.sample(["a", "b", "c", "d", "e"], rng.randint(0, 4)),
+            "released": date(rng.randint(1880, 2024), 1, 1),
+        })
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=100_000)
+    args = parser.parse_args(argv)
+
+    rows = make_rows(args.rows)
+
+    started = time.perf_counter()
+    validator = TemplateValidator(1, 1, FIELDS, {k: frozenset(v) for k, v in OPTIONS.items()})
+    compile_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    compiled_invalid = sum(1 for row in rows if validator.validate(row))
+    compiled_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    interpreted_invalid = sum(1 for row in rows if interpret(FIELDS, OPTIONS, row))
+    interpreted_time = time.perf_counter() - started
+
+    assert compiled_invalid == interpreted_invalid, (compiled_invalid, interpreted_invalid)
+
+    print(f"rows:         {args.rows} ({compiled_invalid} invalid)")
+    print(f"compile:      {compile_time * 1000:.2f} ms")
+    print(f"compiled:     {compiled_time:.3f} s ({args.rows / compiled_time:,.0f} rows/s)")
+    print(f"interpreted:  {interpreted_time:.3f} s ({args.rows / interpreted_time:,.0f} rows/s)")
+    print(f"speedup:      {interpreted_time / compiled_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
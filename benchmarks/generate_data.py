@@ -0,0 +1,312 @@
+"""
+Generate a load-scale dataset: millions of items with their field values,
+ratings and consistent item_statistics, loaded with COPY from parallel worker
+processes (one transaction per batch).
+
+Usage:
+    python -m benchmarks.generate_data --items 1000000 --ratings-per-item 10 [--workers 8] [--reset]
+
+Items are added to the templates already in the database; when there are
+none, templates, fields, an option data source and reviewers are created
+first (see benchmarks/seed.py). Distributions:
+  * templates are picked with Zipf-like weights, so one template dominates
+  * ratings per item follow a Pareto distribution: most items get a handful,
+    a few get thousands
+  * reviewers are skewed too, a minority writes most of the ratings
+  * each item has a hidden quality its ratings scatter around
+The same --seed produces the same data.
+"""
+import argparse
+import json
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import text
+
+import app.db.base  # noqa: F401
+from app.db.session import engine
+from benchmarks.seed import analyze, create_schema, reset_schema, seed_structure
+
+RATING_TAIL = 1.6
+
+_ADJECTIVES = ("Silent", "Golden", "Broken", "Hidden", "Crimson", "Last", "Electric", "Wild", "Quiet", "Lost")
+_NOUNS = ("River", "Empire", "Garden", "Signal", "Harbor", "Machine", "Winter", "Letter", "Kingdom", "Voyage")
+_REVIEWS = (
+    "Exceeded my expectations.",
+    "Solid, but the second half drags.",
+    "Not for me.",
+    "Would recommend to anyone.",
+    "Overrated in my opinion.",
+    "A classic, revisited it again this year.",
+)
+
+_COPY_ITEMS = "COPY items (id, template_id, title, slug, created_by, created_at, updated_at) FROM STDIN"
+_COPY_FIELD_VALUES = (
+    "COPY item_field_values (item_id, field_id, text_value, numeric_value, date_value, boolean_value, "
+    "json_value, created_at, updated_at) FROM STDIN"
+)
+_COPY_RATINGS = "COPY user_ratings (item_id, user_id, rating, review_text, created_at, updated_at) FROM STDIN"
+_COPY_STATISTICS = (
+    "COPY item_statistics (item_id, avg_rating, ratings_count, views_count, last_calculated_at) FROM STDIN"
+)
+
+
+@dataclass
+class FieldPlan:
+    id: int
+    field_type: str
+    is_required: bool
+    options: List[str] = field(default_factory=list)
+
+
+@dataclass
+class GenerationPlan:
+    template_ids: List[int]
+    template_weights: List[float]
+    fields: Dict[int, List[FieldPlan]]
+    user_ids: List[int]
+    ratings_per_item: float
+    now: datetime
+
+
+def load_plan(conn, ratings_per_item: float) -> GenerationPlan:
+    template_ids = [row.id for row in conn.execute(text("SELECT id FROM templates ORDER BY id"))]
+    user_ids = [row.id for row in conn.execute(text('SELECT id FROM "user" ORDER BY id'))]
+
+    options: Dict[int, List[str]] = {}
+    for row in conn.execute(text("SELECT data_source_id, value FROM field_data_source_options ORDER BY id")):
+        options.setdefault(row.data_source_id, []).append(row.value)
+
+    fields: Dict[int, List[FieldPlan]] = {template_id: [] for template_id in template_ids}
+    for row in conn.execute(text(
+            "SELECT id, template_id, field_type, is_required, data_source_id "
+            "FROM template_fields ORDER BY template_id, display_order")):
+        fields[row.template_id].append(FieldPlan(
+            row.id, row.field_type, row.is_required, options.get(row.data_source_id, [])
+        ))
+
+    return GenerationPlan(
+        template_ids=template_ids,
+        template_weights=[1 / rank for rank in range(1, len(template_ids) + 1)],
+        fields=fields,
+        user_ids=user_ids,
+        ratings_per_item=ratings_per_item,
+        now=datetime.utcnow(),
+    )
+
+
+def reserve_item_ids(conn, count: int) -> int:
+    """Advance the items sequence past `count` ids and return the first one"""
+    last = conn.execute(
+        text("SELECT setval(pg_get_serial_sequence('items', 'id'), "
+             "nextval(pg_get_serial_sequence('items', 'id')) + :count - 1)"),
+        {"count": count}
+    ).scalar()
+    return last - count + 1
+
+
+def field_value_row(rng: random.Random, field_plan: FieldPlan, item_id: int, now: datetime):
+    text_value = numeric_value = date_value = boolean_value = json_value = None
+    field_type = field_plan.field_type
+    options = field_plan.options
+
+    if field_type == "text":
+        text_value = f"{rng.choice(_ADJECTIVES)} {rng.choice(_NOUNS)}"
+    elif field_type == "textarea":
+        text_value = " ".join(rng.choices(_REVIEWS, k=rng.randint(1, 4)))
+    elif field_type == "number":
+        numeric_value = round(rng.lognormvariate(3, 1), 2)
+    elif field_type == "date":
+        date_value = (now - timedelta(days=rng.randint(0, 365 * 40))).date()
+    elif field_type == "boolean":
+        boolean_value = rng.random() < 0.3
+    elif field_type == "select" and options:
+        text_value = options[int(len(options) * rng.random() ** 2)]
+    elif field_type == "multiselect" and options:
+        json_value = json.dumps(rng.sample(options, min(len(options), rng.randint(1, 3))))
+    else:
+        text_value = f"value {item_id}"
+
+    return item_id, field_plan.id, text_value, numeric_value, date_value, boolean_value, json_value, now, now
+
+
+def rating_count(rng: random.Random, mean: float, limit: int) -> int:
+    # (Pareto - 1) has mean 1 / (alpha - 1); rescale it to the requested mean
+    return min(limit, int((rng.paretovariate(RATING_TAIL) - 1) * (RATING_TAIL - 1) * mean))
+
+
+def pick_reviewers(rng: random.Random, users: List[int], count: int) -> List[int]:
+    """
+    `count` distinct users (count < len(users)), skewed towards the first ones.
+    Each draw takes one index; an index already taken moves to the next free
+    one (found through path-compressed links), so heavy-tailed items need no
+    redraws to reach the rarely drawn users.
+    """
+    size = len(users)
+    draw = rng.random
+    # taken index -> an index to look at next for a free one
+    next_free: Dict[int, int] = {}
+    picked = []
+    for _ in range(count):
+        index = int(size * draw() ** 2)
+        if index in next_free:
+            path = []
+            while index in next_free:
+                path.append(index)
+                index = next_free[index]
+            for taken in path:
+                next_free[taken] = index
+        next_free[index] = index + 1 if index + 1 < size else 0
+        picked.append(users[index])
+    return picked
+
+
+_plan: Optional[GenerationPlan] = None
+
+
+def _init_worker(plan: GenerationPlan):
+    global _plan
+    _plan = plan
+    engine.echo = False
+    # Connections inherited from the parent process must not be reused
+    engine.dispose(close=False)
+
+
+def generate_batch(batch_no: int, first_item_id: int, count: int, seed: int) -> Dict[str, int]:
+    plan = _plan
+    rng = random.Random(seed * 1_000_003 + batch_no)
+    now = plan.now
+    users = plan.user_ids
+    max_ratings = max(1, len(users) // 2)
+    rows = {"items": 0, "field_values": 0, "ratings": 0}
+
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        items, statistics, ratings = [], [], []
+        for item_id in range(first_item_id, first_item_id + count):
+            template_id = rng.choices(plan.template_ids, plan.template_weights)[0]
+            created_at = now - timedelta(minutes=rng.randint(0, 60 * 24 * 730))
+            items.append((
+                item_id, template_id, f"{rng.choice(_ADJECTIVES)} {rng.choice(_NOUNS)} {item_id}",
+                f"gen-{item_id}", rng.choice(users), created_at, created_at,
+            ))
+
+            quality = rng.gauss(6.8, 1.2)
+            target = rating_count(rng, plan.ratings_per_item, max_ratings)
+            reviewers = pick_reviewers(rng, users, target)
+            total = 0.0
+            age = max(1, int((now - created_at).total_seconds()))
+            for user_id in reviewers:
+                rating = min(10.0, max(1.0, round(rng.gauss(quality, 1.4), 1)))
+                total += rating
+                rated_at = now - timedelta(seconds=rng.randrange(age))
+                review = rng.choice(_REVIEWS) if rng.random() < 0.3 else None
+                ratings.append((item_id, user_id, rating, review, rated_at, rated_at))
+            statistics.append((
+                item_id, round(total / target, 2) if target else 0, target,
+                target * rng.randint(5, 40) + rng.randint(0, 200), now,
+            ))
+
+        with cursor.copy(_COPY_ITEMS) as copy:
+            for row in items:
+                copy.write_row(row)
+        with cursor.copy(_COPY_FIELD_VALUES) as copy:
+            for row in items:
+                for field_plan in plan.fields[row[1]]:
+                    if not field_plan.is_required and rng.random() < 0.15:
+                        continue
+                    copy.write_row(field_value_row(rng, field_plan, row[0], now))
+                    rows["field_values"] += 1
+        with cursor.copy(_COPY_RATINGS) as copy:
+            for row in ratings:
+                copy.write_row(row)
+        with cursor.copy(_COPY_STATISTICS) as copy:
+            for row in statistics:
+                copy.write_row(row)
+        raw.commit()
+    finally:
+        raw.close()
+
+    rows["items"] = len(items)
+    rows["ratings"] = len(ratings)
+    return rows
+
+
+def generate(
+        items: int,
+        ratings_per_item: float,
+        workers: int,
+        batch_size: int,
+        seed: int,
+        templates: int = 5,
+        fields_per_template: int = 8,
+        users: int = 100_000,
+        options: int = 500,
+) -> Dict[str, int]:
+    with engine.begin() as conn:
+        if not conn.execute(text("SELECT EXISTS (SELECT 1 FROM templates)")).scalar():
+            seed_structure(conn, templates, fields_per_template, users, options)
+        plan = load_plan(conn, ratings_per_item)
+        first_item_id = reserve_item_ids(conn, items)
+
+    if not plan.template_ids or not plan.user_ids:
+        raise SystemExit("Templates and users are required to generate items")
+
+    totals = {"items": 0, "field_values": 0, "ratings": 0}
+    batches = [
+        (batch_no, first_item_id + start, min(batch_size, items - start))
+        for batch_no, start in enumerate(range(0, items, batch_size))
+    ]
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(plan,)) as pool:
+        futures = [pool.submit(generate_batch, batch_no, first_id, count, seed) for batch_no, first_id, count in batches]
+        for done, future in enumerate(as_completed(futures), start=1):
+            for key, value in future.result().items():
+                totals[key] += value
+            elapsed = time.perf_counter() - started
+            print(
+                f"batch {done}/{len(batches)}: {totals['items']} items, {totals['field_values']} field values, "
+                f"{totals['ratings']} ratings ({totals['ratings'] / elapsed:,.0f} ratings/s)",
+                flush=True
+            )
+    return totals
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=1_000_000)
+    parser.add_argument("--ratings-per-item", type=float, default=10, help="mean of the skewed distribution")
+    parser.add_argument("--templates", type=int, default=5, help="when no templates exist yet")
+    parser.add_argument("--fields", type=int, default=8, help="fields per template, when no templates exist yet")
+    parser.add_argument("--users", type=int, default=100_000, help="reviewers, when no templates exist yet")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--batch-size", type=int, default=5_000, help="items per COPY transaction")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--reset", action="store_true", help="drop and recreate every application table first")
+    args = parser.parse_args(argv)
+
+    engine.echo = False
+    if args.reset:
+        reset_schema()
+    create_schema()
+
+    started = time.perf_counter()
+    totals = generate(
+        args.items, args.ratings_per_item, args.workers, args.batch_size, args.seed,
+        templates=args.templates, fields_per_template=args.fields, users=args.users,
+    )
+    analyze()
+    print(
+        f"Generated {totals['items']} items, {totals['field_values']} field values and "
+        f"{totals['ratings']} ratings in {time.perf_counter() - started:.1f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""
+Create the schema and seed a local benchmark database at a configurable scale.
+All rows are generated inside Postgres with generate_series, so seeding a
+hundred thousand items takes seconds.
+
+Usage:
+    python -m benchmarks.seed --items 100000 [--reset]
+
+ADMIN_DATABASE_URL must point at a database reserved for benchmarks:
+--reset drops every table of the application schema.
+"""
+import argparse
+import time
+
+from sqlalchemy import text
+from sqlmodel import SQLModel
+
+import app.db.base  # noqa: F401
+from app.core.security import hash_password
+from app.db.session import engine
+
+BENCH_ADMIN_USERNAME = "bench"
+BENCH_ADMIN_PASSWORD = "bench-password"
+
+FIELD_TYPES = ("text", "number", "date", "boolean", "select", "multiselect", "textarea")
+
+
+def reset_schema():
+    SQLModel.metadata.drop_all(engine)
+
+
+def create_schema():
+    SQLModel.metadata.create_all(engine)
+
+
+def is_seeded() -> bool:
+    with engine.connect() as conn:
+        return conn.execute(text("SELECT EXISTS (SELECT 1 FROM items)")).scalar()
+
+
+# Admin user, reviewers, one option data source, templates and their fields
+_STRUCTURE_STATEMENTS = [
+    """INSERT INTO admin_role (name) VALUES ('Administrator') ON CONFLICT (name) DO NOTHING""",
+    """INSERT INTO admin_user (username, email, password, role_id, created_time, updated_time)
+       SELECT :username, :email, :password, id, now(), now()
+       FROM admin_role WHERE name = 'Administrator'
+       ON CONFLICT (username) DO NOTHING""",
+    """INSERT INTO "user" (username, email, password, created_time, updated_time)
+       SELECT 'user' || g, 'user' || g || '@bench.local', 'x', now(), now()
+       FROM generate_series(1, :users) g""",
+    """INSERT INTO field_data_sources (name, source_type, created_at, updated_at)
+       VALUES ('bench-options', 'static_list', now(), now())""",
+    """INSERT INTO field_data_source_options (data_source_id, value, display_text, created_at, updated_at)
+       SELECT (SELECT max(id) FROM field_data_sources), 'option-' || g, 'Option ' || g, now(), now()
+       FROM generate_series(1, :options) g""",
+    """INSERT INTO templates (name, display_name, description, full_marks, is_published,
+                              created_at, updated_at, created_by, updated_by)
+       SELECT 'template-' || g, 'Template ' || g, 'Benchmark template ' || g, 10, g % 2 = 0,
+              now(), now(), (SELECT min(id) FROM admin_user), (SELECT min(id) FROM admin_user)
+       FROM generate_series(1, :templates) g""",
+    """INSERT INTO template_fields (template_id, name, display_name, field_type, is_required,
+                                    is_searchable, is_filterable, display_order, data_source_id,
+                                    created_at, updated_at)
+       SELECT t.id, 'field_' || f, 'Field ' || f, ft.field_type, f = 1, f <= 2, f <= 3, f,
+              CASE WHEN ft.field_type IN ('select', 'multiselect')
+                   THEN (SELECT max(id) FROM field_data_sources) END,
+              now(), now()
+       FROM templates t
+       CROSS JOIN generate_series(1, :fields) f
+       CROSS JOIN LATERAL (
+           SELECT (CAST(:field_types AS varchar[]))[1 + (f - 1) % array_length(CAST(:field_types AS varchar[]), 1)] AS field_type
+       ) ft""",
+]
+
+_DATA_STATEMENTS = [
+    """INSERT INTO items (template_id, title, slug, created_by, created_at, updated_at)
+       SELECT t.ids[1 + g % array_length(t.ids, 1)], 'Item ' || g, 'item-' || g,
+              u.min_id + (g * 7919) % :users,
+              now() - (g % 1000) * interval '1 hour', now()
+       FROM generate_series(1, :items) g,
+            (SELECT array_agg(id ORDER BY id) AS ids FROM templates) t,
+            (SELECT min(id) AS min_id FROM "user") u""",
+    """INSERT INTO item_field_values (item_id, field_id, text_value, numeric_value, date_value,
+                                      boolean_value, json_value, created_at, updated_at)
+       SELECT i.id, f.id,
+              CASE WHEN f.field_type IN ('text', 'textarea') THEN 'value ' || i.id
+                   WHEN f.field_type = 'select' THEN 'option-' || (1 + i.id % :options) END,
+              CASE WHEN f.field_type = 'number' THEN (i.id % 1000)::float END,
+              CASE WHEN f.field_type = 'date' THEN date '2000-01-01' + (i.id % 9000) END,
+              CASE WHEN f.field_type = 'boolean' THEN i.id % 2 = 0 END,
+              CASE WHEN f.field_type = 'multiselect'
+                   THEN jsonb_build_array('option-' || (1 + i.id % :options)) END,
+              now(), now()
+       FROM items i
+       JOIN template_fields f ON f.template_id = i.template_id""",
+    # Cubing a uniform random number concentrates ratings on low item ids
+    """INSERT INTO user_ratings (item_id, user_id, rating, review_text, created_at, updated_at)
+       SELECT i.min_id + floor(power(random(), 3) * i.n)::int,
+              u.min_id + floor(random() * :users)::int,
+              round((1 + random() * 9)::numeric, 1),
+              CASE WHEN g % 3 = 0 THEN 'Review ' || g END,
+              now() - (g % 5000) * interval '1 minute', now()
+       FROM generate_series(1, :ratings) g,
+            (SELECT min(id) AS min_id, count(*) AS n FROM items) i,
+            (SELECT min(id) AS min_id FROM "user") u""",
+    """INSERT INTO item_statistics (item_id, avg_rating, ratings_count, views_count, last_calculated_at)
+       SELECT i.id, coalesce(avg(r.rating), 0), count(r.id), (i.id * 31) % 5000, now()
+       FROM items i
+       LEFT JOIN user_ratings r ON r.item_id = i.id
+       GROUP BY i.id""",
+]
+
+
+def seed_structure(
+        conn,
+        templates: int = 5,
+        fields_per_template: int = 8,
+        users: int = 1_000,
+        options: int = 200,
+):
+    """Create everything items depend on. Fields cycle through every field type."""
+    params = {
+        "templates": templates,
+        "fields": fields_per_template,
+        "users": users,
+        "options": options,
+        "field_types": list(FIELD_TYPES),
+        "password": hash_password(BENCH_ADMIN_PASSWORD),
+        "username": BENCH_ADMIN_USERNAME,
+        "email": f"{BENCH_ADMIN_USERNAME}@bench.local",
+    }
+    for statement in _STRUCTURE_STATEMENTS:
+        conn.execute(text(statement), params)
+
+
+def analyze():
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("ANALYZE"))
+
+
+def seed(
+        items: int = 10_000,
+        templates: int = 5,
+        fields_per_template: int = 8,
+        users: int = 1_000,
+        ratings_per_item: int = 5,
+        options: int = 200,
+):
+    """Populate an empty schema. Rating counts per item are skewed towards a few popular items."""
+    params = {"items": items, "users": users, "ratings": items * ratings_per_item, "options": options}
+    with engine.begin() as conn:
+        seed_structure(conn, templates, fields_per_template, users, options)
+        for statement in _DATA_STATEMENTS:
+            conn.execute(text(statement), params)
+    analyze()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Seed a benchmark database")
+    parser.add_argument("--items", type=int, default=10_000)
+    parser.add_argument("--templates", type=int, default=5)
+    parser.add_argument("--fields", type=int, default=8, help="fields per template")
+    parser.add_argument("--users", type=int, default=1_000)
+    parser.add_argument("--ratings-per-item", type=int, default=5)
+    parser.add_argument("--reset", action="store_true", help="drop and recreate every application table first")
+    args = parser.parse_args(argv)
+
+    engine.echo = False
+    if args.reset:
+        reset_schema()
+    create_schema()
+    if is_seeded():
+        print("Database already contains items, pass --reset to reseed")
+        return
+
+    started = time.perf_counter()
+    seed(args.items, args.templates, args.fields, args.users, args.ratings_per_item)
+    print(f"Seeded {args.items} items in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+OptionsResolver against a stub HTTP server on localhost: caching, shared
+fetches, the concurrency limit, stale serving and the host/redirect rules.
+"""
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import app.db.base  # noqa: F401  registers every model, so FieldDataSource can be mapped
+
+from app.models.field_data_source import FieldDataSource
+from app.services import options_resolver as resolver_module
+from app.services.options_resolver import OptionsFetchError, OptionsResolver, validate_configuration
+
+OPTIONS = [{"code": "fr", "name": "France"}, {"code": "jp", "name": "Japan"}]
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.hits[self.path] = server.hits.get(self.path, 0) + 1
+            server.running += 1
+            server.max_running = max(server.max_running, server.running)
+        try:
+            if self.path == "/redirect":
+                self.send_response(302)
+                self.send_header("Location", "/options")
+                self.end_headers()
+                return
+            time.sleep(server.delay)
+            if server.failing:
+                self.send_response(500)
+                self.end_headers()
+                return
+            body = json.dumps({"data": {"items": OPTIONS}}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        finally:
+            with server.lock:
+                server.running -= 1
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.lock = threading.Lock()
+    server.hits = {}
+    server.running = 0
+    server.max_running = 0
+    server.delay = 0.2
+    server.failing = False
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setattr(resolver_module, "ALLOWED_HOSTS", ["127.0.0.1"])
+    server.url = f"http://127.0.0.1:{server.server_address[1]}"
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def api_source(source_id, url, **configuration):
+    return FieldDataSource(
+        id=source_id,
+        name=f"source-{source_id}",
+        source_type="api",
+        configuration={"url": url, "items_path": "data.items", "value_key": "code", "label_key": "name", **configuration},
+    )
+
+
+def test_concurrent_callers_share_one_fetch(stub):
+    resolver = OptionsResolver()
+    source = api_source(1, f"{stub.url}/options")
+
+    async def run():
+        return await asyncio.gather(*(resolver.resolve(source) for _ in range(10)))
+
+    results = asyncio.run(run())
+    assert stub.hits == {"/options": 1}
+    assert all(result is results[0] for result in results)
+    assert [option["display_text"] for _, option in results[0].options()] == ["France", "Japan"]
+
+
+def test_cached_until_ttl_expires(stub):
+    resolver = OptionsResolver()
+    cached = api_source(1, f"{stub.url}/options", ttl=60)
+    expiring = api_source(2, f"{stub.url}/options?expiring", ttl=0, stale_ttl=0)
+
+    async def run():
+        for _ in range(3):
+            await resolver.resolve(cached)
+            await resolver.resolve(expiring)
+
+    asyncio.run(run())
+    assert stub.hits == {"/options": 1, "/options?expiring": 3}
+    assert resolver.hits == 2
+
+
+def test_fetch_concurrency_is_limited(stub):
+    resolver = OptionsResolver(concurrency=2)
+    sources = [api_source(i, f"{stub.url}/options?source={i}") for i in range(6)]
+
+    async def run():
+        await asyncio.gather(*(resolver.resolve(source) for source in sources))
+
+    asyncio.run(run())
+    assert len(stub.hits) == 6
+    assert stub.max_running == 2
+
+
+def test_stale_options_served_while_upstream_fails(stub):
+    resolver = OptionsResolver()
+    source = api_source(1, f"{stub.url}/options", ttl=0, stale_ttl=60)
+
+    async def run():
+        first = await resolver.resolve(source)
+        stub.failing = True
+        second = await resolver.resolve(source)
+        # The background refresh fails and falls back to the cached options too
+        refreshes = list(resolver._inflight.values())
+        refreshed = await asyncio.gather(*refreshes)
+        return first, second, refreshes, refreshed
+
+    first, second, refreshes, refreshed = asyncio.run(run())
+    assert second is first
+    assert len(refreshes) == 1 and refreshed[0] is first
+    assert resolver.stale_hits == 1
+    assert stub.hits == {"/options": 2}
+
+    # Without cached options the failure reaches the caller
+    with pytest.raises(OptionsFetchError):
+        asyncio.run(OptionsResolver().resolve(source))
+
+
+def test_disallowed_host_is_refused(stub):
+    url = f"http://localhost:{stub.server_address[1]}/options"
+    with pytest.raises(ValueError):
+        validate_configuration("api", {"url": url})
+    with pytest.raises(OptionsFetchError):
+        asyncio.run(OptionsResolver().resolve(api_source(1, url)))
+    assert stub.hits == {}
+
+
+def test_redirects_are_not_followed(stub):
+    with pytest.raises(OptionsFetchError):
+        asyncio.run(OptionsResolver().resolve(api_source(1, f"{stub.url}/redirect")))
+    assert stub.hits == {"/redirect": 1}